@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
-import ast
 import csv
 import html
+import sys
 from collections import defaultdict
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from backend.db.change_orders import allocate_amount, parse_affected_sov_lines  # noqa: E402
+
 DATA_DIR = Path("hvac_construction_dataset")
 OUT_HTML = Path("analysis/bid_overrun_visualization.html")
 OUT_CSV = Path("analysis/bid_overrun_line_summary.csv")
@@ -77,20 +80,13 @@ def load_rejected_co_exposure(path: Path):
             if amount <= 0:
                 continue
 
-            text = row.get("affected_sov_lines") or "[]"
-            try:
-                lines = ast.literal_eval(text)
-                if not isinstance(lines, list):
-                    lines = []
-            except (SyntaxError, ValueError):
-                lines = []
-
-            if not lines:
+            lines, issue = parse_affected_sov_lines(row.get("affected_sov_lines"))
+            if issue:
+                print(f"Skipping {row['project_id']} {row['co_number']}: {issue} affected_sov_lines", file=sys.stderr)
                 continue
 
-            split_amount = amount / len(lines)
-            for sov_line in lines:
-                exposure[(row["project_id"], sov_line)] += split_amount
+            for sov_line, share in allocate_amount(amount, lines).items():
+                exposure[(row["project_id"], sov_line)] += share
 
     return exposure
 
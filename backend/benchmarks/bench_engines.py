@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from backend.compute import run_compute_engine
+from backend.scripts.seed_db import seed_db
+
+# Fact tables replicated to grow the row counts the line-level stages scan.
+FACT_TABLES = {"labor_logs": "log_id", "material_deliveries": "delivery_id"}
+
+
+def _grow_facts(conn: sqlite3.Connection, factor: int) -> None:
+    """Append `factor - 1` copies of every labor and delivery row under suffixed IDs."""
+    for table, id_col in FACT_TABLES.items():
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        select_cols = ",".join(f"{c} || ?" if c == id_col else c for c in cols)
+        max_rowid = conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0]
+        for i in range(1, factor):
+            conn.execute(
+                f"INSERT INTO {table} ({','.join(cols)}) SELECT {select_cols} FROM {table} WHERE rowid <= ?",
+                (f"-G{i:04d}", max_rowid),
+            )
+    conn.commit()
+
+
+def _time(db_path: Path, engine: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_compute_engine(db_path, engine=engine)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(factors: list[int], repeat: int) -> list[dict[str, float]]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "base.db"
+        seed_db(base)
+        for factor in factors:
+            db_path = Path(tmp) / f"bench_{factor}.db"
+            db_path.write_bytes(base.read_bytes())
+            conn = sqlite3.connect(db_path)
+            try:
+                _grow_facts(conn, factor)
+                labor_rows = conn.execute("SELECT COUNT(*) FROM labor_logs").fetchone()[0]
+            finally:
+                conn.close()
+            sql_s = _time(db_path, "sql", repeat)
+            numpy_s = _time(db_path, "numpy", repeat)
+            results.append(
+                {"labor_rows": labor_rows, "sql_ms": sql_s * 1000, "numpy_ms": numpy_s * 1000, "speedup": sql_s / numpy_s}
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the SQL and NumPy compute engines on a full rebuild.")
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'labor_rows':>11} {'sql_ms':>10} {'numpy_ms':>10} {'speedup':>8}")
+    for r in run(args.factors, args.repeat):
+        print(f"{r['labor_rows']:>11} {r['sql_ms']:>10.1f} {r['numpy_ms']:>10.1f} {r['speedup']:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from backend.compute import run_compute_engine
+from backend.compute.financials import compute_project_financials
+from backend.compute.rfis import compute_rfi_metrics
+from backend.scripts.seed_db import seed_db
+
+# Tables read by the project-level stages; everything else is irrelevant to this benchmark.
+CLONED_TABLES = ("contracts", "computed_sov_metrics", "change_orders", "rfis")
+
+
+def _clone_projects(conn: sqlite3.Connection, copies: int) -> None:
+    """Replicate every seeded project `copies` times under suffixed project IDs."""
+    for table in CLONED_TABLES:
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info({table})").fetchall()]
+        select_cols = ",".join("project_id || ?" if c == "project_id" else c for c in cols)
+        sql = f"INSERT INTO {table} ({','.join(cols)}) SELECT {select_cols} FROM {table} WHERE project_id NOT LIKE '%-X%'"
+        for i in range(1, copies):
+            conn.execute(sql, (f"-X{i:04d}",))
+    conn.commit()
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(copies_list: list[int], repeat: int) -> list[dict[str, float]]:
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp) / "base.db"
+        seed_db(base)
+        run_compute_engine(base)
+
+        for copies in copies_list:
+            db_path = Path(tmp) / f"bench_{copies}.db"
+            db_path.write_bytes(base.read_bytes())
+            conn = sqlite3.connect(db_path)
+            try:
+                _clone_projects(conn, copies)
+                projects = conn.execute("SELECT COUNT(*) FROM contracts").fetchone()[0]
+                rfi_metrics = compute_rfi_metrics(conn)
+                rfi_s = _time(lambda: compute_rfi_metrics(conn), repeat)
+                fin_s = _time(lambda: compute_project_financials(conn, rfi_metrics), repeat)
+                conn.rollback()
+            finally:
+                conn.close()
+            results.append(
+                {
+                    "projects": projects,
+                    "rfi_metrics_ms": rfi_s * 1000,
+                    "project_financials_ms": fin_s * 1000,
+                    "us_per_project": (rfi_s + fin_s) * 1e6 / projects,
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time project-level compute stages against portfolio size.")
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 10, 50, 100, 200])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'projects':>9} {'rfi_ms':>10} {'financials_ms':>14} {'us/project':>11}")
+    for r in run(args.copies, args.repeat):
+        print(
+            f"{r['projects']:>9} {r['rfi_metrics_ms']:>10.2f} {r['project_financials_ms']:>14.2f} {r['us_per_project']:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
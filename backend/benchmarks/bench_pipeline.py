@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import closing
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Callable
+
+from backend.benchmarks.synthetic import generate_portfolio
+from backend.compute import run_compute_engine
+from backend.db.history import record_snapshot
+from backend.db.loader import CHUNK_SIZE
+from backend.scripts.build_dossiers import build_dossiers
+from backend.scripts.seed_db import seed_db
+
+# Bumped when the layout of the results JSON changes.
+RESULTS_FORMAT = 1
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def _measured(fn: Callable[..., Any], *args: Any) -> dict[str, Any]:
+    start = time.perf_counter()
+    result = fn(*args)
+    return {"seconds": time.perf_counter() - start, "peak_rss_mb": _peak_rss_mb(), "result": result}
+
+
+def _isolated(fn: Callable[..., Any], *args: Any) -> dict[str, Any]:
+    """Run one stage in a fresh process so its peak RSS is its own, SQLite page cache included."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+        return pool.submit(_measured, fn, *args).result()
+
+
+def _build(db_path: Path, history_path: Path) -> None:
+    with closing(sqlite3.connect(db_path)) as conn:
+        record_snapshot(conn, history_path=history_path)
+    build_dossiers(db_path)
+
+
+def _percentile(times: list[float], pct: float) -> float:
+    ordered = sorted(times)
+    return ordered[min(len(ordered) - 1, int(pct * len(ordered)))]
+
+
+def _bench_routes(requests: int) -> dict[str, dict[str, float]]:
+    """Latency per API route through the ASGI app; the first call is reported apart as the cold one."""
+    from fastapi.testclient import TestClient
+
+    from backend.db.connection import DB_PATH
+    from backend.main import app
+
+    with closing(sqlite3.connect(DB_PATH)) as conn:
+        project_id, mid_date = conn.execute(
+            """
+            SELECT project_id, DATE((julianday(contract_date) + julianday(substantial_completion_date)) / 2)
+            FROM contracts ORDER BY project_id LIMIT 1
+            """
+        ).fetchone()
+        sov_line_id = conn.execute(
+            "SELECT sov_line_id FROM sov WHERE project_id=? ORDER BY line_number LIMIT 1", (project_id,)
+        ).fetchone()[0]
+
+    routes = [
+        ("portfolio", "GET", "/api/portfolio", None),
+        ("dossier", "GET", f"/api/dossier/{project_id}", None),
+        ("dossier_as_of", "GET", f"/api/dossier/{project_id}?as_of={mid_date}", None),
+        ("trend", "GET", f"/api/trend/{project_id}", None),
+        ("labor_detail", "POST", "/api/tools/labor-detail", {"project_id": project_id, "sov_line_id": sov_line_id}),
+        ("field_notes", "POST", "/api/tools/field-notes", {"project_id": project_id, "keyword": "duct"}),
+        (
+            "what_if_batch",
+            "POST",
+            "/api/tools/what-if-batch",
+            {"recovery_amounts": [0, 250000, 500000], "co_approval_probs": [0, 0.5, 1]},
+        ),
+        ("margin_risk", "GET", "/api/risk/margin?samples=10000", None),
+        ("chat", "POST", "/api/chat", {"project_id": project_id, "message": "What are the top recovery actions?"}),
+    ]
+    results = {}
+    with TestClient(app) as client:
+        for name, method, url, body in routes:
+            times = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                response = client.request(method, url, json=body)
+                times.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{name} returned {response.status_code}: {response.text[:200]}")
+            warm = times[1:] or times
+            results[name] = {
+                "first_ms": times[0] * 1000,
+                "p50_ms": _percentile(warm, 0.5) * 1000,
+                "p95_ms": _percentile(warm, 0.95) * 1000,
+                "max_ms": max(warm) * 1000,
+            }
+    return results
+
+
+def _best(runs: list[dict[str, Any]]) -> dict[str, float]:
+    return {"seconds": min(r["seconds"] for r in runs), "peak_rss_mb": max(r["peak_rss_mb"] for r in runs)}
+
+
+def run_scale(
+    work_dir: Path, projects: int, labor_rows: int | None, seed: int, repeat: int, route_requests: int, engine: str
+) -> dict[str, Any]:
+    data_dir = work_dir / "data"
+    db_path = work_dir / "hvac.db"
+    history_path = work_dir / "history.db"
+    # Children inherit the environment: compute records its telemetry in this scale's history
+    # database, and the API reads the database and snapshot history it finds there.
+    saved = {k: os.environ.get(k) for k in ("HVAC_DB", "HVAC_HISTORY_DB")}
+    os.environ.update(HVAC_DB=str(db_path), HVAC_HISTORY_DB=str(history_path))
+    try:
+        generated = _isolated(generate_portfolio, data_dir, projects, labor_rows, seed)
+        stages = {"generate": _best([generated])}
+        stages["seed_db"] = _best([_isolated(seed_db, db_path, CHUNK_SIZE, data_dir) for _ in range(repeat)])
+        computes = [_isolated(run_compute_engine, db_path, False, engine) for _ in range(repeat)]
+        stages["compute"] = _best(computes)
+        stages["build_dossiers"] = _best([_isolated(_build, db_path, history_path) for _ in range(repeat)])
+        routes = _isolated(_bench_routes, route_requests)
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+    fastest = min(computes, key=lambda r: r["seconds"])["result"]
+    return {
+        "projects": projects,
+        "labor_rows": generated["result"]["labor_logs"],
+        "rows": generated["result"],
+        "db_mb": db_path.stat().st_size / (1024 * 1024),
+        "stages": stages,
+        "compute_stages": {s["stage"]: {k: v for k, v in s.items() if k != "stage"} for s in fastest["stages"]},
+        "routes": routes["result"],
+        "routes_peak_rss_mb": routes["peak_rss_mb"],
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(
+    scales: list[tuple[int, int | None]], seed: int = 0, repeat: int = 1, route_requests: int = 20, engine: str = "sql"
+) -> dict[str, Any]:
+    results = []
+    for projects, labor_rows in scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            results.append(run_scale(Path(tmp), projects, labor_rows, seed, repeat, route_requests, engine))
+    return {
+        "format": RESULTS_FORMAT,
+        "revision": _git_revision(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"seed": seed, "repeat": repeat, "route_requests": route_requests, "engine": engine},
+        "scales": results,
+    }
+
+
+def _parse_scale(value: str) -> tuple[int, int | None]:
+    projects, _, labor_rows = value.partition(":")
+    return int(projects), int(labor_rows) if labor_rows else None
+
+
+def _print(results: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    before = {(s["projects"], s["labor_rows"]): s for s in (baseline or {}).get("scales", [])}
+    for scale in results["scales"]:
+        old = before.get((scale["projects"], scale["labor_rows"]))
+        print(f"\n{scale['projects']} projects, {scale['labor_rows']} labor rows, {scale['db_mb']:.1f} MB database")
+        print(f"{'stage':>16} {'seconds':>10} {'peak_mb':>9} {'vs_base':>8}")
+        for name, stage in scale["stages"].items():
+            ratio = f"{stage['seconds'] / old['stages'][name]['seconds']:.2f}x" if old and name in old["stages"] else ""
+            print(f"{name:>16} {stage['seconds']:>10.2f} {stage['peak_rss_mb']:>9.0f} {ratio:>8}")
+        print(f"{'compute stage':>28} {'seconds':>10} {'rows_out':>10} {'vm_steps':>13} {'vs_base':>8}")
+        for name, stage in scale.get("compute_stages", {}).items():
+            base = (old or {}).get("compute_stages", {}).get(name)
+            ratio = f"{stage['seconds'] / base['seconds']:.2f}x" if base and base["seconds"] else ""
+            print(f"{name:>28} {stage['seconds']:>10.3f} {stage['rows_written']:>10} {stage['vm_steps']:>13} {ratio:>8}")
+        print(f"{'route':>16} {'first_ms':>10} {'p50_ms':>9} {'p95_ms':>9} {'vs_base':>8}")
+        for name, route in scale["routes"].items():
+            ratio = f"{route['p50_ms'] / old['routes'][name]['p50_ms']:.2f}x" if old and name in old["routes"] else ""
+            print(f"{name:>16} {route['first_ms']:>10.1f} {route['p50_ms']:>9.1f} {route['p95_ms']:>9.1f} {ratio:>8}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Time each pipeline stage and API route on synthetic portfolios and record peak memory."
+    )
+    parser.add_argument(
+        "--scale",
+        type=_parse_scale,
+        action="append",
+        help="PROJECTS[:LABOR_ROWS], repeatable; e.g. 500:10000000. Without LABOR_ROWS the seed crew sizes are kept.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage after generation; the fastest is kept")
+    parser.add_argument("--route-requests", type=int, default=20)
+    parser.add_argument("--engine", choices=("sql", "numpy"), default="sql")
+    parser.add_argument("--out", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="results JSON from another version to compare against")
+    args = parser.parse_args()
+
+    results = run(args.scale or [(5, None), (50, 500_000)], args.seed, args.repeat, args.route_requests, args.engine)
+    if args.out:
+        args.out.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    _print(results, json.loads(args.compare.read_text(encoding="utf-8")) if args.compare else None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import random
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Iterator
+
+from backend.scripts.seed_db import DATA_DIR, TABLE_FILES
+
+# Fact tables whose rows grow with the crew; every other table is copied once per project.
+CREW_TABLES = ("labor_logs", "material_deliveries")
+# Row IDs that must stay distinct across synthetic projects and crew copies.
+ID_COLUMNS = {"labor_logs": "log_id", "material_deliveries": "delivery_id", "field_notes": "note_id"}
+DATE_COLUMNS = {
+    "contract_date",
+    "substantial_completion_date",
+    "date",
+    "period_end",
+    "payment_date",
+    "date_submitted",
+    "date_required",
+    "date_responded",
+}
+# Columns that grow with the crew (and with price escalation) and columns that only follow prices.
+VOLUME_COLUMNS = {
+    "contracts": ("original_contract_value",),
+    "sov": ("scheduled_value",),
+    "sov_budget": (
+        "estimated_labor_hours",
+        "estimated_labor_cost",
+        "estimated_material_cost",
+        "estimated_equipment_cost",
+        "estimated_sub_cost",
+    ),
+    "billing_history": ("period_total", "cumulative_billed", "retention_held", "net_payment_due"),
+    "billing_line_items": ("scheduled_value", "previous_billed", "this_period", "total_billed", "balance_to_finish"),
+    "change_orders": ("amount", "labor_hours_impact"),
+}
+PRICE_COLUMNS = {
+    "labor_logs": ("hourly_rate",),
+    "material_deliveries": ("unit_cost", "total_cost"),
+}
+MAX_SHIFT_DAYS = 365
+
+
+def _read(path: Path) -> tuple[list[str], list[dict[str, str]]]:
+    with path.open(newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        cols = next(reader, [])
+        # Like load_csv, cells past the header are dropped.
+        return cols, [dict(zip(cols, row)) for row in reader]
+
+
+def _scaled(value: str, factor: float) -> str:
+    try:
+        return str(round(float(value) * factor, 2))
+    except ValueError:
+        return value
+
+
+def _shifted(value: str, days: int) -> str:
+    try:
+        return (date.fromisoformat(value) + timedelta(days=days)).isoformat()
+    except ValueError:
+        return value
+
+
+class _Project:
+    """How one synthetic project is derived from its source project."""
+
+    def __init__(self, index: int, source_id: str, shift_days: int, escalation: float, crew_factor: float):
+        self.project_id = f"SYN-{index:04d}"
+        self.source_id = source_id
+        self.shift_days = shift_days
+        self.escalation = escalation
+        self.crew_factor = crew_factor
+
+    def row(self, table: str, row: dict[str, str]) -> dict[str, str]:
+        out = {k: (v.replace(self.source_id, self.project_id) if v else v) for k, v in row.items()}
+        for col in DATE_COLUMNS.intersection(out):
+            out[col] = _shifted(out[col], self.shift_days)
+        for col in VOLUME_COLUMNS.get(table, ()):
+            out[col] = _scaled(out[col], self.crew_factor * self.escalation)
+        for col in PRICE_COLUMNS.get(table, ()):
+            out[col] = _scaled(out[col], self.escalation)
+        if table in ID_COLUMNS:
+            out[ID_COLUMNS[table]] = f"{self.project_id}-{row[ID_COLUMNS[table]]}"
+        if table == "contracts":
+            out["project_name"] = f"{row['project_name']} #{self.project_id[4:]}"
+        return out
+
+
+def _crew_copy(table: str, row: dict[str, str], copy: int) -> dict[str, str]:
+    """The row as worked by the `copy`-th extra crew: new row ID and, for labor, a new employee."""
+    if not copy:
+        return row
+    out = dict(row)
+    out[ID_COLUMNS[table]] = f"{row[ID_COLUMNS[table]]}-{copy}"
+    if "employee_id" in out:
+        out["employee_id"] = f"{row['employee_id']}-{copy}"
+    return out
+
+
+def _crew_rows(count: int, target: int, rng: random.Random) -> Iterator[tuple[int, int]]:
+    """(copy, source index) for `target` rows: whole copies of the source crew, then a random subset."""
+    full, extra = divmod(target, count)
+    for copy in range(full):
+        for i in range(count):
+            yield copy, i
+    for i in sorted(rng.sample(range(count), extra)):
+        yield full, i
+
+
+def generate_portfolio(
+    out_dir: Path,
+    projects: int = 500,
+    labor_rows: int | None = 10_000_000,
+    seed: int = 0,
+    source_dir: Path = DATA_DIR,
+) -> dict[str, int]:
+    """Write a synthetic portfolio in the seed CSV layout to `out_dir`; returns rows written per table.
+
+    Each synthetic project copies a source project picked at random, shifted in time and priced up
+    or down. Its crew grows until the portfolio has `labor_rows` labor logs (None keeps the source
+    density): labor and delivery rows are repeated from the source project, so roles, rates, burden,
+    OT ratios and the daily pattern carry over, and budgets, billing and change orders scale with
+    the crew. The change order and RFI mix is the source project's. The same seed writes the same files.
+    """
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    sources = {table: _read(source_dir / filename) for table, filename in TABLE_FILES.items()}
+    source_ids = sorted(r["project_id"] for r in sources["contracts"][1])
+    by_project: dict[str, dict[str, list[dict[str, str]]]] = {p: {} for p in source_ids}
+    shared: dict[str, list[dict[str, str]]] = {}
+    for table, (_, rows) in sources.items():
+        for row in rows:
+            # Rows not tied to a source project (portfolio-wide thresholds) are copied once.
+            bucket = by_project[row["project_id"]] if row.get("project_id") in by_project else shared
+            bucket.setdefault(table, []).append(row)
+
+    plans = [
+        (rng.choice(source_ids), rng.randint(-MAX_SHIFT_DAYS, MAX_SHIFT_DAYS), rng.uniform(0.9, 1.15))
+        for _ in range(projects)
+    ]
+    source_labor = [len(by_project[source_id].get("labor_logs", [])) for source_id, _, _ in plans]
+    if labor_rows is None:
+        targets = source_labor
+    else:
+        # Spread the labor rows in proportion to each source's crew, handing out remainders so the total is exact.
+        exact = [labor_rows * n / sum(source_labor) for n in source_labor]
+        targets = [int(t) for t in exact]
+        for i in sorted(range(projects), key=lambda i: targets[i] - exact[i])[: labor_rows - sum(targets)]:
+            targets[i] += 1
+
+    counts = {table: 0 for table in sources}
+    writers: dict[str, Any] = {}
+    files = []
+    try:
+        for table, (fieldnames, _) in sources.items():
+            f = (out_dir / TABLE_FILES[table]).open("w", newline="", encoding="utf-8")
+            files.append(f)
+            writers[table] = csv.DictWriter(f, fieldnames=fieldnames)
+            writers[table].writeheader()
+
+        for table, rows in shared.items():
+            writers[table].writerows(rows)
+            counts[table] += len(rows)
+        for index, ((source_id, shift, escalation), target) in enumerate(zip(plans, targets), start=1):
+            source = by_project[source_id]
+            crew_factor = target / max(len(source.get("labor_logs", [])), 1)
+            project = _Project(index, source_id, shift, escalation, crew_factor)
+            for table, rows in source.items():
+                base = [project.row(table, row) for row in rows]
+                if table in CREW_TABLES:
+                    size = target if table == "labor_logs" else round(len(rows) * crew_factor)
+                    base = [_crew_copy(table, base[i], copy) for copy, i in _crew_rows(len(base), size, rng)]
+                writers[table].writerows(base)
+                counts[table] += len(base)
+    finally:
+        for f in files:
+            f.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write a synthetic HVAC portfolio modeled on the seed dataset.")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--projects", type=int, default=500)
+    parser.add_argument("--labor-rows", type=int, default=10_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for table, count in generate_portfolio(args.out_dir, args.projects, args.labor_rows, args.seed).items():
+        print(f"{table:>20} {count:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,139 @@
 from __future__ import annotations
 
+import logging
 import sqlite3
 from pathlib import Path
+from typing import Any
+
+from backend.db.history import HISTORY_DB_PATH, record_pipeline_run
 
 from .billing import compute_billing
+from .daily_totals import refresh_daily_totals
+from .forecast import compute_forecasts
 from .financials import compute_project_financials, finalize_sov_metrics, initialize_sov_metrics
 from .health_score import compute_health_score
+from .incremental import advance_watermarks, collect_dirty_lines, has_watermarks, scope_to_project
 from .labor import compute_labor
 from .materials import compute_materials
 from .rfis import compute_rfi_metrics
+from .telemetry import PipelineTelemetry, Stage, untimed
 from .triggers import compute_triggers
 
+logger = logging.getLogger(__name__)
+
+
+def _run_stages(conn: sqlite3.Connection, scoped: bool, as_of: str | None = None, stage: Stage = untimed) -> None:
+    if not scoped:
+        with stage("initialize_sov_metrics"):
+            initialize_sov_metrics(conn)
+    with stage("compute_labor"):
+        compute_labor(conn, scoped, as_of)
+    with stage("compute_materials"):
+        compute_materials(conn, scoped, as_of)
+    with stage("compute_billing"):
+        compute_billing(conn, scoped, as_of)
+    with stage("finalize_sov_metrics"):
+        finalize_sov_metrics(conn, scoped, as_of)
+    with stage("compute_rfi_metrics"):
+        rfi_metrics = compute_rfi_metrics(conn, scoped, as_of)
+    with stage("compute_project_financials"):
+        compute_project_financials(conn, rfi_metrics, scoped, as_of)
+    with stage("compute_health_score"):
+        compute_health_score(conn, scoped)
+    with stage("compute_triggers"):
+        compute_triggers(conn, scoped)
+    with stage("compute_forecasts"):
+        compute_forecasts(conn, scoped, as_of)
+
+
+# Tables the stages write; compute_point_in_time shadows them with TEMP copies.
+COMPUTED_TABLES = (
+    "computed_sov_metrics",
+    "computed_project_metrics",
+    "triggers",
+    "computed_sov_forecasts",
+    "computed_project_forecasts",
+)
+
+
+def compute_point_in_time(conn: sqlite3.Connection, as_of: str, project_id: str | None = None) -> None:
+    """Compute metrics and triggers as of a date into TEMP tables that shadow the computed tables.
+
+    Unqualified reads on `conn` then see the point-in-time values while the stored metrics stay
+    untouched; the shadows vanish with the connection. Reads line_daily_totals as last refreshed.
+    With project_id only that project's lines and project row are computed.
+    """
+    for table in COMPUTED_TABLES:
+        conn.execute(f"DROP TABLE IF EXISTS temp.{table}")
+        conn.execute(f"CREATE TEMP TABLE {table} AS SELECT * FROM main.{table} WHERE 0")
+    if project_id is None:
+        _run_stages(conn, scoped=False, as_of=as_of)
+        return
+    scope_to_project(conn, project_id)
+    initialize_sov_metrics(conn, scoped=True)
+    _run_stages(conn, scoped=True, as_of=as_of)
 
-def run_compute_engine(db_path: Path) -> None:
+
+ENGINES = ("sql", "numpy")
+
+
+def run_compute_engine(
+    db_path: Path,
+    incremental: bool = False,
+    engine: str = "sql",
+    history_path: Path | None = HISTORY_DB_PATH,
+) -> dict[str, Any]:
+    """Rebuild computed metrics and triggers.
+
+    With incremental=True only the (project_id, sov_line_id) keys that received new labor,
+    delivery or billing rows since the last run are recomputed, along with their parent
+    project rows, health scores and triggers. Falls back to a full rebuild when no prior
+    run has been recorded.
+
+    engine="numpy" runs full rebuilds through the in-memory array engine in
+    backend.compute.vectorized (requires numpy); incremental runs always use SQL.
+
+    Metrics as of an earlier date never overwrite the stored tables; see compute_point_in_time.
+
+    Returns the run's per-stage telemetry, which is also appended to pipeline_runs in the
+    history database at `history_path` (None skips it). That write is best-effort: the metrics
+    are already committed, so a locked or missing history database is only logged.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown compute engine: {engine}")
     conn = sqlite3.connect(db_path)
     try:
-        initialize_sov_metrics(conn)
-        compute_labor(conn)
-        compute_materials(conn)
-        compute_billing(conn)
-        finalize_sov_metrics(conn)
-        rfi_metrics = compute_rfi_metrics(conn)
-        compute_project_financials(conn, rfi_metrics)
-        compute_health_score(conn)
-        compute_triggers(conn)
-        conn.commit()
+        scoped = incremental and has_watermarks(conn)
+        mode = "incremental" if scoped else "numpy" if engine == "numpy" else "full"
+        telemetry = PipelineTelemetry(conn, mode)
+        stage = telemetry.stage
+        if scoped:
+            with stage("collect_dirty_lines"):
+                dirty = collect_dirty_lines(conn)
+            if dirty:
+                with stage("refresh_daily_totals"):
+                    refresh_daily_totals(conn, scoped=True)
+                _run_stages(conn, scoped=True, stage=stage)
+        elif engine == "numpy":
+            from .vectorized import run_vectorized_stages
+
+            with stage("refresh_daily_totals"):
+                refresh_daily_totals(conn)
+            run_vectorized_stages(conn, stage)
+        else:
+            with stage("refresh_daily_totals"):
+                refresh_daily_totals(conn)
+            _run_stages(conn, scoped=False, stage=stage)
+        with stage("advance_watermarks"):
+            advance_watermarks(conn)
+        with stage("commit"):
+            conn.commit()
+        summary = telemetry.finish()
+        if history_path is not None:
+            try:
+                record_pipeline_run(summary, history_path)
+            except (sqlite3.Error, OSError) as exc:
+                logger.warning("could not record pipeline run %s in %s: %s", summary["run_id"], history_path, exc)
+        return summary
     finally:
         conn.close()
@@ -2,22 +2,31 @@ from __future__ import annotations
 
 import sqlite3
 
+from .daily_totals import total_as_of
+from .incremental import DIRTY_LINES_FILTER
 
-def compute_billing(conn: sqlite3.Connection) -> None:
-    conn.execute(
-        """
-        UPDATE computed_sov_metrics
-        SET billing_total = COALESCE((
-          SELECT MAX(total_billed)
-          FROM billing_line_items b
-          WHERE b.project_id = computed_sov_metrics.project_id
-            AND b.sov_line_id = computed_sov_metrics.sov_line_id
-        ), 0)
-        """
-    )
+
+def compute_billing(conn: sqlite3.Connection, scoped: bool = False, as_of: str | None = None) -> None:
+    where = f"WHERE {DIRTY_LINES_FILTER}" if scoped else ""
+    if as_of:
+        conn.execute(f"UPDATE computed_sov_metrics SET billing_total = {total_as_of('billed_max')} {where}", (as_of,))
+    else:
+        conn.execute(
+            f"""
+            UPDATE computed_sov_metrics
+            SET billing_total = COALESCE((
+              SELECT MAX(total_billed)
+              FROM billing_line_items b
+              WHERE b.project_id = computed_sov_metrics.project_id
+                AND b.sov_line_id = computed_sov_metrics.sov_line_id
+            ), 0)
+            {where}
+            """
+        )
     conn.execute(
-        """
+        f"""
         UPDATE computed_sov_metrics
         SET billing_lag = (actual_labor_cost + actual_material_cost) - billing_total
+        {where}
         """
     )
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sqlite3
+
+from .incremental import DIRTY_LINES_FILTER
+
+
+def refresh_daily_totals(conn: sqlite3.Connection, scoped: bool = False) -> None:
+    """Rebuild line_daily_totals: running labor, material, OT premium and billed totals per SOV line per active day.
+
+    Billing is dated by the pay application's period_end; line items without one are left out.
+    """
+    where = f"WHERE {DIRTY_LINES_FILTER}" if scoped else ""
+    conn.execute(f"DELETE FROM line_daily_totals {where}")
+    conn.execute(
+        f"""
+        INSERT INTO line_daily_totals(project_id, sov_line_id, day, labor_cost, material_cost, ot_premium, billed_max)
+        WITH daily AS (
+          SELECT project_id, sov_line_id, date AS day,
+                 SUM((hours_st + (hours_ot*1.5)) * hourly_rate * burden_multiplier) AS labor, 0 AS material,
+                 SUM(hours_ot * 0.5 * hourly_rate * burden_multiplier) AS ot, NULL AS billed
+          FROM labor_logs {where}
+          GROUP BY project_id, sov_line_id, date
+          UNION ALL
+          SELECT project_id, sov_line_id, date, 0, SUM(total_cost), 0, NULL
+          FROM material_deliveries {where}
+          GROUP BY project_id, sov_line_id, date
+          UNION ALL
+          SELECT b.project_id, b.sov_line_id, h.period_end, 0, 0, 0, MAX(b.total_billed)
+          FROM (SELECT * FROM billing_line_items {where}) b
+          JOIN billing_history h ON h.project_id = b.project_id AND h.application_number = b.application_number
+          GROUP BY b.project_id, b.sov_line_id, h.period_end
+        ),
+        per_day AS (
+          SELECT project_id, sov_line_id, day,
+                 TOTAL(labor) AS labor, TOTAL(material) AS material, TOTAL(ot) AS ot, MAX(billed) AS billed
+          FROM daily
+          WHERE day IS NOT NULL AND sov_line_id IS NOT NULL
+          GROUP BY project_id, sov_line_id, day
+        )
+        SELECT project_id, sov_line_id, day,
+               SUM(labor) OVER running, SUM(material) OVER running, SUM(ot) OVER running, MAX(billed) OVER running
+        FROM per_day
+        WINDOW running AS (PARTITION BY project_id, sov_line_id ORDER BY day ROWS UNBOUNDED PRECEDING)
+        """
+    )
+
+
+def total_as_of(column: str) -> str:
+    """Correlated lookup of a line's running total on the last active day on or before the bound date.
+
+    One primary-key seek per SOV line; the caller binds the as_of date as its single parameter.
+    """
+    return f"""COALESCE((
+          SELECT t.{column} FROM line_daily_totals t
+          WHERE t.project_id = computed_sov_metrics.project_id
+            AND t.sov_line_id = computed_sov_metrics.sov_line_id
+            AND t.day <= ?
+          ORDER BY t.day DESC LIMIT 1
+        ), 0)"""
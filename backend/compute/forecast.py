@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import sqlite3
+
+from .incremental import DIRTY_PROJECTS_FILTER
+
+# Trailing window, in days before the status date, for the labor burn-rate regression.
+BURN_RATE_WINDOW_DAYS = 90
+
+
+def compute_forecasts(conn: sqlite3.Connection, scoped: bool = False, as_of: str | None = None) -> None:
+    """Earned value and estimate at completion per SOV line, rolled up per project.
+
+    A project's status date is as_of, or else its last day of recorded activity. Progress is the
+    line's pct_complete on the latest pay application by then, and the plan runs straight from
+    contract_date to substantial_completion_date. The labor burn rate is the least-squares slope
+    of the line's running labor cost over the trailing BURN_RATE_WINDOW_DAYS.
+    """
+    where = f"WHERE {DIRTY_PROJECTS_FILTER}" if scoped else ""
+    conn.execute(f"DELETE FROM computed_sov_forecasts {where}")
+    conn.execute(f"DELETE FROM computed_project_forecasts {where}")
+    status_date = "?" if as_of else "MAX(t.day)"
+    conn.execute(
+        f"""
+        INSERT INTO computed_sov_forecasts (
+          project_id, sov_line_id, status_date, pct_complete, planned_pct_complete,
+          budget_at_completion, earned_value, planned_value, actual_cost, cpi, spi,
+          labor_burn_rate, remaining_days, estimate_to_complete, estimate_at_completion,
+          variance_at_completion, projected_margin_pct
+        )
+        WITH lines AS (
+          SELECT * FROM computed_sov_metrics {where}
+        ),
+        status AS (
+          SELECT c.project_id, {status_date} AS status_date,
+                 julianday(c.contract_date) AS start_jd,
+                 julianday(c.substantial_completion_date) - julianday(c.contract_date) AS planned_days
+          FROM contracts c
+          LEFT JOIN line_daily_totals t ON t.project_id = c.project_id
+          WHERE c.project_id IN (SELECT project_id FROM lines)
+          GROUP BY c.project_id
+        ),
+        progress AS (
+          SELECT b.project_id, b.sov_line_id, b.pct_complete,
+                 ROW_NUMBER() OVER (
+                   PARTITION BY b.project_id, b.sov_line_id ORDER BY h.period_end DESC, b.application_number DESC
+                 ) AS rn
+          FROM billing_line_items b
+          JOIN billing_history h ON h.project_id = b.project_id AND h.application_number = b.application_number
+          JOIN status s ON s.project_id = b.project_id
+          WHERE h.period_end <= s.status_date
+        ),
+        burn AS (
+          SELECT project_id, sov_line_id,
+                 CASE WHEN COUNT(*) > 1 AND SUM((x - mx) * (x - mx)) > 0
+                   THEN SUM((x - mx) * (labor_cost - my)) / SUM((x - mx) * (x - mx))
+                 END AS slope
+          FROM (
+            SELECT w.*, AVG(x) OVER line AS mx, AVG(labor_cost) OVER line AS my
+            FROM (
+              SELECT t.project_id, t.sov_line_id, t.labor_cost, julianday(t.day) - julianday(s.status_date) AS x
+              FROM lines l
+              JOIN status s ON s.project_id = l.project_id
+              -- CROSS JOIN keeps line_daily_totals inner, so each line is one primary-key range seek.
+              CROSS JOIN line_daily_totals t ON t.project_id = l.project_id AND t.sov_line_id = l.sov_line_id
+              WHERE t.day <= s.status_date AND t.day >= DATE(s.status_date, '-{BURN_RATE_WINDOW_DAYS} days')
+            ) w
+            WINDOW line AS (PARTITION BY project_id, sov_line_id)
+          )
+          GROUP BY project_id, sov_line_id
+        ),
+        measured AS (
+          SELECT l.project_id, l.sov_line_id, s.status_date, l.scheduled_value, l.estimated_labor_cost,
+                 MIN(MAX(COALESCE(p.pct_complete, 0) / 100.0, 0), 1) AS pct,
+                 CASE WHEN s.planned_days > 0
+                   THEN MIN(MAX((julianday(s.status_date) - s.start_jd) / s.planned_days, 0), 1)
+                   ELSE 1 END AS planned_pct,
+                 julianday(s.status_date) - s.start_jd AS elapsed_days,
+                 l.bid_max_cost AS bac,
+                 l.actual_labor_cost + l.actual_material_cost AS ac,
+                 r.slope
+          FROM lines l
+          JOIN status s ON s.project_id = l.project_id
+          LEFT JOIN progress p ON p.project_id = l.project_id AND p.sov_line_id = l.sov_line_id AND p.rn = 1
+          LEFT JOIN burn r ON r.project_id = l.project_id AND r.sov_line_id = l.sov_line_id
+        ),
+        indexed AS (
+          SELECT m.*, m.pct * m.bac AS ev, m.planned_pct * m.bac AS pv,
+                 CASE WHEN m.ac > 0 AND m.pct > 0 THEN m.pct * m.bac / m.ac END AS cpi,
+                 CASE WHEN m.planned_pct > 0 AND m.bac > 0 THEN m.pct / m.planned_pct END AS spi,
+                 -- Days left at the pace achieved so far.
+                 CASE WHEN m.pct >= 1 THEN 0
+                      WHEN m.pct > 0 THEN MAX(m.elapsed_days, 0) * (1 - m.pct) / m.pct
+                 END AS remaining_days
+          FROM measured m
+        ),
+        forecast AS (
+          SELECT i.*,
+                 -- Labor to go at the fitted burn rate, the rest of the budget at the cost index.
+                 COALESCE(MAX(i.slope, 0) * i.remaining_days, i.estimated_labor_cost * (1 - i.pct) / COALESCE(i.cpi, 1))
+                   + (i.bac - i.estimated_labor_cost) * (1 - i.pct) / COALESCE(i.cpi, 1) AS etc
+          FROM indexed i
+        )
+        SELECT project_id, sov_line_id, status_date, pct, planned_pct,
+               bac, ev, pv, ac, cpi, spi,
+               slope, remaining_days, etc, ac + etc, bac - (ac + etc),
+               CASE WHEN scheduled_value <> 0 THEN (scheduled_value - (ac + etc)) / scheduled_value ELSE 0 END
+        FROM forecast
+        """,
+        (as_of,) if as_of else (),
+    )
+    conn.execute(
+        f"""
+        INSERT INTO computed_project_forecasts (
+          project_id, status_date, contract_value, budget_at_completion, earned_value, planned_value,
+          actual_cost, cpi, spi, labor_burn_rate, estimate_at_completion, variance_at_completion,
+          projected_margin_pct
+        )
+        SELECT f.project_id, MAX(f.status_date), c.original_contract_value,
+               SUM(f.budget_at_completion), SUM(f.earned_value), SUM(f.planned_value), SUM(f.actual_cost),
+               CASE WHEN SUM(f.actual_cost) > 0 AND SUM(f.earned_value) > 0 THEN SUM(f.earned_value) / SUM(f.actual_cost) END,
+               CASE WHEN SUM(f.planned_value) > 0 THEN SUM(f.earned_value) / SUM(f.planned_value) END,
+               TOTAL(f.labor_burn_rate),
+               SUM(f.estimate_at_completion),
+               SUM(f.budget_at_completion) - SUM(f.estimate_at_completion),
+               CASE WHEN c.original_contract_value <> 0
+                 THEN (c.original_contract_value - SUM(f.estimate_at_completion)) / c.original_contract_value
+                 ELSE 0 END
+        FROM (SELECT * FROM computed_sov_forecasts {where}) f
+        JOIN contracts c ON c.project_id = f.project_id
+        GROUP BY f.project_id
+        """
+    )
@@ -2,13 +2,17 @@ from __future__ import annotations
 
 import sqlite3
 
+from .incremental import DIRTY_PROJECTS_FILTER
 
-def compute_health_score(conn: sqlite3.Connection) -> None:
+
+def compute_health_score(conn: sqlite3.Connection, scoped: bool = False) -> None:
+    where = f"WHERE {DIRTY_PROJECTS_FILTER}" if scoped else ""
     rows = conn.execute(
-        """
+        f"""
         SELECT project_id, margin_erosion_pct, pending_co_exposure, contract_value,
                billing_lag, open_rfis, overdue_rfis, orphan_rfis, exceedance_lines, total_lines
         FROM computed_project_metrics
+        {where}
         """
     ).fetchall()
 
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import sqlite3
+
+# Append-only fact tables whose new rows can be attributed to a (project_id, sov_line_id) key.
+WATERMARK_TABLES = ("labor_logs", "material_deliveries", "billing_line_items")
+
+# WHERE-clause fragments used by stages running with scoped=True.
+DIRTY_LINES_FILTER = "(project_id, sov_line_id) IN (SELECT project_id, sov_line_id FROM temp.dirty_sov_lines)"
+DIRTY_PROJECTS_FILTER = "project_id IN (SELECT project_id FROM temp.dirty_projects)"
+
+
+def has_watermarks(conn: sqlite3.Connection) -> bool:
+    row = conn.execute("SELECT COUNT(*) FROM compute_watermarks").fetchone()
+    return bool(row[0])
+
+
+def read_watermarks(conn: sqlite3.Connection) -> dict[str, int]:
+    rows = conn.execute("SELECT table_name, last_rowid FROM compute_watermarks").fetchall()
+    return {table: int(last_rowid or 0) for table, last_rowid in rows}
+
+
+def mark_dirty_lines(conn: sqlite3.Connection, keys: list[tuple[str, str]]) -> None:
+    """Queue keys for the next incremental run when rows were edited or removed rather than appended."""
+    conn.executemany(
+        "INSERT OR IGNORE INTO compute_dirty_lines(project_id, sov_line_id) VALUES(?, ?)",
+        keys,
+    )
+
+
+def advance_watermarks(conn: sqlite3.Connection) -> None:
+    conn.execute("DELETE FROM compute_dirty_lines")
+    for table in WATERMARK_TABLES:
+        conn.execute(
+            f"""
+            INSERT INTO compute_watermarks(table_name, last_rowid)
+            SELECT ?, COALESCE(MAX(rowid), 0) FROM {table} WHERE true
+            ON CONFLICT(table_name) DO UPDATE SET last_rowid=excluded.last_rowid, updated_at=CURRENT_TIMESTAMP
+            """,
+            (table,),
+        )
+
+
+def _reset_dirty_tables(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dirty_sov_lines (project_id TEXT, sov_line_id TEXT, PRIMARY KEY(project_id, sov_line_id))")
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS dirty_projects (project_id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM temp.dirty_sov_lines")
+    conn.execute("DELETE FROM temp.dirty_projects")
+
+
+def scope_to_project(conn: sqlite3.Connection, project_id: str) -> None:
+    """Stage every SOV line of one project as dirty, so scoped stages compute just that project."""
+    _reset_dirty_tables(conn)
+    conn.execute("INSERT INTO temp.dirty_sov_lines SELECT project_id, sov_line_id FROM sov WHERE project_id = ?", (project_id,))
+    conn.execute("INSERT INTO temp.dirty_projects VALUES (?)", (project_id,))
+
+
+def collect_dirty_lines(conn: sqlite3.Connection) -> int:
+    """Stage the keys touched since the last run into temp.dirty_sov_lines / temp.dirty_projects.
+
+    Returns the number of dirty SOV lines. Appended rows are found by rowid; edited or deleted
+    rows are only seen if the writer queued their keys with mark_dirty_lines.
+    """
+    marks = read_watermarks(conn)
+    _reset_dirty_tables(conn)
+
+    for table in WATERMARK_TABLES:
+        conn.execute(
+            f"""
+            INSERT OR IGNORE INTO temp.dirty_sov_lines(project_id, sov_line_id)
+            SELECT DISTINCT project_id, sov_line_id FROM {table} WHERE rowid > ?
+            """,
+            (marks.get(table, 0),),
+        )
+    conn.execute("INSERT OR IGNORE INTO temp.dirty_sov_lines SELECT project_id, sov_line_id FROM compute_dirty_lines")
+    conn.execute("INSERT OR IGNORE INTO temp.dirty_projects(project_id) SELECT DISTINCT project_id FROM temp.dirty_sov_lines")
+    return int(conn.execute("SELECT COUNT(*) FROM temp.dirty_sov_lines").fetchone()[0])
@@ -2,16 +2,33 @@ from __future__ import annotations
 
 import sqlite3
 
+from .daily_totals import total_as_of
+from .incremental import DIRTY_LINES_FILTER
 
-def compute_labor(conn: sqlite3.Connection) -> None:
+
+def compute_labor(conn: sqlite3.Connection, scoped: bool = False, as_of: str | None = None) -> None:
+    where = f"WHERE {DIRTY_LINES_FILTER}" if scoped else ""
+    if as_of:
+        conn.execute(
+            f"""
+            UPDATE computed_sov_metrics
+            SET actual_labor_cost = {total_as_of('labor_cost')}, actual_ot_premium = {total_as_of('ot_premium')}
+            {where}
+            """,
+            (as_of, as_of),
+        )
+        return
+    # The OT premium (the half-time share of overtime pay) comes from the same scan; what-if reads it.
     conn.execute(
-        """
+        f"""
         UPDATE computed_sov_metrics
-        SET actual_labor_cost = COALESCE((
-          SELECT SUM((hours_st + (hours_ot*1.5)) * hourly_rate * burden_multiplier)
+        SET (actual_labor_cost, actual_ot_premium) = (
+          SELECT TOTAL((hours_st + (hours_ot*1.5)) * hourly_rate * burden_multiplier),
+                 TOTAL(hours_ot * 0.5 * hourly_rate * burden_multiplier)
           FROM labor_logs l
           WHERE l.project_id = computed_sov_metrics.project_id
             AND l.sov_line_id = computed_sov_metrics.sov_line_id
-        ), 0)
+        )
+        {where}
         """
     )
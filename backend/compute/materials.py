@@ -2,10 +2,17 @@ from __future__ import annotations
 
 import sqlite3
 
+from .daily_totals import total_as_of
+from .incremental import DIRTY_LINES_FILTER
 
-def compute_materials(conn: sqlite3.Connection) -> None:
+
+def compute_materials(conn: sqlite3.Connection, scoped: bool = False, as_of: str | None = None) -> None:
+    where = f"WHERE {DIRTY_LINES_FILTER}" if scoped else ""
+    if as_of:
+        conn.execute(f"UPDATE computed_sov_metrics SET actual_material_cost = {total_as_of('material_cost')} {where}", (as_of,))
+        return
     conn.execute(
-        """
+        f"""
         UPDATE computed_sov_metrics
         SET actual_material_cost = COALESCE((
           SELECT SUM(total_cost)
@@ -13,5 +20,6 @@ def compute_materials(conn: sqlite3.Connection) -> None:
           WHERE m.project_id = computed_sov_metrics.project_id
             AND m.sov_line_id = computed_sov_metrics.sov_line_id
         ), 0)
+        {where}
         """
     )
@@ -2,29 +2,42 @@ from __future__ import annotations
 
 import sqlite3
 
+from .incremental import DIRTY_PROJECTS_FILTER
 
-def compute_rfi_metrics(conn: sqlite3.Connection) -> dict[str, dict[str, int]]:
-    out: dict[str, dict[str, int]] = {}
-    projects = [r[0] for r in conn.execute("SELECT project_id FROM contracts").fetchall()]
-    for p in projects:
-        open_count = conn.execute(
-            "SELECT COUNT(*) FROM rfis WHERE project_id=? AND status != 'Closed'", (p,)
-        ).fetchone()[0]
-        overdue_count = conn.execute(
-            "SELECT COUNT(*) FROM rfis WHERE project_id=? AND status != 'Closed' AND date_required < DATE('now')",
-            (p,),
-        ).fetchone()[0]
-        orphan_count = conn.execute(
-            """
-            SELECT COUNT(*) FROM rfis r
-            WHERE r.project_id=?
-              AND LOWER(COALESCE(r.cost_impact, '')) IN ('true','1','yes')
-              AND NOT EXISTS (
-                SELECT 1 FROM change_orders c
-                WHERE c.project_id=r.project_id AND c.related_rfi=r.rfi_number
-              )
-            """,
-            (p,),
-        ).fetchone()[0]
-        out[p] = {"open_rfis": open_count, "overdue_rfis": overdue_count, "orphan_rfis": orphan_count}
-    return out
+
+def compute_rfi_metrics(
+    conn: sqlite3.Connection, scoped: bool = False, as_of: str | None = None
+) -> dict[str, dict[str, int]]:
+    """Open, overdue and orphan RFI counts per project, optionally as they stood on `as_of`.
+
+    As of a past date, an RFI counts once submitted and stays open until its response date.
+    """
+    where = f"WHERE c.{DIRTY_PROJECTS_FILTER}" if scoped else ""
+    if as_of:
+        linked_filter, rfi_filter = "AND co.date_submitted <= ?", "AND r.date_submitted <= ?"
+        is_open, today = "(r.status != 'Closed' OR r.date_responded > ?)", "?"
+    else:
+        linked_filter = rfi_filter = ""
+        is_open, today = "r.status != 'Closed'", "DATE('now')"
+    rows = conn.execute(
+        f"""
+        SELECT
+          c.project_id,
+          COALESCE(SUM({is_open}), 0),
+          COALESCE(SUM({is_open} AND r.date_required < {today}), 0),
+          COALESCE(SUM(LOWER(COALESCE(r.cost_impact, '')) IN ('true','1','yes') AND NOT EXISTS (
+            SELECT 1 FROM change_orders co
+            WHERE co.project_id = r.project_id AND co.related_rfi = r.rfi_number {linked_filter}
+          )), 0)
+        FROM contracts c
+        LEFT JOIN rfis r ON r.project_id = c.project_id {rfi_filter}
+        {where}
+        GROUP BY c.project_id
+        """,
+        # Every placeholder above binds the as_of date.
+        (as_of,) * 5 if as_of else (),
+    ).fetchall()
+    return {
+        project_id: {"open_rfis": open_count, "overdue_rfis": overdue_count, "orphan_rfis": orphan_count}
+        for project_id, open_count, overdue_count, orphan_count in rows
+    }
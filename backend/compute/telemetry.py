@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sqlite3
+import sys
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from typing import Any, Callable, ContextManager, Iterator
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; peak RSS is then reported as None.
+    resource = None
+
+# SQLite calls the progress handler once per this many VM instructions; coarse keeps it cheap.
+VM_STEP_GRANULARITY = 10_000
+
+# Wraps one named stage of a run: PipelineTelemetry.stage, or untimed.
+Stage = Callable[[str], ContextManager[None]]
+
+
+def peak_rss_mb() -> float | None:
+    """High-water resident set size of this process so far."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def untimed(_: str) -> ContextManager[None]:
+    return nullcontext()
+
+
+class PipelineTelemetry:
+    """Wall time, rows written, statements, SQLite work and peak RSS per stage of one compute run.
+
+    Rows written come from conn.total_changes. SQLite does not report rows read to Python, so the
+    read side is measured in VM instructions (vm_steps, to VM_STEP_GRANULARITY), which grow with
+    the rows a stage scans. Peak RSS is the process high-water mark when the stage ends.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, mode: str):
+        self.conn = conn
+        self.mode = mode
+        self.run_id = uuid.uuid4().hex
+        self.started_at = datetime.now(timezone.utc).isoformat(timespec="microseconds")
+        self.stages: list[dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._statements = 0
+        self._vm_steps = 0
+        conn.set_trace_callback(self._on_statement)
+        conn.set_progress_handler(self._on_progress, VM_STEP_GRANULARITY)
+
+    def _on_statement(self, _: str) -> None:
+        self._statements += 1
+
+    def _on_progress(self) -> int:
+        self._vm_steps += VM_STEP_GRANULARITY
+        return 0
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start, changes = time.perf_counter(), self.conn.total_changes
+        statements, vm_steps = self._statements, self._vm_steps
+        try:
+            yield
+        finally:
+            self.stages.append(
+                {
+                    "stage": name,
+                    "seconds": time.perf_counter() - start,
+                    "rows_written": self.conn.total_changes - changes,
+                    "statements": self._statements - statements,
+                    "vm_steps": self._vm_steps - vm_steps,
+                    "peak_rss_mb": peak_rss_mb(),
+                }
+            )
+
+    def finish(self) -> dict[str, Any]:
+        """Detach from the connection and summarize the run, stages in the order they ran."""
+        self.conn.set_trace_callback(None)
+        self.conn.set_progress_handler(None, 0)
+        return {
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "mode": self.mode,
+            "seconds": time.perf_counter() - self._start,
+            "rows_written": sum(s["rows_written"] for s in self.stages),
+            "statements": sum(s["statements"] for s in self.stages),
+            "vm_steps": sum(s["vm_steps"] for s in self.stages),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": self.stages,
+        }
@@ -1,98 +1,131 @@
 from __future__ import annotations
 
-import json
 import sqlite3
+from typing import NamedTuple
 
+from .incremental import DIRTY_PROJECTS_FILTER
 
-def _sev(value: float, threshold: float) -> str:
-    ratio = (value / threshold) if threshold else 0.0
-    if ratio >= 2:
-        return "HIGH"
-    if ratio >= 1.25:
-        return "MEDIUM"
-    return "LOW"
-
-
-def compute_triggers(conn: sqlite3.Connection) -> None:
-    conn.execute("DELETE FROM triggers")
-    projects = conn.execute("SELECT * FROM computed_project_metrics").fetchall()
-
-    for p in projects:
-        project_id = p[0]
-        trigger_idx = 1
-
-        # labor overrun per line
-        lines = conn.execute(
-            "SELECT sov_line_id, overrun_pct, overrun_amount FROM computed_sov_metrics WHERE project_id=?",
-            (project_id,),
-        ).fetchall()
-        for sov_line_id, overrun_pct, overrun_amount in lines:
-            val = float(overrun_pct or 0)
-            if val > 0.15:
-                conn.execute(
-                    "INSERT INTO triggers(trigger_id, project_id, date, type, severity, value, threshold, details, affected_sov_lines) VALUES(?,?,?,?,?,?,?,?,?)",
-                    (
-                        f"{project_id}-TRG-{trigger_idx:03d}",
-                        project_id,
-                        "2025-01-01",
-                        "LINE_OVERRUN",
-                        _sev(val, 0.15),
-                        val,
-                        0.15,
-                        json.dumps({"overrun_amount": overrun_amount}),
-                        json.dumps([sov_line_id]),
-                    ),
-                )
-                trigger_idx += 1
-
-        pending_pct = (float(p[10] or 0) / float(p[2] or 1)) if float(p[2] or 0) else 0
-        if pending_pct > 0.05:
-            conn.execute(
-                "INSERT INTO triggers(trigger_id, project_id, date, type, severity, value, threshold, details, affected_sov_lines) VALUES(?,?,?,?,?,?,?,?,?)",
-                (
-                    f"{project_id}-TRG-{trigger_idx:03d}",
-                    project_id,
-                    "2025-01-15",
-                    "PENDING_CO_EXPOSURE",
-                    _sev(pending_pct, 0.05),
-                    pending_pct,
-                    0.05,
-                    json.dumps({"pending_co_exposure": p[10]}),
-                    "[]",
-                ),
-            )
-            trigger_idx += 1
-
-        billing_pct = (float(p[13] or 0) / float(p[2] or 1)) if float(p[2] or 0) else 0
-        if billing_pct > 0.03:
-            conn.execute(
-                "INSERT INTO triggers(trigger_id, project_id, date, type, severity, value, threshold, details, affected_sov_lines) VALUES(?,?,?,?,?,?,?,?,?)",
-                (
-                    f"{project_id}-TRG-{trigger_idx:03d}",
-                    project_id,
-                    "2025-02-01",
-                    "BILLING_LAG",
-                    _sev(billing_pct, 0.03),
-                    billing_pct,
-                    0.03,
-                    json.dumps({"billing_lag": p[13]}),
-                    "[]",
-                ),
-            )
-            trigger_idx += 1
-
-        if int(p[16] or 0) > 0:
-            conn.execute(
-                "INSERT INTO triggers(trigger_id, project_id, date, type, severity, value, threshold, details, affected_sov_lines) VALUES(?,?,?,?,?,?,?,?,?)",
-                (
-                    f"{project_id}-TRG-{trigger_idx:03d}",
-                    project_id,
-                    "2025-02-10",
-                    "ORPHAN_RFI",
-                    _sev(float(p[16]), 1.0),
-                    float(p[16]),
-                    1.0,
-                    json.dumps({"orphan_rfis": p[16]}),
-                    "[]",
-                ),
-            )
+LINE_OVERRUN_THRESHOLD = 0.15
+PENDING_CO_THRESHOLD = 0.05
+BILLING_LAG_THRESHOLD = 0.03
+ORPHAN_RFI_THRESHOLD = 1.0
+MATERIAL_VARIANCE_THRESHOLD = 0.10
+OVERDUE_RFI_THRESHOLD = 1.0
+
+
+class TriggerRule(NamedTuple):
+    """One trigger type, evaluated against every row of `source` in a single statement.
+
+    `value` and `details` are SQL expressions over the source row aliased `src`. A rule fires
+    when value > threshold (>= when `inclusive`). Line rules list the row's SOV line as affected.
+    """
+
+    type: str
+    date: str
+    threshold: float
+    source: str
+    value: str
+    details: str
+    inclusive: bool = False
+
+    @property
+    def per_line(self) -> bool:
+        return self.source == "computed_sov_metrics"
+
+
+def _pct_of_contract(col: str) -> str:
+    return f"CASE WHEN COALESCE(src.contract_value, 0) <> 0 THEN COALESCE(src.{col}, 0) / src.contract_value ELSE 0 END"
+
+
+# A trigger's id is its project, rule type and (for line rules) SOV line, so rules may be reordered.
+RULES: tuple[TriggerRule, ...] = (
+    TriggerRule(
+        "LINE_OVERRUN", "2025-01-01", LINE_OVERRUN_THRESHOLD, "computed_sov_metrics",
+        "COALESCE(src.overrun_pct, 0)", "json_object('overrun_amount', src.overrun_amount)",
+    ),
+    TriggerRule(
+        "PENDING_CO_EXPOSURE", "2025-01-15", PENDING_CO_THRESHOLD, "computed_project_metrics",
+        _pct_of_contract("pending_co_exposure"), "json_object('pending_co_exposure', src.pending_co_exposure)",
+    ),
+    TriggerRule(
+        "BILLING_LAG", "2025-02-01", BILLING_LAG_THRESHOLD, "computed_project_metrics",
+        _pct_of_contract("billing_lag"), "json_object('billing_lag', src.billing_lag)",
+    ),
+    TriggerRule(
+        "ORPHAN_RFI", "2025-02-10", ORPHAN_RFI_THRESHOLD, "computed_project_metrics",
+        "CAST(COALESCE(src.orphan_rfis, 0) AS REAL)", "json_object('orphan_rfis', src.orphan_rfis)", inclusive=True,
+    ),
+    TriggerRule(
+        "MATERIAL_VARIANCE", "2025-02-15", MATERIAL_VARIANCE_THRESHOLD, "computed_sov_metrics",
+        "COALESCE(src.material_variance_pct, 0)",
+        "json_object('actual_material_cost', src.actual_material_cost, 'estimated_material_cost', src.estimated_material_cost)",
+    ),
+    TriggerRule(
+        "OVERDUE_RFI", "2025-02-20", OVERDUE_RFI_THRESHOLD, "computed_project_metrics",
+        "CAST(COALESCE(src.overdue_rfis, 0) AS REAL)", "json_object('overdue_rfis', src.overdue_rfis)", inclusive=True,
+    ),
+)
+
+
+def _rule_select(rule: TriggerRule, where: str) -> str:
+    # Threshold precedence: per-project override, portfolio-wide ('*') override, rule default.
+    line_key = "src.sov_line_id" if rule.per_line else "NULL"
+    affected = "json_array(src.sov_line_id)" if rule.per_line else "'[]'"
+    return f"""
+        SELECT src.project_id, {line_key} AS line_key, ? AS date, ? AS type,
+               {rule.value} AS value, COALESCE(tp.threshold, ta.threshold, ?) AS threshold, ? AS inclusive,
+               {rule.details} AS details, {affected} AS affected
+        FROM (SELECT * FROM {rule.source} {where}) src
+        LEFT JOIN trigger_thresholds tp ON tp.project_id = src.project_id AND tp.type = ?
+        LEFT JOIN trigger_thresholds ta ON ta.project_id = '*' AND ta.type = ?
+    """
+
+
+def compute_triggers(conn: sqlite3.Connection, scoped: bool = False, rules: tuple[TriggerRule, ...] = RULES) -> None:
+    """Evaluate every rule over every project in one INSERT ... SELECT.
+
+    Trigger ids are <project>-TRG-<type> for project rules and <project>-TRG-<type>-<sov_line_id>
+    for line rules, so an id names the same finding on every run whatever else fires.
+    """
+    where = f"WHERE {DIRTY_PROJECTS_FILTER}" if scoped else ""
+    conn.execute(f"DELETE FROM triggers {where}")
+    if not rules:
+        return
+    arms, params = [], []
+    for rule in rules:
+        arms.append(_rule_select(rule, where))
+        params.extend([rule.date, rule.type, rule.threshold, int(rule.inclusive), rule.type, rule.type])
+    conn.execute(
+        f"""
+        WITH candidates AS ({" UNION ALL ".join(arms)}),
+        fired AS (
+          SELECT * FROM candidates
+          WHERE value > threshold OR (inclusive AND value >= threshold)
+        )
+        INSERT INTO triggers(trigger_id, project_id, date, type, severity, value, threshold, details, affected_sov_lines)
+        SELECT
+          project_id || '-TRG-' || type || COALESCE('-' || line_key, ''),
+          project_id, date, type,
+          CASE
+            WHEN threshold <> 0 AND value / threshold >= 2 THEN 'HIGH'
+            WHEN threshold <> 0 AND value / threshold >= 1.25 THEN 'MEDIUM'
+            ELSE 'LOW'
+          END,
+          value, threshold, details, affected
+        FROM fired
+        """,
+        params,
+    )
+
+
+def set_trigger_threshold(conn: sqlite3.Connection, trigger_type: str, threshold: float, project_id: str = "*") -> None:
+    """Override a rule's threshold for one project, or for every project with project_id='*'."""
+    if trigger_type not in {r.type for r in RULES}:
+        raise ValueError(f"Unknown trigger type: {trigger_type}")
+    conn.execute(
+        """
+        INSERT INTO trigger_thresholds(project_id, type, threshold) VALUES(?, ?, ?)
+        ON CONFLICT(project_id, type) DO UPDATE SET threshold=excluded.threshold
+        """,
+        (project_id, trigger_type, threshold),
+    )
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import sqlite3
+
+import numpy as np
+
+from .financials import _rejected_co_exposure_by_line, compute_project_financials, initialize_sov_metrics
+from .health_score import compute_health_score
+from .rfis import compute_rfi_metrics
+from .forecast import compute_forecasts
+from .telemetry import Stage, untimed
+from .triggers import compute_triggers
+
+
+def _columns(conn: sqlite3.Connection, sql: str, ncols: int) -> list[np.ndarray]:
+    rows = conn.execute(sql).fetchall()
+    if not rows:
+        return [np.empty(0, dtype=object) for _ in range(ncols)]
+    return [np.array(col, dtype=object) for col in zip(*rows)]
+
+
+def _floats(col: np.ndarray) -> np.ndarray:
+    # None (SQL NULL) becomes NaN so the row drops out of sums the way SQL SUM skips it.
+    return np.array(col, dtype=float)
+
+
+def _fact_matrix(conn: sqlite3.Connection, table: str, value_cols: str, ncols: int) -> np.ndarray:
+    """Load (line_code, values...) for every fact row booked to a known SOV line as one float matrix.
+
+    Line codes come from the temp.line_codes join so no per-row key handling happens in Python.
+    """
+    rows = conn.execute(
+        f"""
+        SELECT k.code, {value_cols}
+        FROM {table} f
+        JOIN temp.line_codes k ON k.project_id = f.project_id AND k.sov_line_id = f.sov_line_id
+        """
+    ).fetchall()
+    if not rows:
+        return np.empty((0, ncols + 1))
+    return np.array(rows, dtype=float)
+
+
+def _grouped_sum(codes: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    keep = ~np.isnan(values)
+    return np.bincount(codes[keep].astype(np.int64), weights=values[keep], minlength=n)
+
+
+def _grouped_max(codes: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+    keep = ~np.isnan(values)
+    codes = codes.astype(np.int64)
+    out = np.full(n, -np.inf)
+    np.maximum.at(out, codes[keep], values[keep])
+    out[np.isneginf(out)] = 0.0
+    return out
+
+
+def _safe_ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.zeros_like(num, dtype=float)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def compute_sov_metrics_vectorized(conn: sqlite3.Connection) -> None:
+    """Equivalent of compute_labor, compute_materials, compute_billing and finalize_sov_metrics."""
+    initialize_sov_metrics(conn)
+    rowid, project_id, sov_line_id, est_labor, est_mat, bid_max = _columns(
+        conn,
+        """
+        SELECT rowid, project_id, sov_line_id, estimated_labor_cost, estimated_material_cost, bid_max_cost
+        FROM computed_sov_metrics ORDER BY rowid
+        """,
+        6,
+    )
+    n = len(rowid)
+    index = {(p, s): i for i, (p, s) in enumerate(zip(project_id.tolist(), sov_line_id.tolist()))}
+    est_labor, est_mat, bid_max = _floats(est_labor), _floats(est_mat), _floats(bid_max)
+
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS line_codes (project_id TEXT, sov_line_id TEXT, code INTEGER, PRIMARY KEY(project_id, sov_line_id))"
+    )
+    conn.execute("DELETE FROM temp.line_codes")
+    conn.executemany("INSERT INTO temp.line_codes VALUES (?, ?, ?)", ((p, s, i) for (p, s), i in index.items()))
+
+    labor = _fact_matrix(conn, "labor_logs", "hours_st, hours_ot, hourly_rate, burden_multiplier", 4)
+    labor_cost = (labor[:, 1] + 1.5 * labor[:, 2]) * labor[:, 3] * labor[:, 4]
+    actual_labor = _grouped_sum(labor[:, 0], labor_cost, n)
+    ot_premium = _grouped_sum(labor[:, 0], labor[:, 2] * 0.5 * labor[:, 3] * labor[:, 4], n)
+
+    mat = _fact_matrix(conn, "material_deliveries", "total_cost", 1)
+    actual_mat = _grouped_sum(mat[:, 0], mat[:, 1], n)
+
+    billed = _fact_matrix(conn, "billing_line_items", "total_billed", 1)
+    billing_total = _grouped_max(billed[:, 0], billed[:, 1], n)
+
+    rejected = np.zeros(n)
+    for key, val in _rejected_co_exposure_by_line(conn).items():
+        if key in index:
+            rejected[index[key]] = val
+
+    actual = actual_labor + actual_mat
+    billing_lag = actual - billing_total
+    overrun_amount = (actual + rejected) - bid_max
+    conn.executemany(
+        """
+        UPDATE computed_sov_metrics
+        SET actual_labor_cost=?, actual_material_cost=?, billing_total=?, billing_lag=?,
+            rejected_co_exposure=?, labor_overrun_pct=?, material_variance_pct=?,
+            overrun_amount=?, overrun_pct=?, actual_ot_premium=?
+        WHERE rowid=?
+        """,
+        zip(
+            actual_labor.tolist(),
+            actual_mat.tolist(),
+            billing_total.tolist(),
+            billing_lag.tolist(),
+            rejected.tolist(),
+            _safe_ratio(actual_labor - est_labor, est_labor).tolist(),
+            _safe_ratio(actual_mat - est_mat, est_mat).tolist(),
+            overrun_amount.tolist(),
+            _safe_ratio(overrun_amount, bid_max).tolist(),
+            ot_premium.tolist(),
+            rowid.tolist(),
+        ),
+    )
+
+
+def run_vectorized_stages(conn: sqlite3.Connection, stage: Stage = untimed) -> None:
+    with stage("compute_sov_metrics_vectorized"):
+        compute_sov_metrics_vectorized(conn)
+    with stage("compute_rfi_metrics"):
+        rfi_metrics = compute_rfi_metrics(conn)
+    with stage("compute_project_financials"):
+        compute_project_financials(conn, rfi_metrics)
+    with stage("compute_health_score"):
+        compute_health_score(conn)
+    # Triggers are already one set-based statement; the rule engine serves both engines.
+    with stage("compute_triggers"):
+        compute_triggers(conn)
+    with stage("compute_forecasts"):
+        compute_forecasts(conn)
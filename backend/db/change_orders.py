@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import ast
+import sqlite3
+from collections import defaultdict
+from typing import Any
+
+
+def rejected_exposure_sql(as_of: str | None = None) -> tuple[str, tuple[str, ...]]:
+    """Rejected change orders whose cost lands back on the contractor, summed per SOV line.
+
+    With as_of only change orders submitted on or before that date count (at their current status).
+    """
+    dated = "AND c.date_submitted <= ?" if as_of else ""
+    sql = f"""
+    SELECT l.project_id, l.sov_line_id, SUM(l.allocated_amount) AS exposure
+    FROM change_order_sov_lines l
+    JOIN change_orders c ON c.project_id = l.project_id AND c.co_number = l.co_number
+    WHERE c.status = 'Rejected' AND c.amount > 0 {dated}
+    GROUP BY l.project_id, l.sov_line_id
+    """
+    return sql, ((as_of,) if as_of else ())
+
+
+def parse_affected_sov_lines(raw: Any) -> tuple[list[str], str | None]:
+    """Parse the list literal stored in affected_sov_lines; returns (lines, issue)."""
+    text = (raw or "").strip() if isinstance(raw, str) else ""
+    if not text:
+        return [], "missing"
+    try:
+        value = ast.literal_eval(text)
+    except (SyntaxError, ValueError):
+        return [], "malformed"
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        return [], "malformed"
+    if not value:
+        return [], "empty"
+    return value, None
+
+
+def allocate_amount(amount: float, lines: list[str]) -> dict[str, float]:
+    """Split a change order amount evenly across its lines; a line listed twice gets two shares."""
+    out: dict[str, float] = defaultdict(float)
+    piece = amount / len(lines)
+    for line in lines:
+        out[line] += piece
+    return dict(out)
+
+
+def normalize_change_order_lines(conn: sqlite3.Connection) -> list[tuple[Any, ...]]:
+    """Rebuild change_order_sov_lines from change_orders and return the issues recorded.
+
+    Issues are (project_id, co_number, issue, sov_line_id, raw_value) rows, also stored in
+    change_order_sov_line_issues; an "unknown_sov_line" issue keeps the other lines' shares.
+    """
+    conn.execute("DELETE FROM change_order_sov_lines")
+    conn.execute("DELETE FROM change_order_sov_line_issues")
+    known = set(conn.execute("SELECT project_id, sov_line_id FROM sov").fetchall())
+
+    mapped: list[tuple[str, str, str, float]] = []
+    issues: list[tuple[Any, ...]] = []
+    for project_id, co_number, amount, raw in conn.execute(
+        "SELECT project_id, co_number, amount, affected_sov_lines FROM change_orders ORDER BY rowid"
+    ).fetchall():
+        lines, issue = parse_affected_sov_lines(raw)
+        if issue:
+            issues.append((project_id, co_number, issue, None, raw))
+            continue
+        for line, allocated in allocate_amount(float(amount or 0), lines).items():
+            if (project_id, line) in known:
+                mapped.append((project_id, co_number, line, allocated))
+            else:
+                issues.append((project_id, co_number, "unknown_sov_line", line, raw))
+
+    conn.executemany(
+        "INSERT INTO change_order_sov_lines(project_id, co_number, sov_line_id, allocated_amount) VALUES(?,?,?,?)",
+        mapped,
+    )
+    conn.executemany(
+        "INSERT INTO change_order_sov_line_issues(project_id, co_number, issue, sov_line_id, raw_value) VALUES(?,?,?,?,?)",
+        issues,
+    )
+    return issues
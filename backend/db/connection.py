@@ -1,11 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import os
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
 from pathlib import Path
-from typing import Iterator
+from typing import Any, Callable, Iterator, TypeVar
 
-DB_PATH = Path(__file__).resolve().parents[1] / "hvac.db"
+from backend.db.slow_queries import SlowQueryLog, StatementTimer, slow_query_log
+
+T = TypeVar("T")
+
+DB_PATH = Path(os.getenv("HVAC_DB", str(Path(__file__).resolve().parents[1] / "hvac.db")))
+
+# Upper bounds (seconds) of the checkout latency histogram; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
 
 
 def get_connection() -> sqlite3.Connection:
@@ -25,3 +39,258 @@ def db_cursor(commit: bool = False) -> Iterator[sqlite3.Cursor]:
             conn.commit()
     finally:
         conn.close()
+
+
+def _file_id(path: Path) -> tuple[int, int] | None:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+class _Slot:
+    __slots__ = ("created_at", "last_used", "uses", "file_id", "timer")
+
+    def __init__(self, file_id: tuple[int, int] | None, timer: StatementTimer | None = None):
+        self.created_at = self.last_used = time.monotonic()
+        self.uses = 0
+        self.file_id = file_id
+        self.timer = timer
+
+
+class ConnectionPool:
+    """Bounded pool of read-only SQLite connections with checkout/return semantics.
+
+    Pragmas are applied once per physical connection. On checkout a connection is recycled
+    when it is older than `max_age`, has served `max_uses` checkouts, fails a ping after
+    being idle for `ping_after` seconds, or the database file was replaced (seed_db unlinks
+    and recreates it). With `slow_queries`, statements run on pooled connections are timed
+    and the slow ones logged.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        size: int = 8,
+        timeout: float = 5.0,
+        max_age: float = 600.0,
+        max_uses: int = 10_000,
+        ping_after: float = 30.0,
+        mmap_size: int = 256 * 1024 * 1024,
+        cache_kib: int = 32 * 1024,
+        slow_queries: SlowQueryLog | None = None,
+    ):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.ping_after = ping_after
+        self.mmap_size = mmap_size
+        self.cache_kib = cache_kib
+        self.slow_queries = slow_queries
+        self._idle: list[sqlite3.Connection] = []
+        self._slots: dict[sqlite3.Connection, _Slot] = {}
+        self._cond = threading.Condition()
+        self._in_use = 0
+        self._retired_before = 0.0
+        self._stats = {"checkouts": 0, "waits": 0, "timeouts": 0, "created": 0, "recycled": 0, "wait_seconds": 0.0}
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def _open(self) -> sqlite3.Connection:
+        file_id = _file_id(self.db_path)
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+        except sqlite3.OperationalError:
+            # A writer holds the lock; readers still work in whatever mode the file is in.
+            pass
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_kib)}")
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA query_only = ON")
+        timer = self.slow_queries.watch(conn) if self.slow_queries else None
+        with self._cond:
+            self._slots[conn] = _Slot(file_id, timer)
+            self._stats["created"] += 1
+        return conn
+
+    def _discard(self, conn: sqlite3.Connection) -> None:
+        with self._cond:
+            self._slots.pop(conn, None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _healthy(self, conn: sqlite3.Connection, now: float) -> bool:
+        slot = self._slots[conn]
+        if slot.created_at <= self._retired_before:
+            return False
+        if now - slot.created_at > self.max_age or slot.uses >= self.max_uses:
+            return False
+        if slot.file_id != _file_id(self.db_path):
+            return False
+        if now - slot.last_used > self.ping_after:
+            try:
+                conn.execute("SELECT 1").fetchone()
+            except sqlite3.Error:
+                return False
+        return True
+
+    def checkout(self) -> sqlite3.Connection:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+        with self._cond:
+            while not self._idle and self._in_use >= self.size:
+                waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise TimeoutError(f"No database connection available within {self.timeout}s")
+                self._cond.wait(remaining)
+            self._in_use += 1
+            conn = self._idle.pop() if self._idle else None
+
+        try:
+            now = time.monotonic()
+            if conn is not None and not self._healthy(conn, now):
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._stats["recycled"] += 1
+            if conn is None:
+                conn = self._open()
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        elapsed = time.monotonic() - start
+        with self._cond:
+            self._stats["checkouts"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += elapsed
+            self._latency_sum += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+            self._latency_buckets[next((i for i, b in enumerate(LATENCY_BUCKETS) if elapsed <= b), len(LATENCY_BUCKETS))] += 1
+            self._slots[conn].uses += 1
+        return conn
+
+    def checkin(self, conn: sqlite3.Connection) -> None:
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+            slot = self._slots.get(conn)
+            if slot is None:
+                return
+            if slot.timer:
+                slot.timer.flush()
+            if slot.created_at <= self._retired_before:
+                self._slots.pop(conn)
+                conn.close()
+                return
+            if conn.in_transaction:
+                conn.rollback()
+            slot.last_used = time.monotonic()
+            self._idle.append(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close(self) -> None:
+        """Close idle connections; checked-out ones are closed when returned."""
+        with self._cond:
+            self._retired_before = time.monotonic()
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict[str, float | int | dict[str, int]]:
+        with self._cond:
+            checkouts = self._stats["checkouts"]
+            buckets: dict[str, int] = {}
+            cumulative = 0
+            for bound, count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], self._latency_buckets):
+                cumulative += count
+                buckets[bound] = cumulative
+            return {
+                "size": self.size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                **self._stats,
+                "checkout_seconds_avg": self._latency_sum / checkouts if checkouts else 0.0,
+                "checkout_seconds_max": self._latency_max,
+                "checkout_seconds_buckets": buckets,
+            }
+
+
+read_pool = ConnectionPool(
+    DB_PATH,
+    size=int(os.getenv("DB_POOL_SIZE", "8")),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+    max_age=float(os.getenv("DB_POOL_MAX_AGE", "600")),
+    slow_queries=slow_query_log,
+)
+
+
+def read_connection():
+    """Check out a pooled read-only connection: `with read_connection() as conn: ...`."""
+    return read_pool.connection()
+
+
+# Sized to the pool so a worker never waits on checkout; keeps SQLite off the event loop and
+# out of the Starlette threadpool shared with other sync work.
+db_executor = ThreadPoolExecutor(max_workers=read_pool.size, thread_name_prefix="db-read")
+
+
+class Elapsed:
+    """Seconds accumulated across the awaits of one request."""
+
+    __slots__ = ("seconds",)
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+
+
+# Set per HTTP request by the metrics middleware; run_db adds the time it spends awaiting.
+db_elapsed: ContextVar[Elapsed | None] = ContextVar("db_elapsed", default=None)
+
+
+async def run_timed(elapsed: Elapsed | None, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await `fn(*args, **kwargs)` on the database executor, adding the wait to `elapsed`."""
+    call = asyncio.get_running_loop().run_in_executor(db_executor, partial(fn, *args, **kwargs))
+    if elapsed is None:
+        return await call
+    start = time.perf_counter()
+    try:
+        return await call
+    finally:
+        elapsed.seconds += time.perf_counter() - start
+
+
+async def run_db(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await `fn(*args, **kwargs)` on the database executor, counted as the request's DB time."""
+    return await run_timed(db_elapsed.get(), fn, *args, **kwargs)
+
+
+def _with_read_connection(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    with read_connection() as conn:
+        return fn(conn, *args, **kwargs)
+
+
+async def run_read(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await `fn(conn, *args, **kwargs)` with a pooled read connection on the database executor."""
+    return await run_db(_with_read_connection, fn, *args, **kwargs)
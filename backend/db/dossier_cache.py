@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, ContextManager
+
+from backend.db.dossier_codec import EvidenceView, decompress_dossier, dossier_view, dumps, loads
+
+# Decoded dossiers are kept alongside the blob; count them at a multiple of the JSON size.
+PARSED_SIZE_FACTOR = 4
+
+
+class CachedDossier:
+    """A stored dossier blob; it is decoded, and each evidence view encoded, on first use."""
+
+    __slots__ = ("project_id", "updated_at", "blob", "codec", "etag", "checked_at", "packed", "bodies", "size")
+
+    def __init__(self, project_id: str, updated_at: str, blob: bytes, codec: str, checked_at: float):
+        self.project_id = project_id
+        self.updated_at = updated_at
+        self.blob = blob
+        self.codec = codec
+        self.etag = f'"{hashlib.blake2b(blob, digest_size=12).hexdigest()}"'
+        self.checked_at = checked_at
+        self.packed: Any = None
+        self.bodies: dict[str, bytes] = {}
+        self.size = len(blob)
+
+    def view_etag(self, evidence: EvidenceView = "full") -> str:
+        return self.etag if evidence == "full" else f'{self.etag[:-1]}-{evidence}"'
+
+
+class DossierCache:
+    """LRU read-through cache of stored dossiers keyed by project_id.
+
+    Entries younger than `revalidate_after` seconds are served without touching SQLite; older
+    ones are revalidated with a primary-key lookup of dossiers.updated_at and reloaded only
+    when it moved.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, revalidate_after: float = 2.0):
+        self.max_bytes = max_bytes
+        self.revalidate_after = revalidate_after
+        self._entries: OrderedDict[str, CachedDossier] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+
+    def peek(self, project_id: str) -> CachedDossier | None:
+        """Return the entry only if it is fresh enough to serve without a DB round trip."""
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if entry and time.monotonic() - entry.checked_at < self.revalidate_after:
+                self._entries.move_to_end(project_id)
+                self.hits += 1
+                return entry
+        return None
+
+    def get(
+        self, project_id: str, connection: Callable[[], ContextManager[sqlite3.Connection]]
+    ) -> CachedDossier | None:
+        """Serve from cache, revalidating through a connection borrowed from `connection()`."""
+        entry = self.peek(project_id)
+        if entry:
+            return entry
+
+        with connection() as conn:
+            row = conn.execute("SELECT updated_at FROM dossiers WHERE project_id=?", (project_id,)).fetchone()
+            if not row:
+                self.invalidate(project_id)
+                return None
+            now = time.monotonic()
+            with self._lock:
+                entry = self._entries.get(project_id)
+                if entry and entry.updated_at == row[0]:
+                    entry.checked_at = now
+                    self._entries.move_to_end(project_id)
+                    self.revalidations += 1
+                    return entry
+
+            row = conn.execute("SELECT dossier, codec, updated_at FROM dossiers WHERE project_id=?", (project_id,)).fetchone()
+            if not row:
+                self.invalidate(project_id)
+                return None
+            entry = CachedDossier(project_id, row[2], row[0], row[1], now)
+
+        with self._lock:
+            self.loads += 1
+            self._put(entry)
+        return entry
+
+    def parsed(self, entry: CachedDossier, evidence: EvidenceView = "full") -> Any:
+        """The dossier as a client sees it, decoding the entry once (charged against the memory bound)."""
+        if entry.packed is None:
+            raw = decompress_dossier(entry.blob, entry.codec)
+            data = loads(raw)
+            with self._lock:
+                if entry.packed is None:
+                    entry.packed = data
+                    self._grow(entry, len(raw) * PARSED_SIZE_FACTOR)
+        return dossier_view(entry.packed, evidence)
+
+    def body(self, entry: CachedDossier, evidence: EvidenceView = "full") -> bytes:
+        """JSON response body for one evidence view, encoded once per entry."""
+        body = entry.bodies.get(evidence)
+        if body is None:
+            body = dumps(self.parsed(entry, evidence))
+            with self._lock:
+                if evidence not in entry.bodies:
+                    entry.bodies[evidence] = body
+                    self._grow(entry, len(body))
+        return body
+
+    def invalidate(self, project_id: str | None = None) -> None:
+        with self._lock:
+            if project_id is None:
+                self._entries.clear()
+                self._bytes = 0
+            else:
+                old = self._entries.pop(project_id, None)
+                if old:
+                    self._bytes -= old.size
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "loads": self.loads,
+            }
+
+    def _put(self, entry: CachedDossier) -> None:
+        old = self._entries.pop(entry.project_id, None)
+        if old:
+            self._bytes -= old.size
+        self._entries[entry.project_id] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def _grow(self, entry: CachedDossier, added: int) -> None:
+        if self._entries.get(entry.project_id) is entry:
+            self._bytes += added
+        entry.size += added
+        self._evict()
+
+    def _evict(self) -> None:
+        # Always keep the most recent entry, even if it alone exceeds the bound.
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.size
+
+
+dossier_cache = DossierCache(
+    max_bytes=int(os.getenv("DOSSIER_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    revalidate_after=float(os.getenv("DOSSIER_CACHE_REVALIDATE_SECONDS", "2")),
+)
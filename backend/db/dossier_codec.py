@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any, Literal
+
+try:
+    import orjson
+except ImportError:  # Plain json writes the same documents, only slower.
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # Only needed to read zstd blobs written by older builds; new blobs are zlib.
+    zstandard = None
+
+# Per-trigger evidence lists; triggers of one project mostly carry the same ones.
+EVIDENCE_LISTS = ("field_notes", "change_orders", "rfis", "labor_samples")
+SHARED_KEY = "shared_evidence"
+ZLIB_LEVEL = 6
+
+# full: evidence inline, as assembled. refs: lists as {"$ref": i} into shared_evidence. none: no evidence.
+EvidenceView = Literal["full", "refs", "none"]
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def pack_dossier(dossier: dict[str, Any]) -> dict[str, Any]:
+    """Replace each issue's evidence lists with references into one list of distinct lists."""
+    if not dossier.get("issues"):
+        return dossier
+    shared: list[Any] = []
+    seen: dict[bytes, int] = {}
+    issues = []
+    for issue in dossier["issues"]:
+        evidence = issue.get("evidence")
+        if evidence:
+            evidence = dict(evidence)
+            for key in EVIDENCE_LISTS:
+                if key in evidence:
+                    ref = seen.setdefault(dumps(evidence[key]), len(shared))
+                    if ref == len(shared):
+                        shared.append(evidence[key])
+                    evidence[key] = {"$ref": ref}
+            issue = {**issue, "evidence": evidence}
+        issues.append(issue)
+    return {**dossier, "issues": issues, SHARED_KEY: shared}
+
+
+def dossier_view(packed: dict[str, Any], evidence: EvidenceView = "full") -> dict[str, Any]:
+    """A packed dossier as a client sees it; only the issues are copied, never the evidence rows."""
+    if SHARED_KEY not in packed or evidence == "refs":
+        return packed
+    shared = packed[SHARED_KEY]
+    issues = []
+    for issue in packed["issues"]:
+        issue = dict(issue)
+        if evidence == "none":
+            issue.pop("evidence", None)
+        elif issue.get("evidence"):
+            issue["evidence"] = {
+                k: shared[v["$ref"]] if k in EVIDENCE_LISTS and isinstance(v, dict) else v
+                for k, v in issue["evidence"].items()
+            }
+        issues.append(issue)
+    return {k: issues if k == "issues" else v for k, v in packed.items() if k != SHARED_KEY}
+
+
+def encode_dossier(dossier: dict[str, Any]) -> tuple[bytes, str]:
+    """Pack, serialize and compress a dossier for the dossiers table; returns (blob, codec).
+
+    Always zlib, so a database built on any host reads back on every other one.
+    """
+    return zlib.compress(dumps(pack_dossier(dossier)), ZLIB_LEVEL), "zlib"
+
+
+def decompress_dossier(blob: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.decompress(blob)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Dossier stored with zstd but the zstandard package is not installed")
+        return zstandard.ZstdDecompressor().decompress(blob)
+    raise ValueError(f"Unknown dossier codec: {codec}")
+
+
+def loads(raw: bytes) -> Any:
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def decode_dossier(blob: bytes, codec: str) -> dict[str, Any]:
+    """The packed dossier; pass it through dossier_view for what a client sees."""
+    return loads(decompress_dossier(blob, codec))
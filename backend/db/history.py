@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+from datetime import date
+from pathlib import Path
+from typing import Any
+
+from backend.db.connection import ConnectionPool
+from backend.db.slow_queries import slow_query_log
+
+# Kept outside hvac.db, which seed_db deletes and rebuilds from the CSVs.
+HISTORY_DB_PATH = Path(os.getenv("HVAC_HISTORY_DB", str(Path(__file__).resolve().parents[1] / "history.db")))
+
+PROJECT_SNAPSHOT_COLUMNS = (
+    "contract_value",
+    "total_estimated_cost",
+    "total_actual_cost",
+    "realized_margin_pct",
+    "margin_erosion_pct",
+    "pending_co_exposure",
+    "billing_lag",
+    "open_rfis",
+    "overdue_rfis",
+    "exceedance_lines",
+    "health_score",
+    "status",
+)
+LINE_SNAPSHOT_COLUMNS = (
+    "actual_labor_cost",
+    "actual_material_cost",
+    "billing_total",
+    "rejected_co_exposure",
+    "overrun_amount",
+    "overrun_pct",
+)
+
+# One row per key per run date; the primary keys cluster each trend into a single range read.
+HISTORY_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS history.project_snapshots (
+  project_id TEXT NOT NULL,
+  run_date TEXT NOT NULL,
+  {", ".join(PROJECT_SNAPSHOT_COLUMNS)},
+  PRIMARY KEY(project_id, run_date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS history.sov_line_snapshots (
+  project_id TEXT NOT NULL,
+  sov_line_id TEXT NOT NULL,
+  run_date TEXT NOT NULL,
+  {", ".join(LINE_SNAPSHOT_COLUMNS)},
+  PRIMARY KEY(project_id, sov_line_id, run_date)
+) WITHOUT ROWID;
+"""
+
+# One row per stage per compute run, plus a "total" row; started_at orders runs.
+# Only the newest PIPELINE_RUNS_KEPT runs are kept.
+PIPELINE_RUNS_KEPT = int(os.getenv("PIPELINE_RUNS_KEPT", "1000"))
+PIPELINE_STAGE_COLUMNS = ("seconds", "rows_written", "statements", "vm_steps", "peak_rss_mb")
+PIPELINE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+  run_id TEXT NOT NULL,
+  stage TEXT NOT NULL,
+  stage_order INTEGER NOT NULL,
+  started_at TEXT NOT NULL,
+  mode TEXT NOT NULL,
+  {", ".join(PIPELINE_STAGE_COLUMNS)},
+  PRIMARY KEY(run_id, stage)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_started ON pipeline_runs(started_at, run_id);
+"""
+
+
+def record_snapshot(conn: sqlite3.Connection, run_date: str | None = None, history_path: Path = HISTORY_DB_PATH) -> str:
+    """Copy the current computed metrics into the history database under `run_date` (default today).
+
+    A second run on the same date replaces that date's rows; earlier dates are never touched.
+    The history database is attached to `conn`, so it must have no open transaction: snapshot
+    committed metrics, never a caller's half-done work.
+    """
+    if conn.in_transaction:
+        raise ValueError("record_snapshot needs a connection with no open transaction; commit or roll back first")
+    run_date = run_date or date.today().isoformat()
+    conn.execute("ATTACH DATABASE ? AS history", (str(history_path),))
+    try:
+        conn.executescript(HISTORY_SCHEMA)
+        project_cols = ", ".join(PROJECT_SNAPSHOT_COLUMNS)
+        line_cols = ", ".join(LINE_SNAPSHOT_COLUMNS)
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO history.project_snapshots (project_id, run_date, {project_cols})
+            SELECT project_id, ?, {project_cols} FROM computed_project_metrics
+            """,
+            (run_date,),
+        )
+        conn.execute(
+            f"""
+            INSERT OR REPLACE INTO history.sov_line_snapshots (project_id, sov_line_id, run_date, {line_cols})
+            SELECT project_id, sov_line_id, ?, {line_cols} FROM computed_sov_metrics
+            """,
+            (run_date,),
+        )
+        conn.commit()
+    finally:
+        conn.execute("DETACH DATABASE history")
+    return run_date
+
+
+def record_pipeline_run(
+    run: dict[str, Any], history_path: Path = HISTORY_DB_PATH, keep: int = PIPELINE_RUNS_KEPT
+) -> None:
+    """Append a compute run's telemetry (see backend.compute.telemetry) to pipeline_runs.
+
+    Writes through its own connection to the history database, then drops runs older than
+    the newest `keep`.
+    """
+    conn = sqlite3.connect(history_path, timeout=5)
+    try:
+        conn.executescript(PIPELINE_SCHEMA)
+        conn.executemany(
+            f"""
+            INSERT OR REPLACE INTO pipeline_runs (run_id, stage, stage_order, started_at, mode, {", ".join(PIPELINE_STAGE_COLUMNS)})
+            VALUES (?, ?, ?, ?, ?, {", ".join("?" * len(PIPELINE_STAGE_COLUMNS))})
+            """,
+            [
+                (run["run_id"], stage["stage"], order, run["started_at"], run["mode"], *(stage[c] for c in PIPELINE_STAGE_COLUMNS))
+                for order, stage in enumerate([*run["stages"], {**run, "stage": "total"}])
+            ],
+        )
+        conn.execute(
+            """
+            DELETE FROM pipeline_runs WHERE started_at < (
+              SELECT started_at FROM pipeline_runs WHERE stage = 'total'
+              ORDER BY started_at DESC LIMIT 1 OFFSET ?
+            )
+            """,
+            (max(keep, 1) - 1,),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def pipeline_runs(conn: sqlite3.Connection, limit: int = 20, mode: str | None = None) -> list[dict[str, Any]]:
+    """The latest compute runs, newest first, each with its stages in the order they ran."""
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT p.* FROM pipeline_runs p
+            JOIN (
+              SELECT run_id FROM pipeline_runs
+              WHERE stage = 'total' {"AND mode = ?" if mode else ""}
+              ORDER BY started_at DESC LIMIT ?
+            ) latest USING (run_id)
+            ORDER BY p.started_at DESC, p.run_id, p.stage_order
+            """,
+            (*([mode] if mode else []), limit),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # No run has been recorded yet.
+        return []
+    runs: dict[str, dict[str, Any]] = {}
+    for r in rows:
+        run = runs.setdefault(r["run_id"], {"run_id": r["run_id"], "started_at": r["started_at"], "mode": r["mode"], "stages": []})
+        stats = {c: r[c] for c in PIPELINE_STAGE_COLUMNS}
+        if r["stage"] == "total":
+            run.update(stats)
+        else:
+            run["stages"].append({"stage": r["stage"], **stats})
+    return list(runs.values())
+
+
+def project_trend(
+    conn: sqlite3.Connection,
+    project_id: str,
+    start: str | None = None,
+    end: str | None = None,
+    sov_line_id: str | None = None,
+) -> list[dict[str, Any]]:
+    """Snapshots for a project (or one of its SOV lines) between two ISO dates, oldest first."""
+    if sov_line_id:
+        table, cols, key, params = "sov_line_snapshots", LINE_SNAPSHOT_COLUMNS, "project_id=? AND sov_line_id=?", [project_id, sov_line_id]
+    else:
+        table, cols, key, params = "project_snapshots", PROJECT_SNAPSHOT_COLUMNS, "project_id=?", [project_id]
+    try:
+        rows = conn.execute(
+            f"""
+            SELECT run_date, {", ".join(cols)} FROM {table}
+            WHERE {key} AND run_date BETWEEN ? AND ?
+            ORDER BY run_date
+            """,
+            (*params, start or "0000-00-00", end or "9999-99-99"),
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # No snapshot has been recorded yet.
+        return []
+    return [dict(r) for r in rows]
+
+
+history_pool = ConnectionPool(HISTORY_DB_PATH, size=int(os.getenv("HISTORY_POOL_SIZE", "2")), slow_queries=slow_query_log)
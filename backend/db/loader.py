@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import csv
+import sqlite3
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+CHUNK_SIZE = 50_000
+
+
+def split_schema(sql: str) -> tuple[str, str]:
+    """Split schema DDL into (tables, indexes) so indexes can be built after a bulk load."""
+    tables, indexes = [], []
+    for stmt in sql.split(";"):
+        # Classify on the first line that is not a "--" comment; the comment stays with its statement.
+        code = [line for line in stmt.splitlines() if line.strip() and not line.strip().startswith("--")]
+        if not code:
+            continue
+        stmt = stmt.strip()
+        head = " ".join(" ".join(code).split()[:3]).upper()
+        (indexes if head.startswith(("CREATE INDEX", "CREATE UNIQUE INDEX")) else tables).append(stmt + ";")
+    return "\n".join(tables), "\n".join(indexes)
+
+
+def _to_real(value: str) -> Any:
+    if value == "":
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _to_int(value: str) -> Any:
+    if value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        num = _to_real(value)
+        return int(num) if isinstance(num, float) and num.is_integer() else num
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def column_converters(conn: sqlite3.Connection, table: str) -> dict[str, Callable[[Any], Any]]:
+    """Map each column of `table` to a converter for its declared type affinity."""
+    out: dict[str, Callable[[Any], Any]] = {}
+    for _, name, decl_type, *_ in conn.execute(f"PRAGMA table_info({table})").fetchall():
+        decl = (decl_type or "").upper()
+        if "INT" in decl:
+            out[name] = _to_int
+        elif any(t in decl for t in ("REAL", "FLOA", "DOUB")):
+            out[name] = _to_real
+        else:
+            out[name] = _identity
+    return out
+
+
+def iter_typed_rows(
+    rows: Iterable[list[Any]], cols: list[str], converters: dict[str, Callable[[Any], Any]]
+) -> Iterator[list[Any]]:
+    """Convert positional rows in place; TEXT columns are passed through untouched.
+
+    Ragged rows are padded with None or truncated to the header width, as csv.DictReader does.
+    """
+    width = len(cols)
+    typed = [(i, converters[c]) for i, c in enumerate(cols) if converters.get(c, _identity) is not _identity]
+    for row in rows:
+        if len(row) != width:
+            row = (list(row) + [None] * width)[:width]
+        for i, func in typed:
+            if row[i] is not None:
+                row[i] = func(row[i])
+        yield row
+
+
+def insert_chunks(
+    conn: sqlite3.Connection, sql: str, rows: Iterator[tuple[Any, ...]], chunk_size: int = CHUNK_SIZE
+) -> int:
+    total = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return total
+        conn.executemany(sql, chunk)
+        total += len(chunk)
+
+
+def load_csv(conn: sqlite3.Connection, table: str, path: Path, chunk_size: int = CHUNK_SIZE) -> int:
+    """Stream a CSV into `table` in fixed-size chunks, converting values to the declared column types."""
+    converters = column_converters(conn, table)
+    with path.open("r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        cols = next(reader, [])
+        sql = f"INSERT INTO {table} ({','.join(cols)}) VALUES ({','.join(['?'] * len(cols))})"
+        return insert_chunks(conn, sql, iter_typed_rows(reader, cols, converters), chunk_size)
+
+
+def number_duplicate_ids(conn: sqlite3.Connection, table: str, column: str) -> int:
+    """Suffix repeated IDs with #2, #3, ... in load order so `column` can be a unique key.
+
+    The rows themselves are kept; returns how many were renamed.
+    """
+    return conn.execute(
+        f"""
+        WITH numbered AS (
+          SELECT rowid AS rid, ROW_NUMBER() OVER (PARTITION BY {column} ORDER BY rowid) AS n
+          FROM {table} WHERE {column} IS NOT NULL
+        )
+        UPDATE {table} SET {column} = {column} || '#' || numbered.n
+        FROM numbered WHERE {table}.rowid = numbered.rid AND numbered.n > 1
+        """
+    ).rowcount
+
+
+@contextmanager
+def bulk_load(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Trade durability for load speed; only safe on a database that is rebuilt from source on failure."""
+    conn.commit()
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA cache_size = -65536")
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.execute("PRAGMA journal_mode = DELETE")
@@ -122,6 +122,25 @@ CREATE TABLE IF NOT EXISTS change_orders (
   FOREIGN KEY(project_id) REFERENCES contracts(project_id)
 );
 
+-- change_orders.affected_sov_lines parsed once at load, with the amount split evenly across the listed lines.
+CREATE TABLE IF NOT EXISTS change_order_sov_lines (
+  project_id TEXT NOT NULL,
+  co_number TEXT NOT NULL,
+  sov_line_id TEXT NOT NULL,
+  allocated_amount REAL,
+  PRIMARY KEY(project_id, co_number, sov_line_id),
+  FOREIGN KEY(project_id, co_number) REFERENCES change_orders(project_id, co_number) ON DELETE CASCADE
+);
+
+-- Change orders whose affected_sov_lines could not be mapped (malformed, empty or unknown lines).
+CREATE TABLE IF NOT EXISTS change_order_sov_line_issues (
+  project_id TEXT NOT NULL,
+  co_number TEXT NOT NULL,
+  issue TEXT NOT NULL,
+  sov_line_id TEXT,
+  raw_value TEXT
+);
+
 CREATE TABLE IF NOT EXISTS rfis (
   project_id TEXT,
   rfi_number TEXT,
@@ -174,6 +193,7 @@ CREATE TABLE IF NOT EXISTS computed_sov_metrics (
   material_variance_pct REAL,
   overrun_amount REAL,
   overrun_pct REAL,
+  actual_ot_premium REAL DEFAULT 0,
   PRIMARY KEY(project_id, sov_line_id)
 );
 
@@ -198,7 +218,8 @@ CREATE TABLE IF NOT EXISTS computed_project_metrics (
   health_score REAL,
   status TEXT,
   exceedance_lines INTEGER,
-  total_lines INTEGER
+  total_lines INTEGER,
+  ot_premium REAL DEFAULT 0
 );
 
 CREATE TABLE IF NOT EXISTS triggers (
@@ -213,15 +234,97 @@ CREATE TABLE IF NOT EXISTS triggers (
   affected_sov_lines TEXT
 );
 
+-- Earned value and cost-to-complete forecast per SOV line as of the project's status date.
+CREATE TABLE IF NOT EXISTS computed_sov_forecasts (
+  project_id TEXT NOT NULL,
+  sov_line_id TEXT NOT NULL,
+  status_date TEXT,
+  pct_complete REAL,
+  planned_pct_complete REAL,
+  budget_at_completion REAL,
+  earned_value REAL,
+  planned_value REAL,
+  actual_cost REAL,
+  cpi REAL,
+  spi REAL,
+  labor_burn_rate REAL,
+  remaining_days REAL,
+  estimate_to_complete REAL,
+  estimate_at_completion REAL,
+  variance_at_completion REAL,
+  projected_margin_pct REAL,
+  PRIMARY KEY(project_id, sov_line_id)
+);
+
+CREATE TABLE IF NOT EXISTS computed_project_forecasts (
+  project_id TEXT PRIMARY KEY,
+  status_date TEXT,
+  contract_value REAL,
+  budget_at_completion REAL,
+  earned_value REAL,
+  planned_value REAL,
+  actual_cost REAL,
+  cpi REAL,
+  spi REAL,
+  labor_burn_rate REAL,
+  estimate_at_completion REAL,
+  variance_at_completion REAL,
+  projected_margin_pct REAL
+);
+
+-- Running totals per SOV line on each day with activity, so any as_of date resolves with one seek per line.
+CREATE TABLE IF NOT EXISTS line_daily_totals (
+  project_id TEXT NOT NULL,
+  sov_line_id TEXT NOT NULL,
+  day TEXT NOT NULL,
+  labor_cost REAL NOT NULL,
+  material_cost REAL NOT NULL,
+  ot_premium REAL NOT NULL DEFAULT 0,
+  billed_max REAL,
+  PRIMARY KEY(project_id, sov_line_id, day)
+) WITHOUT ROWID;
+
+-- Per-project trigger thresholds, project_id '*' applies to every project. Rules fall back to their defaults.
+CREATE TABLE IF NOT EXISTS trigger_thresholds (
+  project_id TEXT NOT NULL,
+  type TEXT NOT NULL,
+  threshold REAL NOT NULL,
+  PRIMARY KEY(project_id, type)
+);
+
+CREATE TABLE IF NOT EXISTS compute_watermarks (
+  table_name TEXT PRIMARY KEY,
+  last_rowid INTEGER NOT NULL,
+  updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS compute_dirty_lines (
+  project_id TEXT,
+  sov_line_id TEXT,
+  PRIMARY KEY(project_id, sov_line_id)
+);
+
+-- Compressed JSON with evidence shared by reference, see backend/db/dossier_codec.py.
 CREATE TABLE IF NOT EXISTS dossiers (
   project_id TEXT PRIMARY KEY,
-  dossier_json TEXT NOT NULL,
+  dossier BLOB NOT NULL,
+  codec TEXT NOT NULL,
   updated_at TEXT DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX IF NOT EXISTS idx_labor_project_date ON labor_logs(project_id, date);
-CREATE INDEX IF NOT EXISTS idx_labor_sov ON labor_logs(sov_line_id);
+-- Covering indexes keyed on (project_id, sov_line_id): each line's rows are one range seek and the
+-- cost columns the compute stages and labor detail totals read come straight from the index.
+CREATE INDEX IF NOT EXISTS idx_labor_line_cost ON labor_logs(project_id, sov_line_id, date, hours_st, hours_ot, hourly_rate, burden_multiplier);
 CREATE INDEX IF NOT EXISTS idx_mat_project_date ON material_deliveries(project_id, date);
+CREATE INDEX IF NOT EXISTS idx_mat_line_cost ON material_deliveries(project_id, sov_line_id, date, total_cost);
+CREATE INDEX IF NOT EXISTS idx_billing_items_line ON billing_line_items(project_id, sov_line_id, application_number, total_billed, pct_complete);
+CREATE INDEX IF NOT EXISTS idx_co_project_status ON change_orders(project_id, status, date_submitted, amount);
+CREATE INDEX IF NOT EXISTS idx_co_related_rfi ON change_orders(project_id, related_rfi, date_submitted);
+-- Natural keys that delta ingest matches replaced rows on.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_labor_log_id ON labor_logs(log_id);
+CREATE INDEX IF NOT EXISTS idx_mat_delivery_id ON material_deliveries(delivery_id);
+CREATE INDEX IF NOT EXISTS idx_field_note_id ON field_notes(note_id);
 CREATE INDEX IF NOT EXISTS idx_billing_project ON billing_history(project_id, application_number);
 CREATE INDEX IF NOT EXISTS idx_rfi_project ON rfis(project_id, date_submitted);
 CREATE INDEX IF NOT EXISTS idx_field_project ON field_notes(project_id, date);
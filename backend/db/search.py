@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+
+FTS_TABLE = "field_notes_fts"
+
+# The trigram tokenizer matches case-insensitive substrings, as the LIKE fallback does, so
+# "insul" finds "insulation" either way. It needs SQLite 3.34 and terms of 3+ characters.
+FTS_TOKENIZER = "trigram"
+TRIGRAM_MIN_CHARS = 3
+
+# External-content FTS5 index over field_notes.content, kept in step by triggers so every
+# write path (seed, delta ingest, ad-hoc SQL) updates it without extra code.
+FIELD_NOTES_FTS_SQL = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+  content, content='field_notes', content_rowid='rowid', tokenize='{FTS_TOKENIZER}'
+);
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON field_notes BEGIN
+  INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON field_notes BEGIN
+  INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF content ON field_notes BEGIN
+  INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content) VALUES ('delete', old.rowid, old.content);
+  INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.rowid, new.content);
+END;
+"""
+
+_TERM = re.compile(r'"([^"]*)"|(\S+)')
+# A prefix term (insul*) must start a word: the start of the text or right after one of these.
+WORD_BREAKS = (" ", "\n", "\t", "(", "/", "-", '"', "'")
+
+
+def fts5_available(conn: sqlite3.Connection) -> bool:
+    if sqlite3.sqlite_version_info < (3, 34, 0):  # First release with the trigram tokenizer.
+        return False
+    return any(row[0] == "ENABLE_FTS5" for row in conn.execute("PRAGMA compile_options"))
+
+
+def _index_sql(conn: sqlite3.Connection) -> str | None:
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (FTS_TABLE,)).fetchone()
+    return row[0] if row else None
+
+
+def has_field_notes_index(conn: sqlite3.Connection) -> bool:
+    return _index_sql(conn) is not None
+
+
+def ensure_field_notes_index(conn: sqlite3.Connection) -> bool:
+    """Create the index and its sync triggers, populating it from existing rows. False without FTS5.
+
+    An index built with another tokenizer is dropped and rebuilt.
+    """
+    if not fts5_available(conn):
+        return False
+    sql = _index_sql(conn)
+    existed = sql is not None and FTS_TOKENIZER in sql
+    if sql is not None and not existed:
+        conn.execute(f"DROP TABLE {FTS_TABLE}")
+    conn.executescript(FIELD_NOTES_FTS_SQL)
+    if not existed:
+        rebuild_field_notes_index(conn)
+    return True
+
+
+def rebuild_field_notes_index(conn: sqlite3.Connection) -> None:
+    conn.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def parse_terms(keyword: str) -> list[tuple[str, bool, bool]]:
+    """Split a keyword string into (text, is_phrase, is_prefix) terms.
+
+    `"pressure test"` is a phrase, `insul*` a prefix, anything else a plain term.
+    """
+    terms = []
+    for phrase, word in _TERM.findall(keyword):
+        if phrase.strip():
+            terms.append((phrase.strip(), True, False))
+        elif word:
+            prefix = word.endswith("*")
+            word = word.rstrip("*")
+            if word:
+                terms.append((word, False, prefix))
+    return terms
+
+
+def like_escape(text: str) -> str:
+    return re.sub(r"([\\%_])", r"\\\1", text)
+
+
+def word_start_filter(column: str, text: str) -> tuple[str, list[str]]:
+    """SQL that holds when a word in `column` starts with `text` (case-insensitive, like LIKE)."""
+    pattern = like_escape(text) + "%"
+    params = [pattern, *(f"%{brk}{pattern}" for brk in WORD_BREAKS)]
+    return "(" + " OR ".join([f"{column} LIKE ? ESCAPE '\\'"] * len(params)) + ")", params
+
+
+def fts_can_match(terms: list[tuple[str, bool, bool]]) -> bool:
+    """Whether the trigram index can answer every term; shorter terms match no rows there."""
+    return all(len(text) >= TRIGRAM_MIN_CHARS for text, _, _ in terms)
+
+
+def to_fts_query(terms: list[tuple[str, bool, bool]]) -> str:
+    # Every term is quoted so punctuation and FTS operators in user input are matched literally.
+    # Trigrams match anywhere in a word; callers check prefix terms with word_start_filter.
+    return " ".join('"' + text.replace('"', '""') + '"' for text, _, _ in terms)
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Statements at least this slow are logged; a negative SLOW_QUERY_MS turns the log off.
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_MS", "250")) / 1000
+MAX_SQL_CHARS = 1000
+
+
+class StatementTimer:
+    """Trace callback for one connection that times each statement until the next one starts."""
+
+    __slots__ = ("log", "sql", "start")
+
+    def __init__(self, log: SlowQueryLog):
+        self.log = log
+        self.sql: str | None = None
+        self.start = 0.0
+
+    def __call__(self, sql: str) -> None:
+        now = time.perf_counter()
+        self.flush(now)
+        self.sql, self.start = sql, now
+
+    def flush(self, now: float | None = None) -> None:
+        if self.sql is None:
+            return
+        elapsed = (time.perf_counter() if now is None else now) - self.start
+        sql, self.sql = self.sql, None
+        if elapsed >= self.log.threshold:
+            self.log.record(sql, elapsed)
+
+
+class SlowQueryLog:
+    """Statements slower than `threshold` seconds, seen through sqlite3 trace callbacks.
+
+    SQLite's trace hook fires when a statement starts, so a statement is timed until the next
+    statement on the same connection or until flush() (the pool flushes on checkin). That span
+    includes fetching the rows, which is where a SELECT does most of its work, and any Python
+    work the caller does between statements.
+    """
+
+    def __init__(self, threshold: float = SLOW_QUERY_SECONDS, history: int = 100):
+        self.threshold = threshold
+        self._recent: deque[dict[str, Any]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._seconds = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold >= 0
+
+    def watch(self, conn: sqlite3.Connection) -> StatementTimer | None:
+        """Time every statement `conn` runs from now on; flush the returned timer when done."""
+        if not self.enabled:
+            return None
+        timer = StatementTimer(self)
+        conn.set_trace_callback(timer)
+        return timer
+
+    def record(self, sql: str, seconds: float) -> None:
+        sql = re.sub(r"\s+", " ", sql).strip()[:MAX_SQL_CHARS]
+        with self._lock:
+            self._count += 1
+            self._seconds += seconds
+            self._recent.append({"ms": round(seconds * 1000, 3), "sql": sql, "at": time.time()})
+        logger.warning("slow query (%.1f ms): %s", seconds * 1000, sql)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "threshold_ms": self.threshold * 1000 if self.enabled else None,
+                "count": self._count,
+                "seconds": self._seconds,
+                "recent": list(self._recent),
+            }
+
+
+slow_query_log = SlowQueryLog()
@@ -1,15 +1,46 @@
 from __future__ import annotations
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
+from backend.db.connection import read_pool
+from backend.db.slow_queries import slow_query_log
 from backend.routes.chat import router as chat_router
 from backend.routes.dossier import router as dossier_router
 from backend.routes.email import router as email_router
+from backend.routes.ingest import router as ingest_router
+from backend.routes.metrics import RequestMetricsMiddleware, TimedJSONResponse, render_metrics
+from backend.routes.pipeline import router as pipeline_router
 from backend.routes.portfolio import router as portfolio_router
+from backend.routes.prometheus import PROMETHEUS_CONTENT_TYPE
+from backend.routes.risk import router as risk_router
 from backend.routes.tools import router as tools_router
+from backend.routes.trend import router as trend_router
+from backend.tools.email_outbox import email_outbox
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    yield
+    try:
+        await email_outbox.drain(timeout=30)
+    except asyncio.TimeoutError:
+        pass
+    from backend.tools.margin_risk import shutdown_pool
+
+    shutdown_pool()
+
 
-app = FastAPI(title="HVAC Margin Rescue Agent API", version="1.0.0")
+app = FastAPI(
+    title="HVAC Margin Rescue Agent API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=TimedJSONResponse,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +49,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it wraps CORS too and times the whole request.
+app.add_middleware(RequestMetricsMiddleware)
 
 
 @app.get("/health")
@@ -25,8 +58,22 @@ def health():
     return {"ok": True}
 
 
+@app.get("/health/db")
+def health_db():
+    return {"ok": True, "pool": read_pool.stats(), "slow_queries": slow_query_log.stats()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 app.include_router(portfolio_router)
 app.include_router(dossier_router)
 app.include_router(chat_router)
 app.include_router(email_router)
 app.include_router(tools_router)
+app.include_router(ingest_router)
+app.include_router(trend_router)
+app.include_router(risk_router)
+app.include_router(pipeline_router)
@@ -4,19 +4,26 @@ import json
 import sqlite3
 from typing import Any
 
-from .evidence_puller import pull_evidence_for_trigger
+from backend.db.dossier_codec import encode_dossier
+
+from .evidence_puller import pull_evidence_for_triggers
 from .reasoning_engine import generate_reasoning_from_evidence
 
 
-def build_project_dossier(conn: sqlite3.Connection, project_id: str) -> dict[str, Any]:
+def assemble_project_dossier(conn: sqlite3.Connection, project_id: str, as_of: str | None = None) -> dict[str, Any]:
+    """Read-only half of build_project_dossier; safe to run on a worker's own connection.
+
+    as_of limits the evidence to rows dated on or before that day.
+    """
     p = conn.execute("SELECT * FROM computed_project_metrics WHERE project_id=?", (project_id,)).fetchone()
     if not p:
         return {}
 
     trigger_rows = conn.execute("SELECT * FROM triggers WHERE project_id=? ORDER BY date", (project_id,)).fetchall()
+    evidence_by_trigger = pull_evidence_for_triggers(conn, project_id, [t[0] for t in trigger_rows], as_of)
     trigger_payload = []
     for t in trigger_rows:
-        evidence = pull_evidence_for_trigger(conn, t[0])
+        evidence = evidence_by_trigger.get(t[0], {})
         reasoning = generate_reasoning_from_evidence(evidence)
         trigger_payload.append(
             {
@@ -58,8 +65,19 @@ def build_project_dossier(conn: sqlite3.Connection, project_id: str) -> dict[str
         },
     }
 
+    return dossier
+
+
+def store_dossier(conn: sqlite3.Connection, project_id: str, blob: bytes, codec: str) -> None:
+    """Upsert a dossier encoded by encode_dossier."""
     conn.execute(
-        "INSERT INTO dossiers(project_id, dossier_json) VALUES(?, ?) ON CONFLICT(project_id) DO UPDATE SET dossier_json=excluded.dossier_json, updated_at=CURRENT_TIMESTAMP",
-        (project_id, json.dumps(dossier)),
+        "INSERT INTO dossiers(project_id, dossier, codec, updated_at) VALUES(?, ?, ?, strftime('%Y-%m-%d %H:%M:%f', 'now')) ON CONFLICT(project_id) DO UPDATE SET dossier=excluded.dossier, codec=excluded.codec, updated_at=excluded.updated_at",
+        (project_id, blob, codec),
     )
+
+
+def build_project_dossier(conn: sqlite3.Connection, project_id: str) -> dict[str, Any]:
+    dossier = assemble_project_dossier(conn, project_id)
+    if dossier:
+        store_dossier(conn, project_id, *encode_dossier(dossier))
     return dossier
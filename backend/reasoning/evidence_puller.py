@@ -4,46 +4,116 @@ import json
 import sqlite3
 from typing import Any
 
+LABOR_SAMPLE_LIMIT = 50
+# SQLite caps compound SELECTs at 500 terms by default.
+_MAX_UNION_TERMS = 400
 
-def pull_evidence_for_trigger(conn: sqlite3.Connection, trigger_id: str) -> dict[str, Any]:
-    t = conn.execute("SELECT * FROM triggers WHERE trigger_id=?", (trigger_id,)).fetchone()
-    if not t:
-        return {}
-    project_id = t[1]
-    affected = json.loads(t[8] or "[]")
-
-    notes = conn.execute(
-        "SELECT note_id, date, note_type, content FROM field_notes WHERE project_id=? ORDER BY date DESC LIMIT 15",
-        (project_id,),
-    ).fetchall()
-    co_rows = conn.execute(
-        "SELECT co_number, date_submitted, amount, status, description FROM change_orders WHERE project_id=? ORDER BY date_submitted DESC LIMIT 10",
-        (project_id,),
-    ).fetchall()
-    rfi_rows = conn.execute(
-        "SELECT rfi_number, priority, status, subject FROM rfis WHERE project_id=? ORDER BY date_submitted DESC LIMIT 10",
-        (project_id,),
-    ).fetchall()
-    if affected:
-        q_marks = ",".join(["?"] * len(affected))
-        labor = conn.execute(
-            f"SELECT date, sov_line_id, hours_st, hours_ot, hourly_rate FROM labor_logs WHERE project_id=? AND sov_line_id IN ({q_marks}) LIMIT 50",
-            (project_id, *affected),
+
+def _labor_samples_by_line(
+    conn: sqlite3.Connection, project_id: str, lines: list[str], as_of: str | None = None
+) -> dict[str, list[dict[str, Any]]]:
+    """Fetch up to LABOR_SAMPLE_LIMIT rows per SOV line, one statement per batch of lines."""
+    out: dict[str, list[dict[str, Any]]] = {line: [] for line in lines}
+    dated = " AND date <= ?" if as_of else ""
+    arm = (
+        "SELECT * FROM (SELECT date, sov_line_id, hours_st, hours_ot, hourly_rate FROM labor_logs "
+        f"WHERE project_id=? AND sov_line_id=?{dated} LIMIT {LABOR_SAMPLE_LIMIT})"
+    )
+    for start in range(0, len(lines), _MAX_UNION_TERMS):
+        chunk = lines[start : start + _MAX_UNION_TERMS]
+        params: list[str] = []
+        for line in chunk:
+            params.extend([project_id, line, *([as_of] if as_of else [])])
+        for row in conn.execute(" UNION ALL ".join([arm] * len(chunk)), params).fetchall():
+            out[row["sov_line_id"]].append(dict(row))
+    return out
+
+
+def pull_evidence_for_triggers(
+    conn: sqlite3.Connection, project_id: str, trigger_ids: list[str] | None = None, as_of: str | None = None
+) -> dict[str, dict[str, Any]]:
+    """Evidence for many triggers of one project, keyed by trigger_id.
+
+    Field notes, change orders and RFIs are project-level, so they are read once and shared;
+    labor samples for every affected SOV line come back from a single query. With as_of only
+    rows dated (notes, labor) or submitted (COs, RFIs) on or before that day are used.
+    """
+    if trigger_ids is None:
+        triggers = conn.execute(
+            "SELECT trigger_id, type, value, affected_sov_lines FROM triggers WHERE project_id=?", (project_id,)
+        ).fetchall()
+    elif trigger_ids:
+        q_marks = ",".join(["?"] * len(trigger_ids))
+        triggers = conn.execute(
+            f"SELECT trigger_id, type, value, affected_sov_lines FROM triggers WHERE project_id=? AND trigger_id IN ({q_marks})",
+            (project_id, *trigger_ids),
         ).fetchall()
     else:
-        labor = conn.execute(
-            "SELECT date, sov_line_id, hours_st, hours_ot, hourly_rate FROM labor_logs WHERE project_id=? LIMIT 50",
-            (project_id,),
+        triggers = []
+    if not triggers:
+        return {}
+
+    params: tuple[str, ...] = (project_id, as_of) if as_of else (project_id,)
+    dated = " AND date <= ?" if as_of else ""
+    submitted = " AND date_submitted <= ?" if as_of else ""
+    notes = [
+        dict(x)
+        for x in conn.execute(
+            f"SELECT note_id, date, note_type, content FROM field_notes WHERE project_id=?{dated} ORDER BY date DESC LIMIT 15",
+            params,
+        ).fetchall()
+    ]
+    co_rows = [
+        dict(x)
+        for x in conn.execute(
+            f"SELECT co_number, date_submitted, amount, status, description FROM change_orders WHERE project_id=?{submitted} ORDER BY date_submitted DESC LIMIT 10",
+            params,
+        ).fetchall()
+    ]
+    rfi_rows = [
+        dict(x)
+        for x in conn.execute(
+            f"SELECT rfi_number, priority, status, subject FROM rfis WHERE project_id=?{submitted} ORDER BY date_submitted DESC LIMIT 10",
+            params,
         ).fetchall()
+    ]
+
+    affected_by_trigger = {t[0]: json.loads(t[3] or "[]") for t in triggers}
+    lines = sorted({line for affected in affected_by_trigger.values() for line in affected})
+    samples_by_line = _labor_samples_by_line(conn, project_id, lines, as_of) if lines else {}
+    project_samples: list[dict[str, Any]] | None = None
+    if any(not affected for affected in affected_by_trigger.values()):
+        project_samples = [
+            dict(x)
+            for x in conn.execute(
+                f"SELECT date, sov_line_id, hours_st, hours_ot, hourly_rate FROM labor_logs WHERE project_id=?{dated} LIMIT {LABOR_SAMPLE_LIMIT}",
+                params,
+            ).fetchall()
+        ]
+
+    out: dict[str, dict[str, Any]] = {}
+    for trigger_id, trigger_type, trigger_value, _ in triggers:
+        affected = affected_by_trigger[trigger_id]
+        if affected:
+            labor = [row for line in affected for row in samples_by_line.get(line, [])][:LABOR_SAMPLE_LIMIT]
+        else:
+            labor = project_samples or []
+        out[trigger_id] = {
+            "trigger_id": trigger_id,
+            "project_id": project_id,
+            "trigger_type": trigger_type,
+            "trigger_value": trigger_value,
+            "affected_sov_lines": affected,
+            "field_notes": [dict(x) for x in notes],
+            "change_orders": [dict(x) for x in co_rows],
+            "rfis": [dict(x) for x in rfi_rows],
+            "labor_samples": [dict(x) for x in labor],
+        }
+    return out
 
-    return {
-        "trigger_id": trigger_id,
-        "project_id": project_id,
-        "trigger_type": t[3],
-        "trigger_value": t[5],
-        "affected_sov_lines": affected,
-        "field_notes": [dict(x) for x in notes],
-        "change_orders": [dict(x) for x in co_rows],
-        "rfis": [dict(x) for x in rfi_rows],
-        "labor_samples": [dict(x) for x in labor],
-    }
+
+def pull_evidence_for_trigger(conn: sqlite3.Connection, trigger_id: str) -> dict[str, Any]:
+    t = conn.execute("SELECT project_id FROM triggers WHERE trigger_id=?", (trigger_id,)).fetchone()
+    if not t:
+        return {}
+    return pull_evidence_for_triggers(conn, t[0], [trigger_id]).get(trigger_id, {})
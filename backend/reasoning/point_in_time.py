@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+from typing import Any
+
+from backend.compute import compute_point_in_time
+from backend.db.connection import DB_PATH
+from backend.db.slow_queries import slow_query_log
+
+from .dossier_builder import assemble_project_dossier
+from .portfolio_builder import assemble_portfolio
+
+
+def point_in_time_dossier(project_id: str, as_of: str, db_path: Path = DB_PATH) -> dict[str, Any]:
+    """Assemble a project dossier, or the portfolio for project_id="PORTFOLIO", as of a date.
+
+    Metrics and triggers are recomputed into TEMP tables on a private connection and thrown
+    away afterwards; nothing is stored and the dossier cache is not consulted. Evidence is
+    limited to rows dated on or before as_of.
+    """
+    with closing(sqlite3.connect(db_path)) as conn:
+        conn.row_factory = sqlite3.Row
+        timer = slow_query_log.watch(conn)
+        try:
+            # The portfolio ranks every project; a dossier needs only its own.
+            compute_point_in_time(conn, as_of, None if project_id == "PORTFOLIO" else project_id)
+            if project_id == "PORTFOLIO":
+                payload = assemble_portfolio(conn)
+            else:
+                payload = assemble_project_dossier(conn, project_id, as_of)
+        finally:
+            if timer:
+                timer.flush()
+            conn.rollback()
+    if payload:
+        payload["as_of"] = as_of
+    return payload
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
-import json
 import sqlite3
 from typing import Any
 
+from backend.db.dossier_codec import encode_dossier
 
-def build_portfolio(conn: sqlite3.Connection) -> dict[str, Any]:
+from .dossier_builder import store_dossier
+
+
+def assemble_portfolio(conn: sqlite3.Connection) -> dict[str, Any]:
     rows = conn.execute(
         "SELECT project_id, project_name, health_score, status, bid_margin_pct, realized_margin_pct, margin_erosion_pct FROM computed_project_metrics ORDER BY health_score ASC"
     ).fetchall()
@@ -29,9 +32,10 @@ def build_portfolio(conn: sqlite3.Connection) -> dict[str, Any]:
         "projects": projects,
         "red_count": sum(1 for p in projects if p["status"] == "RED"),
     }
+    return payload
+
 
-    conn.execute(
-        "INSERT INTO dossiers(project_id, dossier_json) VALUES('PORTFOLIO', ?) ON CONFLICT(project_id) DO UPDATE SET dossier_json=excluded.dossier_json, updated_at=CURRENT_TIMESTAMP",
-        (json.dumps(payload),),
-    )
+def build_portfolio(conn: sqlite3.Connection) -> dict[str, Any]:
+    payload = assemble_portfolio(conn)
+    store_dossier(conn, "PORTFOLIO", *encode_dossier(payload))
     return payload
@@ -13,6 +13,8 @@ def generate_reasoning_from_evidence(evidence: dict[str, Any]) -> dict[str, Any]
         "PENDING_CO_EXPOSURE": "Revenue risk from unresolved change orders is accumulating against current costs.",
         "BILLING_LAG": "Earned work is not being billed/approved fast enough, creating cash and margin pressure.",
         "ORPHAN_RFI": "Cost-impact RFIs are not translating into formal change recovery.",
+        "MATERIAL_VARIANCE": "Material spend on the affected SOV line is running ahead of the bid estimate.",
+        "OVERDUE_RFI": "Design questions are past their required response date and holding up field work.",
     }.get(trigger_type, "Mixed cost and execution pressure.")
 
     factors = [
@@ -1,10 +1,17 @@
 from __future__ import annotations
 
-import json
-from fastapi import APIRouter
+import re
+import sqlite3
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import APIRouter, Request
 from pydantic import BaseModel
 
-from backend.db.connection import get_connection
+from backend.db.connection import run_read
+from backend.db.dossier_cache import CachedDossier, dossier_cache
+from backend.routes.dossier import load_cached_dossier
+from backend.routes.metrics import run_render
+from backend.routes.sse import data_events, event_stream, sse_event, wants_event_stream
 from backend.tools.co_detail import get_co_detail
 from backend.tools.field_notes import get_field_notes
 from backend.tools.labor_detail import get_labor_detail
@@ -19,49 +26,110 @@ class ChatRequest(BaseModel):
     message: str
 
 
-@router.post("/chat")
-def chat(req: ChatRequest):
+DEFAULT_RECOVERY = 250000.0
+FIELD_NOTE_PREVIEW = 5
+_AMOUNT = re.compile(r"\$\s*([\d,]+(?:\.\d+)?)\s*([km])?\b", re.IGNORECASE)
+
+
+def _recovery_amount(message: str) -> float:
+    """Dollar amount named in the message ("$400k", "$1.2m", "$75,000"), else the default."""
+    m = _AMOUNT.search(message)
+    if not m:
+        return DEFAULT_RECOVERY
+    scale = {"k": 1e3, "m": 1e6}.get((m.group(2) or "").lower(), 1.0)
+    return float(m.group(1).replace(",", "")) * scale
+
+
+def _route(req: ChatRequest) -> tuple[str, str, Callable[[sqlite3.Connection], Any]] | None:
+    """Pick the tool for a message: (tool name, answer text, call), or None for the dossier summary."""
     msg = req.message.lower().strip()
-    conn = get_connection()
+    if "field note" in msg:
+        return (
+            "get_field_notes",
+            "Loaded recent field notes.",
+            lambda conn: get_field_notes(conn, req.project_id, keyword=""),
+        )
+    if "co-" in msg:
+        token = next((w.upper().strip(".,") for w in req.message.split() if w.upper().startswith("CO-")), None)
+        if token:
+            return "get_co_detail", f"Loaded details for {token}.", lambda conn: get_co_detail(conn, token, req.project_id)
+    if "rfi-" in msg:
+        token = next((w.upper().strip(".,") for w in req.message.split() if w.upper().startswith("RFI-")), None)
+        if token:
+            return "get_rfi_detail", f"Loaded details for {token}.", lambda conn: get_rfi_detail(conn, token, req.project_id)
+    if "what if" in msg or "recover" in msg:
+        amount = _recovery_amount(req.message)
+        return (
+            "what_if_margin",
+            f"Computed what-if margin with ${amount:,.0f} recovery.",
+            lambda conn: what_if_margin(conn, req.project_id, recovery_amount=amount),
+        )
+    if "labor" in msg and "sov" in msg:
+        parts = req.message.split()
+        sov = next((p for p in parts if "SOV" in p.upper()), None)
+        if sov:
+            return (
+                "get_labor_detail",
+                f"Loaded labor detail for {sov}.",
+                lambda conn: get_labor_detail(conn, req.project_id, sov),
+            )
+    return None
+
+
+def _summary(entry: CachedDossier) -> str:
+    dossier = dossier_cache.parsed(entry, "none")
+    return (
+        f"{dossier['name']} is {dossier['status']} with health {dossier['health_score']:.1f}. "
+        f"Margin erosion is {dossier['financials']['margin_erosion_pct']:.1%} with "
+        f"{len(dossier['issues'])} active trigger(s)."
+    )
+
+
+def _answer(conn: sqlite3.Connection, req: ChatRequest, entry: CachedDossier):
+    routed = _route(req)
+    if not routed:
+        return {"answer": _summary(entry), "tools": []}
+    tool, answer, call = routed
+    if tool == "get_field_notes":
+        notes = call(conn)
+        return {"answer": f"Found {len(notes)} recent field notes.", "tools": [tool], "data": notes[:FIELD_NOTE_PREVIEW]}
+    return {"answer": answer, "tools": [tool], "data": call(conn)}
+
+
+async def _chat_events(req: ChatRequest, entry: CachedDossier | None) -> AsyncIterator[str]:
+    # Only the answer and tool name go out before the tool runs, so the first byte never waits on
+    # it. The tools build their whole result on one pooled connection, so the row events follow
+    # once it is complete; they are split up for the client, not read from a live cursor.
+    if not entry:
+        yield sse_event("answer", {"text": "Run analysis first; dossier missing."})
+        yield sse_event("done", {"tools": []})
+        return
+    routed = _route(req)
+    if not routed:
+        # The first summary of an entry decompresses and parses its blob; keep that off the loop.
+        yield sse_event("answer", {"text": await run_render(_summary, entry)})
+        yield sse_event("done", {"tools": []})
+        return
+    tool, answer, call = routed
+    yield sse_event("answer", {"text": answer})
+    yield sse_event("tool", {"name": tool})
     try:
-        dossier_row = conn.execute("SELECT dossier_json FROM dossiers WHERE project_id=?", (req.project_id,)).fetchone()
-        if not dossier_row:
-            return {"answer": "Run analysis first; dossier missing.", "tools": []}
-
-        tools_used = []
-        if "field note" in msg:
-            tools_used.append("get_field_notes")
-            notes = get_field_notes(conn, req.project_id, keyword="")
-            return {"answer": f"Found {len(notes)} recent field notes.", "tools": tools_used, "data": notes[:5]}
-        if "co-" in msg:
-            token = next((w.upper().strip(".,") for w in req.message.split() if w.upper().startswith("CO-")), None)
-            if token:
-                tools_used.append("get_co_detail")
-                return {"answer": f"Loaded details for {token}.", "tools": tools_used, "data": get_co_detail(conn, token)}
-        if "rfi-" in msg:
-            token = next((w.upper().strip(".,") for w in req.message.split() if w.upper().startswith("RFI-")), None)
-            if token:
-                tools_used.append("get_rfi_detail")
-                return {"answer": f"Loaded details for {token}.", "tools": tools_used, "data": get_rfi_detail(conn, token)}
-        if "what if" in msg or "recover" in msg:
-            tools_used.append("what_if_margin")
-            data = what_if_margin(conn, req.project_id, recovery_amount=250000)
-            return {"answer": "Computed what-if margin with $250k recovery.", "tools": tools_used, "data": data}
-        if "labor" in msg and "sov" in msg:
-            parts = req.message.split()
-            sov = next((p for p in parts if "SOV" in p.upper()), None)
-            if sov:
-                tools_used.append("get_labor_detail")
-                return {"answer": f"Loaded labor detail for {sov}.", "tools": tools_used, "data": get_labor_detail(conn, req.project_id, sov)}
-
-        dossier = json.loads(dossier_row[0])
-        return {
-            "answer": (
-                f"{dossier['name']} is {dossier['status']} with health {dossier['health_score']:.1f}. "
-                f"Margin erosion is {dossier['financials']['margin_erosion_pct']:.1%} with "
-                f"{len(dossier['issues'])} active trigger(s)."
-            ),
-            "tools": tools_used,
-        }
-    finally:
-        conn.close()
+        data = await run_read(call)
+    except Exception as exc:  # noqa: BLE001 - reported to the client as a stream event
+        yield sse_event("error", {"tool": tool, "detail": str(exc)})
+        return
+    if tool == "get_field_notes":
+        data = data[:FIELD_NOTE_PREVIEW]
+    for event in data_events(data):
+        yield event
+    yield sse_event("done", {"tools": [tool]})
+
+
+@router.post("/chat")
+async def chat(req: ChatRequest, request: Request):
+    entry = await load_cached_dossier(req.project_id)
+    if wants_event_stream(request):
+        return event_stream(_chat_events(req, entry))
+    if not entry:
+        return {"answer": "Run analysis first; dossier missing.", "tools": []}
+    return await run_read(_answer, req, entry)
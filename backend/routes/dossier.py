@@ -1,20 +1,63 @@
 from __future__ import annotations
 
-import json
-from fastapi import APIRouter, HTTPException
+from datetime import date
 
-from backend.db.connection import get_connection
+from fastapi import APIRouter, HTTPException, Request, Response
+
+from backend.db.connection import read_connection, run_db
+from backend.db.dossier_cache import CachedDossier, dossier_cache
+from backend.db.dossier_codec import EvidenceView, dossier_view, pack_dossier
+from backend.reasoning.point_in_time import point_in_time_dossier
+from backend.routes.metrics import TimedJSONResponse, run_render
+from backend.routes.sse import dossier_events, event_stream, wants_event_stream
 
 router = APIRouter(prefix="/api", tags=["dossier"])
 
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+async def load_cached_dossier(project_id: str) -> CachedDossier | None:
+    # Fresh entries are served straight from the event loop; anything else revalidates off it.
+    return dossier_cache.peek(project_id) or await run_db(dossier_cache.get, project_id, read_connection)
+
+
+async def cached_dossier_response(
+    request: Request,
+    project_id: str,
+    missing_detail: str,
+    as_of: date | None = None,
+    evidence: EvidenceView = "full",
+) -> Response:
+    if as_of:
+        # Point-in-time views are recomputed per request and never cached.
+        payload = await run_db(point_in_time_dossier, project_id, as_of.isoformat())
+        if not payload:
+            raise HTTPException(status_code=404, detail=missing_detail)
+        if evidence != "full":
+            payload = dossier_view(pack_dossier(payload), evidence)
+        if wants_event_stream(request):
+            return event_stream(dossier_events(payload))
+        return TimedJSONResponse(payload, headers={"Cache-Control": "no-store"})
+    entry = await load_cached_dossier(project_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail=missing_detail)
+    if wants_event_stream(request):
+        return event_stream(dossier_events(await run_render(dossier_cache.parsed, entry, evidence)))
+    etag = entry.view_etag(evidence)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    # Each view is decoded and encoded once per entry, off the event loop; that is serialization time.
+    body = entry.bodies.get(evidence) or await run_render(dossier_cache.body, entry, evidence)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/dossier/{project_id}")
-def get_dossier(project_id: str):
-    conn = get_connection()
-    try:
-        row = conn.execute("SELECT dossier_json FROM dossiers WHERE project_id=?", (project_id,)).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail=f"Dossier not found for {project_id}")
-        return json.loads(row[0])
-    finally:
-        conn.close()
+async def get_dossier(project_id: str, request: Request, as_of: date | None = None, evidence: EvidenceView = "full"):
+    """`evidence=refs` lists each distinct evidence list once under shared_evidence, `none` leaves it out."""
+    return await cached_dossier_response(request, project_id, f"Dossier not found for {project_id}", as_of, evidence)
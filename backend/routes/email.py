@@ -1,10 +1,10 @@
 from __future__ import annotations
 
 import os
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from backend.tools.send_email import send_email
+from backend.tools.email_outbox import OutboxFull, email_outbox
 
 router = APIRouter(prefix="/api", tags=["email"])
 
@@ -15,16 +15,27 @@ class EmailRequest(BaseModel):
     body: str
 
 
-@router.post("/email")
-def email(req: EmailRequest):
-    res = send_email(
-        to=req.to,
-        subject=req.subject,
-        body=req.body,
-        smtp_host=os.getenv("SMTP_HOST"),
-        smtp_port=int(os.getenv("SMTP_PORT", "587")),
-        smtp_user=os.getenv("SMTP_USER"),
-        smtp_pass=os.getenv("SMTP_PASS"),
-        from_addr=os.getenv("SMTP_FROM"),
-    )
+@router.post("/email", status_code=202)
+async def email(req: EmailRequest):
+    try:
+        res = email_outbox.submit(
+            to=req.to,
+            subject=req.subject,
+            body=req.body,
+            smtp_host=os.getenv("SMTP_HOST"),
+            smtp_port=int(os.getenv("SMTP_PORT", "587")),
+            smtp_user=os.getenv("SMTP_USER"),
+            smtp_pass=os.getenv("SMTP_PASS"),
+            from_addr=os.getenv("SMTP_FROM"),
+        )
+    except OutboxFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
     return {"ok": True, "result": res}
+
+
+@router.get("/email/{message_id}")
+async def email_status(message_id: str):
+    res = email_outbox.status(message_id)
+    if not res:
+        raise HTTPException(status_code=404, detail=f"Email {message_id} not found")
+    return {"ok": res["delivery"] != "failed", "result": res}
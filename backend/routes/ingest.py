@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import sqlite3
+from fastapi import APIRouter, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from backend.db.connection import DB_PATH
+from backend.scripts.ingest_delta import NATURAL_KEYS, ingest_batch, parse_batch
+
+router = APIRouter(prefix="/api/ingest", tags=["ingest"])
+
+
+@router.post("/{table}")
+async def ingest(table: str, request: Request, format: str | None = None):
+    if table not in NATURAL_KEYS:
+        raise HTTPException(status_code=404, detail=f"Table {table} does not accept delta batches")
+    content_type = request.headers.get("content-type", "")
+    fmt = format or ("csv" if "csv" in content_type else "jsonl")
+    body = await request.body()
+    try:
+        # A UnicodeDecodeError is a ValueError too, so a non-UTF-8 body is also a 422.
+        records = parse_batch(body.decode("utf-8"), fmt)
+        return await run_in_threadpool(ingest_batch, table, records, DB_PATH)
+    except (ValueError, sqlite3.IntegrityError) as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
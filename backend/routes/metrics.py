@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, TypeVar
+
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from backend.db.connection import ConnectionPool, Elapsed, db_elapsed, read_pool, run_timed
+from backend.db.history import history_pool
+from backend.db.slow_queries import SlowQueryLog, slow_query_log
+from backend.routes.prometheus import Histogram, exposition, histogram_lines, metric_lines, sample_line
+
+# Upper bounds of the latency (seconds) and response size (bytes) histograms; the last bucket is +Inf.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Requests that match no route share one label so stray URLs cannot grow the series.
+UNMATCHED_ROUTE = "unmatched"
+
+T = TypeVar("T")
+
+# Set per request by the middleware; TimedJSONResponse and run_render add the time spent encoding bodies.
+render_elapsed: ContextVar[Elapsed | None] = ContextVar("render_elapsed", default=None)
+
+
+async def run_render(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Like run_db, for decoding or encoding work; the wait counts as serialization, not DB time."""
+    return await run_timed(render_elapsed.get(), fn, *args, **kwargs)
+
+
+class TimedJSONResponse(JSONResponse):
+    """JSONResponse whose body encoding counts as the request's serialization time."""
+
+    def render(self, content: Any) -> bytes:
+        start = time.perf_counter()
+        try:
+            return super().render(content)
+        finally:
+            elapsed = render_elapsed.get()
+            if elapsed is not None:
+                elapsed.seconds += time.perf_counter() - start
+
+
+class _RouteStats:
+    __slots__ = ("latency", "db", "serialize", "size")
+
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db = Histogram(LATENCY_BUCKETS)
+        self.serialize = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+
+class RequestMetrics:
+    """Latency, DB time, serialization time and response size per (method, route template).
+
+    DB time is what the request spent awaiting run_db; serialization time is what
+    TimedJSONResponse spent encoding and what it awaited through run_render. Everything else (validation, routing, Python work on the
+    event loop, streaming) is the rest of the latency.
+    """
+
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.routes: dict[tuple[str, str], _RouteStats] = {}
+        self.responses: dict[tuple[str, str, int], int] = {}
+
+    def observe(
+        self, method: str, route: str, status: int, seconds: float, db_seconds: float, serialize_seconds: float, size: int
+    ) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = _RouteStats()
+        stats.latency.observe(seconds)
+        stats.db.observe(db_seconds)
+        stats.serialize.observe(serialize_seconds)
+        stats.size.observe(size)
+        key = (method, route, status)
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def lines(self) -> Iterator[str]:
+        routes = sorted(self.routes.items())
+        yield from metric_lines(
+            "hvac_http_requests_in_flight", "Requests currently being served.", "gauge", [({}, self.in_flight)]
+        )
+        yield from metric_lines(
+            "hvac_http_responses_total",
+            "Responses sent, by route and status code.",
+            "counter",
+            (({"method": m, "route": r, "status": str(s)}, n) for (m, r, s), n in sorted(self.responses.items())),
+        )
+        for attr, name, help_text in (
+            ("latency", "hvac_http_request_duration_seconds", "Time from request to the last byte of the response."),
+            ("db", "hvac_http_request_db_seconds", "Time the request spent awaiting the database executor."),
+            ("serialize", "hvac_http_request_serialize_seconds", "Time spent encoding JSON response bodies."),
+            ("size", "hvac_http_response_size_bytes", "Response body size."),
+        ):
+            yield from histogram_lines(name, help_text, (({"method": m, "route": r}, getattr(s, attr)) for (m, r), s in routes))
+
+
+request_metrics = RequestMetrics()
+
+
+class RequestMetricsMiddleware:
+    """Pure ASGI middleware, so streamed (SSE) responses are timed to their last chunk."""
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = request_metrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status, size = 500, 0
+
+        async def send_counted(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        db, render = Elapsed(), Elapsed()
+        db_token, render_token = db_elapsed.set(db), render_elapsed.set(render)
+        self.metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_counted)
+        finally:
+            seconds = time.perf_counter() - start
+            self.metrics.in_flight -= 1
+            db_elapsed.reset(db_token)
+            render_elapsed.reset(render_token)
+            # The router records the matched route in the scope it was handed.
+            route = getattr(scope.get("route"), "path", UNMATCHED_ROUTE)
+            self.metrics.observe(scope["method"], route, status, seconds, db.seconds, render.seconds, size)
+
+
+def _pool_lines(pools: dict[str, ConnectionPool]) -> Iterator[str]:
+    stats = {name: pool.stats() for name, pool in pools.items()}
+    for key, kind, help_text in (
+        ("in_use", "gauge", "Connections checked out."),
+        ("idle", "gauge", "Open connections waiting in the pool."),
+        ("checkouts", "counter", "Connections handed out."),
+        ("waits", "counter", "Checkouts that waited for a free connection."),
+        ("timeouts", "counter", "Checkouts that gave up waiting."),
+    ):
+        suffix = "_total" if kind == "counter" else ""
+        yield from metric_lines(
+            f"hvac_db_pool_{key}{suffix}", help_text, kind, (({"pool": name}, s[key]) for name, s in stats.items())
+        )
+    yield "# HELP hvac_db_pool_checkout_seconds Time to check a connection out of the pool."
+    yield "# TYPE hvac_db_pool_checkout_seconds histogram"
+    for name, s in stats.items():
+        for bound, count in s["checkout_seconds_buckets"].items():
+            yield sample_line("hvac_db_pool_checkout_seconds_bucket", {"pool": name, "le": bound}, count)
+        yield sample_line("hvac_db_pool_checkout_seconds_sum", {"pool": name}, s["checkout_seconds_avg"] * s["checkouts"])
+        yield sample_line("hvac_db_pool_checkout_seconds_count", {"pool": name}, s["checkouts"])
+
+
+def _slow_query_lines(log: SlowQueryLog) -> Iterator[str]:
+    stats = log.stats()
+    yield from metric_lines(
+        "hvac_sqlite_slow_queries_total", "Statements slower than the slow-query threshold.", "counter", [({}, stats["count"])]
+    )
+    yield from metric_lines(
+        "hvac_sqlite_slow_query_seconds_total", "Time spent in slow statements.", "counter", [({}, stats["seconds"])]
+    )
+
+
+def render_metrics() -> str:
+    """The /metrics page: HTTP request metrics, connection pools and the slow-query log."""
+    return exposition(
+        [
+            *request_metrics.lines(),
+            *_pool_lines({"read": read_pool, "history": history_pool}),
+            *_slow_query_lines(slow_query_log),
+        ]
+    )
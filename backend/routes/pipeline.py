@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Any, Iterator, Literal
+
+from fastapi import APIRouter, Query
+from fastapi.responses import PlainTextResponse
+
+from backend.db.connection import run_db
+from backend.db.history import history_pool, pipeline_runs
+from backend.routes.prometheus import PROMETHEUS_CONTENT_TYPE, exposition, metric_lines
+
+router = APIRouter(prefix="/api", tags=["pipeline"])
+
+MAX_RUNS = 200
+RUN_MODES = ("full", "incremental", "numpy")
+STAGE_METRICS = (
+    ("seconds", "Wall time of the stage in the latest compute run."),
+    ("rows_written", "Rows inserted, updated or deleted by the stage."),
+    ("statements", "SQLite statements the stage executed."),
+    ("vm_steps", "SQLite VM instructions the stage ran, a proxy for rows read."),
+    ("peak_rss_mb", "Process peak resident set size when the stage ended, in MB."),
+)
+
+
+def _read_runs(limit: int, mode: str | None = None) -> list[dict[str, Any]]:
+    with history_pool.connection() as conn:
+        return pipeline_runs(conn, limit, mode)
+
+
+def _latest_runs() -> list[dict[str, Any]]:
+    return [run for mode in RUN_MODES for run in _read_runs(1, mode)]
+
+
+def _pipeline_metrics(runs: list[dict[str, Any]]) -> Iterator[str]:
+    for key, help_text in STAGE_METRICS:
+        yield from metric_lines(
+            f"hvac_pipeline_stage_{key}",
+            help_text,
+            "gauge",
+            (
+                ({"mode": run["mode"], "stage": stage["stage"]}, stage[key])
+                for run in runs
+                for stage in [*run["stages"], {**run, "stage": "total"}]
+            ),
+        )
+    yield from metric_lines(
+        "hvac_pipeline_last_run_timestamp_seconds",
+        "When the latest compute run of each mode started, as a Unix time.",
+        "gauge",
+        (({"mode": run["mode"]}, datetime.fromisoformat(run["started_at"]).timestamp()) for run in runs),
+    )
+
+
+@router.get("/pipeline/runs")
+async def get_pipeline_runs(
+    limit: int = Query(20, ge=1, le=MAX_RUNS),
+    mode: Literal["full", "incremental", "numpy"] | None = None,
+):
+    return {"runs": await run_db(_read_runs, limit, mode)}
+
+
+@router.get("/pipeline/metrics", response_class=PlainTextResponse)
+async def get_pipeline_metrics():
+    runs = await run_db(_latest_runs)
+    return PlainTextResponse(exposition(_pipeline_metrics(runs)), media_type=PROMETHEUS_CONTENT_TYPE)
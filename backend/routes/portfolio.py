@@ -1,20 +1,14 @@
 from __future__ import annotations
 
-import json
-from fastapi import APIRouter, HTTPException
+from datetime import date
 
-from backend.db.connection import get_connection
+from fastapi import APIRouter, Request
+
+from backend.routes.dossier import cached_dossier_response
 
 router = APIRouter(prefix="/api", tags=["portfolio"])
 
 
 @router.get("/portfolio")
-def get_portfolio():
-    conn = get_connection()
-    try:
-        row = conn.execute("SELECT dossier_json FROM dossiers WHERE project_id='PORTFOLIO'").fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Portfolio dossier not built yet")
-        return json.loads(row[0])
-    finally:
-        conn.close()
+async def get_portfolio(request: Request, as_of: date | None = None):
+    return await cached_dossier_response(request, "PORTFOLIO", "Portfolio dossier not built yet", as_of)
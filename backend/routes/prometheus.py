@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from typing import Iterable, Iterator, Mapping
+
+# Text exposition format 0.0.4, what Prometheus scrapers expect.
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = tuple[Mapping[str, str], float | None]
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def sample_line(name: str, labels: Mapping[str, str], value: float) -> str:
+    if not labels:
+        return f"{name} {value}"
+    label_text = ",".join(f'{k}="{_label_value(str(v))}"' for k, v in labels.items())
+    return f"{name}{{{label_text}}} {value}"
+
+
+def metric_lines(name: str, help_text: str, kind: str, samples: Iterable[Sample]) -> Iterator[str]:
+    """HELP and TYPE lines then one line per sample; samples without a value are left out."""
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} {kind}"
+    for labels, value in samples:
+        if value is not None:
+            yield sample_line(name, labels, value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram; only updated from the event loop, so it takes no lock."""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[next((i for i, b in enumerate(self.bounds) if value <= b), len(self.bounds))] += 1
+        self.sum += value
+
+
+def histogram_lines(
+    name: str, help_text: str, samples: Iterable[tuple[Mapping[str, str], Histogram]]
+) -> Iterator[str]:
+    yield f"# HELP {name} {help_text}"
+    yield f"# TYPE {name} histogram"
+    for labels, hist in samples:
+        cumulative = 0
+        for bound, count in zip([*map(str, hist.bounds), "+Inf"], hist.counts):
+            cumulative += count
+            yield sample_line(f"{name}_bucket", {**labels, "le": bound}, cumulative)
+        yield sample_line(f"{name}_sum", labels, hist.sum)
+        yield sample_line(f"{name}_count", labels, cumulative)
+
+
+def exposition(lines: Iterable[str]) -> str:
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+
+from backend.db.connection import run_read
+
+router = APIRouter(prefix="/api", tags=["risk"])
+
+
+@router.get("/risk/margin")
+async def get_margin_risk(
+    samples: int = Query(10_000, ge=1),
+    seed: int = Query(0, ge=0),
+    project_id: list[str] | None = Query(None),
+):
+    from backend.tools.margin_risk import load_risk_inputs, simulate_margin_risk
+
+    # Inputs are read on a pooled connection; the draws run off the database executor, holding neither.
+    inputs = await run_read(load_risk_inputs, project_id)
+    if not len(inputs["project_id"]):
+        raise HTTPException(status_code=404, detail="No computed projects to simulate")
+    try:
+        return await run_in_threadpool(simulate_margin_risk, inputs, samples, seed)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
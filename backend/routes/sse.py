@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import json
+from typing import Any, AsyncIterator, Iterator
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+# Ask proxies (nginx, the Next.js route) not to buffer or re-encode the stream.
+EVENT_STREAM_HEADERS = {"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"}
+
+
+def wants_event_stream(request: Request) -> bool:
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def sse_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def data_events(data: Any) -> Iterator[str]:
+    """Row events for a finished tool result: list items one by one, a dict's "rows" then the rest of it."""
+    if isinstance(data, list):
+        for row in data:
+            yield sse_event("row", row)
+        return
+    if isinstance(data, dict) and isinstance(data.get("rows"), list):
+        for row in data["rows"]:
+            yield sse_event("row", row)
+        data = {k: v for k, v in data.items() if k != "rows"}
+    yield sse_event("data", data)
+
+
+def dossier_events(dossier: dict[str, Any]) -> Iterator[str]:
+    """A dossier's scalar and object fields first, then each entry of its list fields."""
+    yield sse_event("dossier", {k: v for k, v in dossier.items() if not isinstance(v, list)})
+    for section, items in dossier.items():
+        if isinstance(items, list):
+            for item in items:
+                yield sse_event("item", {"section": section, "item": item})
+    yield sse_event("done", {})
+
+
+def event_stream(events: AsyncIterator[str] | Iterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=EVENT_STREAM_HEADERS)
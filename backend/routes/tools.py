@@ -3,9 +3,10 @@ from __future__ import annotations
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from backend.db.connection import get_connection
+from backend.db.connection import run_read
+from backend.routes.metrics import TimedJSONResponse
 from backend.tools.co_detail import get_co_detail
-from backend.tools.field_notes import get_field_notes
+from backend.tools.field_notes import field_notes_page
 from backend.tools.labor_detail import get_labor_detail
 from backend.tools.rfi_detail import get_rfi_detail
 from backend.tools.what_if_margin import what_if_margin
@@ -17,21 +18,28 @@ class FieldNotesRequest(BaseModel):
     project_id: str
     keyword: str = ""
     limit: int = 20
+    cursor: str | None = None
+    columns: list[str] | None = None
 
 
 class LaborDetailRequest(BaseModel):
     project_id: str
     sov_line_id: str
+    limit: int = 200
+    cursor: str | None = None
+    columns: list[str] | None = None
 
 
 class CoDetailRequest(BaseModel):
     project_id: str
     co_number: str
+    columns: list[str] | None = None
 
 
 class RfiDetailRequest(BaseModel):
     project_id: str
     rfi_number: str
+    columns: list[str] | None = None
 
 
 class WhatIfMarginRequest(BaseModel):
@@ -39,56 +47,79 @@ class WhatIfMarginRequest(BaseModel):
     recovery_amount: float
 
 
-@router.post("/field-notes")
-def field_notes(req: FieldNotesRequest):
-    conn = get_connection()
+class WhatIfScenario(BaseModel):
+    recovery_amount: float = 0.0
+    co_approval_prob: float = 0.0
+    overtime_freeze: float = 0.0
+
+
+class WhatIfBatchRequest(BaseModel):
+    project_ids: list[str] | None = None
+    recovery_amounts: list[float] = [0.0]
+    co_approval_probs: list[float] = [0.0]
+    overtime_freezes: list[float] = [0.0]
+    # An explicit scenario list replaces the grid built from the three lever lists.
+    scenarios: list[WhatIfScenario] | None = None
+
+
+async def _run_tool(fn, *args):
+    # Bad cursors, limits and column names come back from the tools as ValueError.
     try:
-        data = get_field_notes(conn, req.project_id, req.keyword, req.limit)
-        return {"count": len(data), "items": data}
-    finally:
-        conn.close()
+        return await run_read(fn, *args)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.post("/field-notes")
+async def field_notes(req: FieldNotesRequest):
+    page = await _run_tool(field_notes_page, req.project_id, req.keyword, req.limit, req.cursor, req.columns)
+    return {"count": len(page["items"]), **page}
 
 
 @router.post("/labor-detail")
-def labor_detail(req: LaborDetailRequest):
-    conn = get_connection()
-    try:
-        return get_labor_detail(conn, req.project_id, req.sov_line_id)
-    finally:
-        conn.close()
+async def labor_detail(req: LaborDetailRequest):
+    return await _run_tool(get_labor_detail, req.project_id, req.sov_line_id, req.limit, req.cursor, req.columns)
 
 
 @router.post("/co-detail")
-def co_detail(req: CoDetailRequest):
-    conn = get_connection()
-    try:
-        row = get_co_detail(conn, req.co_number)
-        if not row or row.get("project_id") != req.project_id:
-            raise HTTPException(status_code=404, detail="CO not found for project")
-        return row
-    finally:
-        conn.close()
+async def co_detail(req: CoDetailRequest):
+    row = await _run_tool(get_co_detail, req.co_number, req.project_id, req.columns)
+    if not row:
+        raise HTTPException(status_code=404, detail="CO not found for project")
+    return row
 
 
 @router.post("/rfi-detail")
-def rfi_detail(req: RfiDetailRequest):
-    conn = get_connection()
-    try:
-        row = get_rfi_detail(conn, req.rfi_number)
-        if not row or row.get("project_id") != req.project_id:
-            raise HTTPException(status_code=404, detail="RFI not found for project")
-        return row
-    finally:
-        conn.close()
+async def rfi_detail(req: RfiDetailRequest):
+    row = await _run_tool(get_rfi_detail, req.rfi_number, req.project_id, req.columns)
+    if not row:
+        raise HTTPException(status_code=404, detail="RFI not found for project")
+    return row
 
 
 @router.post("/what-if-margin")
-def what_if(req: WhatIfMarginRequest):
-    conn = get_connection()
+async def what_if(req: WhatIfMarginRequest):
+    data = await run_read(what_if_margin, req.project_id, req.recovery_amount)
+    if not data:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return data
+
+
+@router.post("/what-if-batch")
+async def what_if_batch_route(req: WhatIfBatchRequest):
+    from backend.tools.what_if_batch import what_if_batch
+
+    scenarios = [s.model_dump() for s in req.scenarios] if req.scenarios is not None else None
     try:
-        data = what_if_margin(conn, req.project_id, req.recovery_amount)
-        if not data:
-            raise HTTPException(status_code=404, detail="Project not found")
-        return data
-    finally:
-        conn.close()
+        data = await run_read(
+            what_if_batch,
+            req.project_ids,
+            req.recovery_amounts,
+            req.co_approval_probs,
+            req.overtime_freezes,
+            scenarios,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    # Return a response so FastAPI skips the generic encoder, which walks every cell and dominates large grids.
+    return TimedJSONResponse(data)
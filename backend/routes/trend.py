@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import APIRouter
+
+from backend.db.connection import run_db
+from backend.db.history import history_pool, project_trend
+
+router = APIRouter(prefix="/api", tags=["trend"])
+
+
+def _read_trend(project_id: str, start: str | None, end: str | None, sov_line_id: str | None):
+    with history_pool.connection() as conn:
+        return project_trend(conn, project_id, start, end, sov_line_id)
+
+
+@router.get("/trend/{project_id}")
+async def get_trend(project_id: str, start: date | None = None, end: date | None = None, sov_line_id: str | None = None):
+    points = await run_db(
+        _read_trend,
+        project_id,
+        start.isoformat() if start else None,
+        end.isoformat() if end else None,
+        sov_line_id,
+    )
+    return {"project_id": project_id, "sov_line_id": sov_line_id, "points": points}
@@ -1,33 +1,99 @@
 from __future__ import annotations
 
+import argparse
+import os
 import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import closing
 from pathlib import Path
 
 from backend.compute import run_compute_engine
-from backend.reasoning.dossier_builder import build_project_dossier
+from backend.db.dossier_codec import encode_dossier
+from backend.db.history import HISTORY_DB_PATH, record_snapshot
+from backend.reasoning.dossier_builder import assemble_project_dossier, store_dossier
 from backend.reasoning.portfolio_builder import build_portfolio
 from backend.scripts.seed_db import seed_db
 
 ROOT = Path(__file__).resolve().parents[1]
 DB_PATH = ROOT / "hvac.db"
+DEFAULT_WORKERS = int(os.getenv("DOSSIER_WORKERS", "1"))
 
+_worker = threading.local()
 
-def build_all() -> None:
-    seed_db()
-    run_compute_engine(DB_PATH)
 
-    conn = sqlite3.connect(DB_PATH)
+def _open_reader(db_path: str, opened: list[sqlite3.Connection] | None = None) -> None:
+    # Connections listed in `opened` are closed by the thread that started the pool.
+    conn = sqlite3.connect(db_path, check_same_thread=opened is None)
     conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only = ON")
+    _worker.conn = conn
+    if opened is not None:
+        opened.append(conn)
+
+
+def _assemble(project_id: str) -> tuple[str, tuple[bytes, str] | None]:
+    # Encoding (packing, serializing, compressing) runs in the workers too.
+    dossier = assemble_project_dossier(_worker.conn, project_id)
+    return project_id, encode_dossier(dossier) if dossier else None
+
+
+def _assemble_all(
+    db_path: Path, projects: list[str], workers: int, processes: bool
+) -> list[tuple[str, tuple[bytes, str] | None]]:
+    if workers <= 1:
+        _open_reader(str(db_path))
+        try:
+            return [_assemble(p) for p in projects]
+        finally:
+            _worker.conn.close()
+
+    if processes:
+        # Worker processes exit when the pool shuts down, which closes their connections.
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_reader, initargs=(str(db_path),)) as pool:
+            return list(pool.map(_assemble, projects))
+    opened: list[sqlite3.Connection] = []
     try:
+        with ThreadPoolExecutor(max_workers=workers, initializer=_open_reader, initargs=(str(db_path), opened)) as pool:
+            return list(pool.map(_assemble, projects))
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+def build_dossiers(db_path: Path = DB_PATH, workers: int = DEFAULT_WORKERS, processes: bool = False) -> None:
+    """Assemble every project dossier on `workers` read connections, then upsert them in one transaction."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        # WAL lets the worker readers run while this connection holds the write transaction.
+        conn.execute("PRAGMA journal_mode = WAL")
         projects = [r[0] for r in conn.execute("SELECT project_id FROM contracts").fetchall()]
-        for project_id in projects:
-            build_project_dossier(conn, project_id)
+        results = _assemble_all(db_path, projects, workers, processes)
+
+        for project_id, encoded in results:
+            if encoded is not None:
+                store_dossier(conn, project_id, *encoded)
         build_portfolio(conn)
         conn.commit()
     finally:
         conn.close()
 
 
+def build_all(workers: int = DEFAULT_WORKERS, processes: bool = False, history_path: Path | None = HISTORY_DB_PATH) -> None:
+    """Seed, compute and build dossiers; history_path=None skips the snapshot and run telemetry."""
+    seed_db()
+    run_compute_engine(DB_PATH, history_path=history_path)
+    if history_path is not None:
+        with closing(sqlite3.connect(DB_PATH)) as conn:
+            record_snapshot(conn, history_path=history_path)
+    build_dossiers(DB_PATH, workers, processes)
+
+
 if __name__ == "__main__":
-    build_all()
+    parser = argparse.ArgumentParser(description="Seed, compute and build all dossiers.")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--processes", action="store_true", help="use a process pool instead of threads")
+    args = parser.parse_args()
+    build_all(args.workers, args.processes)
     print("Built dossiers and portfolio")
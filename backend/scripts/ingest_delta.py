@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Iterable
+
+from backend.compute import run_compute_engine
+from backend.compute.incremental import mark_dirty_lines
+from backend.db.history import HISTORY_DB_PATH, record_snapshot
+from backend.db.loader import column_converters, insert_chunks, iter_typed_rows
+from backend.reasoning.dossier_builder import build_project_dossier
+from backend.reasoning.portfolio_builder import build_portfolio
+
+ROOT = Path(__file__).resolve().parents[1]
+DB_PATH = ROOT / "hvac.db"
+
+# Natural key per ingestible table; a batch row replaces the stored row with the same key.
+# seed_db numbers repeated log_ids and a unique index keeps them apart. The other keys are not
+# enforced, so a batch whose key matches more than one stored row is rejected rather than
+# collapsing those rows into one.
+NATURAL_KEYS = {
+    "labor_logs": ("log_id",),
+    "material_deliveries": ("delivery_id",),
+    "billing_line_items": ("project_id", "application_number", "sov_line_id"),
+    "field_notes": ("note_id",),
+}
+
+
+def parse_batch(text: str, fmt: str) -> list[dict[str, Any]]:
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(text)))
+    if fmt == "jsonl":
+        records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        for number, record in enumerate(records, 1):
+            if not isinstance(record, dict):
+                raise ValueError(f"Record {number} is not a JSON object")
+        return records
+    raise ValueError(f"Unsupported batch format: {fmt}")
+
+
+def ingest_rows(conn: sqlite3.Connection, table: str, records: Iterable[dict[str, Any]]) -> dict[str, Any]:
+    """Upsert a batch by natural key inside the caller's transaction and queue the touched SOV lines."""
+    if table not in NATURAL_KEYS:
+        raise ValueError(f"Table {table} does not accept delta batches")
+    key_cols = NATURAL_KEYS[table]
+    converters = column_converters(conn, table)
+    cols = list(converters)
+    key_idx = [cols.index(k) for k in key_cols]
+    # Field notes carry no SOV line; they only refresh their projects' dossiers.
+    line_cols = ("project_id", "sov_line_id") if "sov_line_id" in converters else ("project_id",)
+    line_idx = [cols.index(c) for c in line_cols]
+
+    # Last occurrence of a key in the batch wins.
+    batch: dict[tuple[Any, ...], list[Any]] = {}
+    received = 0
+    for row in iter_typed_rows(([rec.get(c) for c in cols] for rec in records), cols, converters):
+        received += 1
+        key = tuple(row[i] for i in key_idx)
+        if any(k in (None, "") for k in key):
+            raise ValueError(f"Row {received} is missing natural key {', '.join(key_cols)}")
+        batch[key] = row
+
+    keys_table = f"temp.ingest_keys_{table}"
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS ingest_keys_{table} ({', '.join(key_cols)})")
+    conn.execute(f"DELETE FROM {keys_table}")
+    conn.executemany(f"INSERT INTO {keys_table} VALUES ({','.join(['?'] * len(key_cols))})", list(batch))
+    match = f"({', '.join(key_cols)}) IN (SELECT {', '.join(key_cols)} FROM {keys_table})"
+    ambiguous = conn.execute(
+        f"SELECT {', '.join(key_cols)}, COUNT(*) FROM {table} WHERE {match} GROUP BY {', '.join(key_cols)} HAVING COUNT(*) > 1 LIMIT 1"
+    ).fetchone()
+    if ambiguous:
+        key = ", ".join(f"{c}={v}" for c, v in zip(key_cols, ambiguous))
+        raise ValueError(f"{table} has {ambiguous[-1]} rows with {key}; cannot tell which one the batch replaces")
+
+    # Replaced rows may have been booked to a different line than their replacement.
+    old_keys = conn.execute(f"SELECT DISTINCT {', '.join(line_cols)} FROM {table} WHERE {match}").fetchall()
+    replaced = conn.execute(f"DELETE FROM {table} WHERE {match}").rowcount
+    inserted = insert_chunks(
+        conn,
+        f"INSERT INTO {table} ({','.join(cols)}) VALUES ({','.join(['?'] * len(cols))})",
+        iter(batch.values()),
+    )
+    new_keys = {tuple(row[i] for i in line_idx) for row in batch.values()}
+    touched = {tuple(k) for k in old_keys} | new_keys
+    if len(line_cols) == 2:
+        mark_dirty_lines(conn, sorted(touched))
+
+    return {
+        "table": table,
+        "received": received,
+        "inserted": inserted,
+        "replaced": replaced,
+        "projects": sorted({k[0] for k in touched}),
+    }
+
+
+def ingest_batch(
+    table: str,
+    records: Iterable[dict[str, Any]],
+    db_path: Path = DB_PATH,
+    refresh: bool = True,
+    history_path: Path | None = HISTORY_DB_PATH,
+) -> dict[str, Any]:
+    """Apply one batch atomically, then refresh metrics and dossiers for the affected projects.
+
+    The refresh snapshots the new metrics into `history_path`; None skips the snapshot.
+    """
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        try:
+            summary = ingest_rows(conn, table, records)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if refresh and summary["inserted"]:
+            run_compute_engine(db_path, incremental=True, history_path=history_path)
+            if history_path is not None:
+                record_snapshot(conn, history_path=history_path)
+            for project_id in summary["projects"]:
+                build_project_dossier(conn, project_id)
+            build_portfolio(conn)
+            conn.commit()
+        return summary
+    finally:
+        conn.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Append a delta batch of field data and refresh metrics.")
+    parser.add_argument("table", choices=sorted(NATURAL_KEYS))
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", choices=["csv", "jsonl"], default=None)
+    parser.add_argument("--no-refresh", action="store_true")
+    args = parser.parse_args()
+
+    fmt = args.format or ("jsonl" if args.path.suffix in (".jsonl", ".ndjson") else "csv")
+    records = parse_batch(args.path.read_text(encoding="utf-8"), fmt)
+    summary = ingest_batch(args.table, records, refresh=not args.no_refresh)
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
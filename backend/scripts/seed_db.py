@@ -1,9 +1,12 @@
 from __future__ import annotations
 
-import csv
 from pathlib import Path
 import sqlite3
 
+from backend.db.change_orders import normalize_change_order_lines
+from backend.db.loader import CHUNK_SIZE, bulk_load, load_csv, number_duplicate_ids, split_schema
+from backend.db.search import ensure_field_notes_index
+
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "data"
 DB_PATH = ROOT / "hvac.db"
@@ -20,35 +23,44 @@ TABLE_FILES = {
     "change_orders": "change_orders.csv",
     "rfis": "rfis.csv",
     "field_notes": "field_notes.csv",
+    "trigger_thresholds": "trigger_thresholds.csv",
 }
+# ID columns the source repeats (labor_logs has OVR- rows logged twice) but delta ingest upserts on.
+UNIQUE_ID_COLUMNS = {"labor_logs": "log_id"}
 
 
-def seed_db() -> None:
-    if DB_PATH.exists():
-        DB_PATH.unlink()
+def seed_db(db_path: Path = DB_PATH, chunk_size: int = CHUNK_SIZE, data_dir: Path = DATA_DIR) -> list[tuple]:
+    """Rebuild the database from the CSVs in `data_dir`; returns change orders whose SOV lines could not be mapped."""
+    # Stale WAL/SHM sidecars from a previous database must not be replayed into the new file.
+    for path in (db_path, db_path.with_name(db_path.name + "-wal"), db_path.with_name(db_path.name + "-shm")):
+        if path.exists():
+            path.unlink()
 
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     try:
         conn.execute("PRAGMA foreign_keys = OFF")
-        with SCHEMA.open("r", encoding="utf-8") as f:
-            conn.executescript(f.read())
-
-        for table, filename in TABLE_FILES.items():
-            path = DATA_DIR / filename
-            with path.open("r", encoding="utf-8", newline="") as f:
-                reader = csv.DictReader(f)
-                cols = reader.fieldnames or []
-                placeholders = ",".join(["?"] * len(cols))
-                col_names = ",".join(cols)
-                sql = f"INSERT INTO {table} ({col_names}) VALUES ({placeholders})"
-                rows = [tuple(row.get(c, None) for c in cols) for row in reader]
-                conn.executemany(sql, rows)
-
-        conn.commit()
+        tables_sql, indexes_sql = split_schema(SCHEMA.read_text(encoding="utf-8"))
+        conn.executescript(tables_sql)
+
+        with bulk_load(conn):
+            for table, filename in TABLE_FILES.items():
+                load_csv(conn, table, data_dir / filename, chunk_size)
+                conn.commit()
+            co_issues = normalize_change_order_lines(conn)
+            for table, column in UNIQUE_ID_COLUMNS.items():
+                number_duplicate_ids(conn, table, column)
+            conn.commit()
+            # Building indexes once over the loaded tables beats maintaining them per insert.
+            conn.executescript(indexes_sql)
+            ensure_field_notes_index(conn)
+            conn.commit()
     finally:
         conn.close()
+    return co_issues
 
 
 if __name__ == "__main__":
-    seed_db()
+    issues = seed_db()
     print(f"Seeded DB at {DB_PATH}")
+    for project_id, co_number, issue, sov_line_id, raw_value in issues:
+        print(f"  {project_id} {co_number}: {issue} {sov_line_id or raw_value!r}")
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
 import sqlite3
+import tempfile
+from contextlib import closing
 from pathlib import Path
 import unittest
 
-from backend.scripts.seed_db import seed_db
+from backend.benchmarks.synthetic import generate_portfolio
+from backend.db.change_orders import normalize_change_order_lines, parse_affected_sov_lines
+from backend.db.loader import split_schema
+from backend.scripts.seed_db import SCHEMA, seed_db
 
 DB_PATH = Path(__file__).resolve().parents[1] / "hvac.db"
 
@@ -45,6 +50,90 @@ class TestPhase1(unittest.TestCase):
         finally:
             conn.close()
 
+    def test_numeric_columns_typed(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            for table, col in [
+                ("labor_logs", "hours_st"),
+                ("labor_logs", "burden_multiplier"),
+                ("material_deliveries", "total_cost"),
+                ("billing_line_items", "application_number"),
+            ]:
+                bad = conn.execute(
+                    f"SELECT COUNT(*) FROM {table} WHERE typeof({col}) NOT IN ('real', 'integer', 'null')"
+                ).fetchone()[0]
+                self.assertEqual(bad, 0, f"{table}.{col}")
+            indexes = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'").fetchall()}
+            self.assertIn("idx_labor_project_date", indexes)
+        finally:
+            conn.close()
+
+    def test_change_order_lines_normalized(self):
+        self.assertEqual(parse_affected_sov_lines("['A', 'B']"), (["A", "B"], None))
+        self.assertEqual(parse_affected_sov_lines("[A, B"), ([], "malformed"))
+        self.assertEqual(parse_affected_sov_lines("[]"), ([], "empty"))
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            mismatched = conn.execute(
+                """
+                SELECT COUNT(*) FROM change_orders c
+                JOIN (SELECT project_id, co_number, SUM(allocated_amount) total FROM change_order_sov_lines
+                      GROUP BY project_id, co_number) l USING (project_id, co_number)
+                WHERE ABS(l.total - c.amount) > 1e-6
+                """
+            ).fetchone()[0]
+            self.assertEqual(mismatched, 0)
+
+            project_id, co_number = conn.execute("SELECT project_id, co_number FROM change_orders LIMIT 1").fetchone()
+            conn.execute(
+                "UPDATE change_orders SET affected_sov_lines=? WHERE project_id=? AND co_number=?",
+                ("['Unknown']", project_id, co_number),
+            )
+            issues = normalize_change_order_lines(conn)
+            self.assertEqual([i[:4] for i in issues], [(project_id, co_number, "unknown_sov_line", "Unknown")])
+            stored = conn.execute("SELECT COUNT(*) FROM change_order_sov_line_issues").fetchone()[0]
+            self.assertEqual(stored, 1)
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_schema_indexes_are_deferred(self):
+        sql = SCHEMA.read_text(encoding="utf-8")
+        _, indexes = split_schema(sql)
+        expected = sql.upper().count("CREATE INDEX") + sql.upper().count("CREATE UNIQUE INDEX")
+        self.assertGreater(expected, 0)
+        self.assertEqual(indexes.upper().count("CREATE INDEX") + indexes.upper().count("CREATE UNIQUE INDEX"), expected)
+        self.assertIn("idx_labor_line_cost", indexes)
+
+    def test_synthetic_portfolio(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            first, second = Path(tmp) / "a", Path(tmp) / "b"
+            counts = generate_portfolio(first, projects=7, labor_rows=40_000, seed=3)
+            generate_portfolio(second, projects=7, labor_rows=40_000, seed=3)
+            self.assertEqual(counts["contracts"], 7)
+            self.assertEqual(counts["labor_logs"], 40_000)
+            for path in first.iterdir():
+                self.assertEqual(path.read_bytes(), (second / path.name).read_bytes(), path.name)
+
+            db_path = Path(tmp) / "synthetic.db"
+            self.assertEqual(seed_db(db_path, data_dir=first), [])
+            with closing(sqlite3.connect(db_path)) as conn:
+                self.assertEqual(conn.execute("SELECT COUNT(*) FROM labor_logs").fetchone()[0], 40_000)
+                orphans = conn.execute(
+                    """
+                    SELECT COUNT(*) FROM labor_logs l
+                    LEFT JOIN sov s ON s.project_id = l.project_id AND s.sov_line_id = l.sov_line_id
+                    WHERE s.sov_line_id IS NULL
+                    """
+                ).fetchone()[0]
+                self.assertEqual(orphans, 0)
+                # Roles and the overtime share follow the seed data.
+                synthetic = conn.execute("SELECT COUNT(DISTINCT role), TOTAL(hours_ot) / TOTAL(hours_st) FROM labor_logs").fetchone()
+            with closing(sqlite3.connect(DB_PATH)) as conn:
+                seeded = conn.execute("SELECT COUNT(DISTINCT role), TOTAL(hours_ot) / TOTAL(hours_st) FROM labor_logs").fetchone()
+            self.assertEqual(synthetic[0], seeded[0])
+            self.assertAlmostEqual(synthetic[1], seeded[1], delta=0.2 * seeded[1])
+
 
 if __name__ == "__main__":
     unittest.main()
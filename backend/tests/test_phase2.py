@@ -1,11 +1,24 @@
 from __future__ import annotations
 
+import importlib.util
+import json
+import math
+import re
 import sqlite3
+from contextlib import closing
 from pathlib import Path
 import unittest
 
-from backend.compute import run_compute_engine
+from backend.compute import _run_stages, compute_point_in_time, run_compute_engine
+from backend.compute.daily_totals import refresh_daily_totals
+from backend.compute.incremental import collect_dirty_lines, mark_dirty_lines
+from backend.compute.triggers import RULES, compute_triggers, set_trigger_threshold
+from backend.scripts.ingest_delta import ingest_batch, ingest_rows, parse_batch
 from backend.scripts.seed_db import seed_db
+from backend.tools.co_detail import get_co_detail
+from backend.tools.field_notes import field_notes_page
+from backend.tools.labor_detail import get_labor_detail
+from backend.tools.rfi_detail import get_rfi_detail
 
 DB_PATH = Path(__file__).resolve().parents[1] / "hvac.db"
 
@@ -14,7 +27,7 @@ class TestPhase2(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         seed_db()
-        run_compute_engine(DB_PATH)
+        run_compute_engine(DB_PATH, history_path=None)
 
     def test_manual_labor_formula(self):
         conn = sqlite3.connect(DB_PATH)
@@ -43,6 +56,367 @@ class TestPhase2(unittest.TestCase):
         finally:
             conn.close()
 
+    def test_trigger_rules_and_threshold_overrides(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            types = {r[0] for r in conn.execute("SELECT DISTINCT type FROM triggers")}
+            self.assertLessEqual(types, {r.type for r in RULES})
+            self.assertIn("LINE_OVERRUN", types)
+
+            project_id = conn.execute("SELECT project_id FROM triggers WHERE type='LINE_OVERRUN' ORDER BY project_id LIMIT 1").fetchone()[0]
+            rows = conn.execute("SELECT trigger_id, type, affected_sov_lines FROM triggers WHERE project_id=?", (project_id,)).fetchall()
+            for trigger_id, trigger_type, affected in rows:
+                suffix = "".join(f"-{line}" for line in json.loads(affected))
+                self.assertEqual(trigger_id, f"{project_id}-TRG-{trigger_type}{suffix}")
+
+            others = conn.execute("SELECT COUNT(*) FROM triggers WHERE project_id<>?", (project_id,)).fetchone()[0]
+            set_trigger_threshold(conn, "LINE_OVERRUN", 1e9, project_id)
+            compute_triggers(conn)
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM triggers WHERE project_id=? AND type='LINE_OVERRUN'", (project_id,)).fetchone()[0], 0
+            )
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM triggers WHERE project_id<>?", (project_id,)).fetchone()[0], others)
+            # The triggers that still fire keep their ids.
+            kept = {r[0] for r in conn.execute("SELECT trigger_id FROM triggers WHERE project_id=?", (project_id,))}
+            self.assertEqual(kept, {r[0] for r in rows if r[1] != "LINE_OVERRUN"})
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_forecast_identities(self):
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            lines = conn.execute("SELECT * FROM computed_sov_forecasts").fetchall()
+            self.assertEqual(len(lines), conn.execute("SELECT COUNT(*) FROM computed_sov_metrics").fetchone()[0])
+            for f in lines:
+                self.assertTrue(0 <= f["pct_complete"] <= 1)
+                self.assertTrue(math.isclose(f["earned_value"], f["pct_complete"] * f["budget_at_completion"], abs_tol=1e-6))
+                self.assertTrue(math.isclose(f["estimate_at_completion"], f["actual_cost"] + f["estimate_to_complete"], abs_tol=1e-6))
+                if f["pct_complete"] == 1:
+                    self.assertEqual(f["estimate_to_complete"], 0)
+
+            # The burn rate is the least-squares slope of running labor cost over the trailing window.
+            f = conn.execute("SELECT * FROM computed_sov_forecasts WHERE labor_burn_rate > 0 LIMIT 1").fetchone()
+            points = conn.execute(
+                """
+                SELECT julianday(day), labor_cost FROM line_daily_totals
+                WHERE project_id=? AND sov_line_id=? AND day <= ? AND day >= DATE(?, '-90 days')
+                """,
+                (f["project_id"], f["sov_line_id"], f["status_date"], f["status_date"]),
+            ).fetchall()
+            n = len(points)
+            mx = sum(x for x, _ in points) / n
+            my = sum(y for _, y in points) / n
+            slope = sum((x - mx) * (y - my) for x, y in points) / sum((x - mx) ** 2 for x, _ in points)
+            self.assertTrue(math.isclose(f["labor_burn_rate"], slope, rel_tol=1e-9))
+
+            p = conn.execute("SELECT * FROM computed_project_forecasts WHERE project_id=?", (f["project_id"],)).fetchone()
+            eac = conn.execute(
+                "SELECT SUM(estimate_at_completion) FROM computed_sov_forecasts WHERE project_id=?", (f["project_id"],)
+            ).fetchone()[0]
+            self.assertTrue(math.isclose(p["estimate_at_completion"], eac))
+            self.assertTrue(math.isclose(p["projected_margin_pct"], (p["contract_value"] - eac) / p["contract_value"]))
+        finally:
+            conn.close()
+
+
+def _snapshot(conn: sqlite3.Connection) -> dict[str, list[tuple]]:
+    return {
+        "sov": conn.execute("SELECT * FROM computed_sov_metrics ORDER BY project_id, sov_line_id").fetchall(),
+        "projects": conn.execute("SELECT * FROM computed_project_metrics ORDER BY project_id").fetchall(),
+        "triggers": conn.execute("SELECT * FROM triggers ORDER BY trigger_id").fetchall(),
+        "forecasts": conn.execute("SELECT * FROM computed_sov_forecasts ORDER BY project_id, sov_line_id").fetchall(),
+        "project_forecasts": conn.execute("SELECT * FROM computed_project_forecasts ORDER BY project_id").fetchall(),
+    }
+
+
+class TestIncrementalCompute(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        seed_db()
+        run_compute_engine(DB_PATH, history_path=None)
+
+    def test_incremental_matches_full_rebuild(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            # Append a day of heavy overtime on one line and a delivery on another project.
+            conn.execute(
+                """
+                INSERT INTO labor_logs
+                SELECT project_id, log_id || '-INC', '2025-12-31', employee_id, role, sov_line_id,
+                       hours_st, hours_ot + 6, hourly_rate, burden_multiplier, work_area, cost_code
+                FROM labor_logs WHERE sov_line_id = (SELECT MIN(sov_line_id) FROM labor_logs)
+                """
+            )
+            conn.execute(
+                """
+                INSERT INTO material_deliveries
+                SELECT project_id, delivery_id || '-INC', '2025-12-31', sov_line_id, material_category,
+                       item_description, quantity, unit, unit_cost, total_cost * 40, po_number, vendor,
+                       received_by, condition_notes
+                FROM material_deliveries WHERE rowid = (SELECT MAX(rowid) FROM material_deliveries)
+                """
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        run_compute_engine(DB_PATH, incremental=True, history_path=None)
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            incremental = _snapshot(conn)
+        finally:
+            conn.close()
+
+        run_compute_engine(DB_PATH, history_path=None)
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            full = _snapshot(conn)
+        finally:
+            conn.close()
+
+        self.assertEqual(incremental, full)
+
+    def test_point_in_time_totals(self):
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            totals = "SELECT TOTAL(actual_labor_cost), TOTAL(actual_material_cost), TOTAL(billing_total) FROM computed_sov_metrics"
+            current = conn.execute(totals).fetchone()
+            compute_point_in_time(conn, "2099-12-31")
+            for got, want in zip(conn.execute(totals).fetchone(), current):
+                self.assertTrue(math.isclose(got, want, rel_tol=1e-9))
+            compute_point_in_time(conn, "2024-06-30")
+            early = conn.execute(totals).fetchone()
+            self.assertTrue(all(e < c for e, c in zip(early, current)))
+            # The stored metrics are untouched by the TEMP shadows.
+            self.assertEqual(conn.execute(totals.replace("FROM ", "FROM main.")).fetchone(), current)
+            manual = conn.execute(
+                """
+                SELECT TOTAL((hours_st + hours_ot*1.5) * hourly_rate * burden_multiplier)
+                FROM labor_logs WHERE date <= '2024-06-30'
+                """
+            ).fetchone()[0]
+            self.assertTrue(math.isclose(early[0], manual, rel_tol=1e-9))
+
+            # Scoping to one project computes just its rows, with the same values.
+            project_id = conn.execute("SELECT project_id FROM contracts ORDER BY project_id LIMIT 1").fetchone()[0]
+            project = "SELECT * FROM computed_project_metrics WHERE project_id=?"
+            lines = "SELECT * FROM computed_sov_metrics WHERE project_id=? ORDER BY sov_line_id"
+            want = conn.execute(project, (project_id,)).fetchall(), conn.execute(lines, (project_id,)).fetchall()
+            compute_point_in_time(conn, "2024-06-30", project_id)
+            self.assertEqual((conn.execute(project, (project_id,)).fetchall(), conn.execute(lines, (project_id,)).fetchall()), want)
+            self.assertEqual(conn.execute("SELECT DISTINCT project_id FROM computed_sov_metrics").fetchall(), [(project_id,)])
+        finally:
+            conn.close()
+
+
+class TestDeltaIngestion(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        seed_db()
+        run_compute_engine(DB_PATH, history_path=None)
+
+    def test_upsert_by_natural_key_matches_full_rebuild(self):
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            existing = dict(conn.execute("SELECT * FROM labor_logs WHERE log_id NOT LIKE 'OVR-%' LIMIT 1").fetchone())
+            other_line = conn.execute(
+                "SELECT sov_line_id FROM sov WHERE project_id=? AND sov_line_id != ? LIMIT 1",
+                (existing["project_id"], existing["sov_line_id"]),
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+        moved = dict(existing, sov_line_id=other_line, hours_ot=4)
+        added = dict(existing, log_id="DELTA-0001", date="2025-12-31")
+        records = parse_batch("\n".join(json.dumps(r) for r in [moved, added]), "jsonl")
+        summary = ingest_batch("labor_logs", records, DB_PATH, history_path=None)
+        self.assertEqual(summary["replaced"], 1)
+        self.assertEqual(summary["inserted"], 2)
+
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM labor_logs WHERE log_id=?", (existing["log_id"],)).fetchone()[0]
+            self.assertEqual(count, 1)
+            incremental = _snapshot(conn)
+        finally:
+            conn.close()
+
+        run_compute_engine(DB_PATH, history_path=None)
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            self.assertEqual(incremental, _snapshot(conn))
+        finally:
+            conn.close()
+
+    def test_repeated_source_ids_are_numbered_and_upsertable(self):
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            # The seed logs every OVR- row twice; the second copy is loaded as <log_id>#2.
+            first = dict(conn.execute("SELECT * FROM labor_logs WHERE log_id='OVR-001'").fetchone())
+            second = dict(conn.execute("SELECT * FROM labor_logs WHERE log_id='OVR-001#2'").fetchone())
+            self.assertEqual({**second, "log_id": "OVR-001"}, first)
+        finally:
+            conn.close()
+
+        summary = ingest_batch("labor_logs", [dict(first, hours_ot=4)], DB_PATH, history_path=None)
+        self.assertEqual((summary["replaced"], summary["inserted"]), (1, 1))
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            rows = conn.execute("SELECT log_id, hours_ot FROM labor_logs WHERE log_id IN ('OVR-001', 'OVR-001#2') ORDER BY log_id").fetchall()
+            self.assertEqual(rows, [("OVR-001", 4.0), ("OVR-001#2", second["hours_ot"])])
+            with self.assertRaises(sqlite3.IntegrityError):
+                conn.execute("INSERT INTO labor_logs(project_id, log_id) VALUES (?, 'OVR-001')", (first["project_id"],))
+        finally:
+            conn.rollback()
+            conn.close()
+
+    def test_ambiguous_natural_key_rejected(self):
+        # Note IDs are not enforced unique, so a duplicated one makes the upsert ambiguous.
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            note = dict(conn.execute("SELECT * FROM field_notes LIMIT 1").fetchone())
+            copy_rowid = conn.execute(
+                f"INSERT INTO field_notes ({', '.join(note)}) VALUES ({', '.join('?' * len(note))})", tuple(note.values())
+            ).lastrowid
+            conn.commit()
+        finally:
+            conn.close()
+
+        try:
+            with self.assertRaises(ValueError):
+                ingest_batch("field_notes", [dict(note, content="replaced")], DB_PATH, refresh=False)
+            count = sqlite3.connect(DB_PATH).execute("SELECT COUNT(*) FROM field_notes WHERE note_id=?", (note["note_id"],)).fetchone()[0]
+            self.assertEqual(count, 2)
+        finally:
+            with closing(sqlite3.connect(DB_PATH)) as conn:
+                conn.execute("DELETE FROM field_notes WHERE rowid=?", (copy_rowid,))
+                conn.commit()
+
+    def test_unknown_project_rejected_atomically(self):
+        before = sqlite3.connect(DB_PATH).execute("SELECT COUNT(*) FROM material_deliveries").fetchone()[0]
+        records = [{"project_id": "PRJ-NOPE", "delivery_id": "DEL-X", "sov_line_id": "NOPE", "total_cost": "1"}]
+        with self.assertRaises(sqlite3.IntegrityError):
+            ingest_batch("material_deliveries", records, DB_PATH, history_path=None)
+        after = sqlite3.connect(DB_PATH).execute("SELECT COUNT(*) FROM material_deliveries").fetchone()[0]
+        self.assertEqual(before, after)
+
+    def test_malformed_batches_are_unprocessable(self):
+        from fastapi.testclient import TestClient
+
+        from backend.main import app
+
+        client = TestClient(app)
+        with self.assertRaises(ValueError):
+            parse_batch('{"log_id": "A"}\n[1, 2]\n', "jsonl")
+        for body in (b"[1, 2]\n", b'{"log_id": "\xff"}\n'):
+            res = client.post("/api/ingest/labor_logs?format=jsonl", content=body)
+            self.assertEqual(res.status_code, 422)
+
+
+# Tables that grow with the data; a hot query may only reach them through an index.
+FACT_TABLES = ("labor_logs", "material_deliveries", "billing_line_items", "change_orders", "line_daily_totals", "field_notes")
+FACT_ALIAS = re.compile(rf"\b({'|'.join(FACT_TABLES)})\b(?:\s+(?:AS\s+)?([a-z]\w*))?")
+
+
+def _full_scans(conn: sqlite3.Connection, statements: list[str]) -> list[tuple[str, str]]:
+    """(plan step, statement) for each step that scans a fact table or builds a throwaway index on one."""
+    found = []
+    for sql in dict.fromkeys(statements):
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+            continue
+        names = set()
+        for table, alias in FACT_ALIAS.findall(sql):
+            names.update(n for n in (table, alias) if n)
+        if not names:
+            continue
+        for *_, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+            step = re.match(r"(SCAN|SEARCH) (?:main\.)?(\w+)", detail)
+            if step and step[2] in names and (
+                (step[1] == "SCAN" and "COVERING INDEX" not in detail) or "AUTOMATIC" in detail
+            ):
+                found.append((detail, " ".join(sql.split())[:200]))
+    return found
+
+
+class TestQueryPlans(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        seed_db()
+        run_compute_engine(DB_PATH, history_path=None)
+
+    def test_hot_queries_use_indexes(self):
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        statements: list[str] = []
+        try:
+            project_id, sov_line_id = conn.execute("SELECT project_id, sov_line_id FROM sov LIMIT 1").fetchone()
+            batches = {
+                table: [dict(conn.execute(f"SELECT * FROM {table} WHERE project_id=? LIMIT 1", (project_id,)).fetchone())]
+                for table in ("labor_logs", "material_deliveries", "field_notes")
+            }
+            co_number = conn.execute("SELECT co_number FROM change_orders WHERE project_id=? LIMIT 1", (project_id,)).fetchone()[0]
+            rfi_number = conn.execute("SELECT rfi_number FROM rfis WHERE project_id=? LIMIT 1", (project_id,)).fetchone()[0]
+
+            conn.set_trace_callback(statements.append)
+            refresh_daily_totals(conn)
+            _run_stages(conn, scoped=False)
+            for table, records in batches.items():
+                ingest_rows(conn, table, records)
+            mark_dirty_lines(conn, [(project_id, sov_line_id)])
+            collect_dirty_lines(conn)
+            refresh_daily_totals(conn, scoped=True)
+            _run_stages(conn, scoped=True)
+            first = get_labor_detail(conn, project_id, sov_line_id, limit=5)
+            get_labor_detail(conn, project_id, sov_line_id, limit=5, cursor=first["next_cursor"])
+            field_notes_page(conn, project_id)
+            field_notes_page(conn, project_id, keyword="duct")
+            get_co_detail(conn, co_number, project_id)
+            get_rfi_detail(conn, rfi_number, project_id)
+            compute_point_in_time(conn, "2024-06-30")
+            conn.set_trace_callback(None)
+
+            self.assertGreater(len(statements), 50)
+            self.assertEqual(_full_scans(conn, statements), [])
+        finally:
+            conn.rollback()
+            conn.close()
+
+
+@unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+class TestVectorizedEngine(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        seed_db()
+
+    def test_matches_sql_engine(self):
+        run_compute_engine(DB_PATH, history_path=None)
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            expected = _snapshot(conn)
+        finally:
+            conn.close()
+
+        run_compute_engine(DB_PATH, engine="numpy", history_path=None)
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            actual = _snapshot(conn)
+        finally:
+            conn.close()
+
+        for table, rows in expected.items():
+            self.assertEqual(len(rows), len(actual[table]), table)
+            for want, got in zip(rows, actual[table]):
+                for a, b in zip(want, got):
+                    if isinstance(a, float):
+                        self.assertTrue(math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6), (table, want, got))
+                    else:
+                        self.assertEqual(a, b, table)
+
 
 if __name__ == "__main__":
     unittest.main()
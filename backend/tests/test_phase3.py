@@ -5,7 +5,10 @@ import sqlite3
 from pathlib import Path
 import unittest
 
-from backend.reasoning.dossier_builder import build_project_dossier
+from backend.db.dossier_codec import decode_dossier, dossier_view, encode_dossier, pack_dossier
+from backend.reasoning.dossier_builder import assemble_project_dossier, build_project_dossier
+from backend.reasoning.evidence_puller import pull_evidence_for_trigger, pull_evidence_for_triggers
+from backend.reasoning.point_in_time import point_in_time_dossier
 from backend.reasoning.portfolio_builder import build_portfolio
 from backend.scripts.seed_db import seed_db
 from backend.compute import run_compute_engine
@@ -13,11 +16,52 @@ from backend.compute import run_compute_engine
 DB_PATH = Path(__file__).resolve().parents[1] / "hvac.db"
 
 
+def _per_trigger_evidence(conn: sqlite3.Connection, trigger_id: str) -> dict:
+    """The original one-trigger-at-a-time queries, kept as the oracle for the batched puller."""
+    t = conn.execute("SELECT * FROM triggers WHERE trigger_id=?", (trigger_id,)).fetchone()
+    project_id = t[1]
+    affected = json.loads(t[8] or "[]")
+    notes = conn.execute(
+        "SELECT note_id, date, note_type, content FROM field_notes WHERE project_id=? ORDER BY date DESC LIMIT 15",
+        (project_id,),
+    ).fetchall()
+    co_rows = conn.execute(
+        "SELECT co_number, date_submitted, amount, status, description FROM change_orders WHERE project_id=? ORDER BY date_submitted DESC LIMIT 10",
+        (project_id,),
+    ).fetchall()
+    rfi_rows = conn.execute(
+        "SELECT rfi_number, priority, status, subject FROM rfis WHERE project_id=? ORDER BY date_submitted DESC LIMIT 10",
+        (project_id,),
+    ).fetchall()
+    if affected:
+        q_marks = ",".join(["?"] * len(affected))
+        labor = conn.execute(
+            f"SELECT date, sov_line_id, hours_st, hours_ot, hourly_rate FROM labor_logs WHERE project_id=? AND sov_line_id IN ({q_marks}) LIMIT 50",
+            (project_id, *affected),
+        ).fetchall()
+    else:
+        labor = conn.execute(
+            "SELECT date, sov_line_id, hours_st, hours_ot, hourly_rate FROM labor_logs WHERE project_id=? LIMIT 50",
+            (project_id,),
+        ).fetchall()
+    return {
+        "trigger_id": trigger_id,
+        "project_id": project_id,
+        "trigger_type": t[3],
+        "trigger_value": t[5],
+        "affected_sov_lines": affected,
+        "field_notes": [dict(x) for x in notes],
+        "change_orders": [dict(x) for x in co_rows],
+        "rfis": [dict(x) for x in rfi_rows],
+        "labor_samples": [dict(x) for x in labor],
+    }
+
+
 class TestPhase3(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         seed_db()
-        run_compute_engine(DB_PATH)
+        run_compute_engine(DB_PATH, history_path=None)
         conn = sqlite3.connect(DB_PATH)
         conn.row_factory = sqlite3.Row
         try:
@@ -40,8 +84,8 @@ class TestPhase3(unittest.TestCase):
     def test_reasoning_shape(self):
         conn = sqlite3.connect(DB_PATH)
         try:
-            row = conn.execute("SELECT dossier_json FROM dossiers WHERE project_id != 'PORTFOLIO' LIMIT 1").fetchone()
-            d = json.loads(row[0])
+            row = conn.execute("SELECT dossier, codec FROM dossiers WHERE project_id != 'PORTFOLIO' LIMIT 1").fetchone()
+            d = dossier_view(decode_dossier(row[0], row[1]))
             self.assertIn("issues", d)
             if d["issues"]:
                 r = d["issues"][0]["reasoning"]
@@ -50,6 +94,78 @@ class TestPhase3(unittest.TestCase):
         finally:
             conn.close()
 
+    def test_point_in_time_evidence_is_dated_by_as_of(self):
+        as_of = "2024-09-30"
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            rfi_dates = dict(conn.execute("SELECT project_id || rfi_number, date_submitted FROM rfis").fetchall())
+        finally:
+            conn.close()
+
+        def dates(dossier):
+            for issue in dossier["issues"]:
+                evidence = issue["evidence"]
+                yield from (n["date"] for n in evidence["field_notes"])
+                yield from (c["date_submitted"] for c in evidence["change_orders"])
+                yield from (rfi_dates[dossier["project_id"] + r["rfi_number"]] for r in evidence["rfis"])
+                yield from (row["date"] for row in evidence["labor_samples"])
+
+        seen, later_today = [], []
+        for project_id in ("PRJ-2024-001", "PRJ-2024-002", "PRJ-2024-003", "PRJ-2024-004", "PRJ-2024-005"):
+            seen.extend(dates(point_in_time_dossier(project_id, as_of, DB_PATH)))
+            conn = sqlite3.connect(DB_PATH)
+            conn.row_factory = sqlite3.Row
+            try:
+                later_today.extend(d for d in dates(assemble_project_dossier(conn, project_id)) if d > as_of)
+            finally:
+                conn.close()
+        self.assertTrue(later_today)
+        self.assertTrue(seen)
+        self.assertEqual([d for d in seen if d > as_of], [])
+
+    def test_batched_evidence_matches_per_trigger(self):
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            project_id = conn.execute(
+                "SELECT project_id FROM triggers GROUP BY project_id ORDER BY COUNT(*) DESC LIMIT 1"
+            ).fetchone()[0]
+            trigger_ids = [r[0] for r in conn.execute("SELECT trigger_id FROM triggers WHERE project_id=?", (project_id,))]
+            batched = pull_evidence_for_triggers(conn, project_id, trigger_ids)
+            self.assertEqual(sorted(batched), sorted(trigger_ids))
+            # Both line triggers and project-wide triggers are covered.
+            self.assertEqual({bool(e["affected_sov_lines"]) for e in batched.values()}, {True, False})
+            for trigger_id in trigger_ids:
+                self.assertEqual(batched[trigger_id], _per_trigger_evidence(conn, trigger_id))
+                self.assertEqual(pull_evidence_for_trigger(conn, trigger_id), batched[trigger_id])
+                self.assertLessEqual(len(batched[trigger_id]["labor_samples"]), 50)
+        finally:
+            conn.close()
+
+    def test_compact_dossier_round_trip(self):
+        conn = sqlite3.connect(DB_PATH)
+        conn.row_factory = sqlite3.Row
+        try:
+            project_id = conn.execute(
+                "SELECT project_id FROM triggers GROUP BY project_id ORDER BY COUNT(*) DESC LIMIT 1"
+            ).fetchone()[0]
+            dossier = assemble_project_dossier(conn, project_id)
+        finally:
+            conn.close()
+        packed = pack_dossier(dossier)
+        # Project-level evidence is stored once, not once per trigger.
+        self.assertLess(len(packed["shared_evidence"]), 4 * len(dossier["issues"]))
+        self.assertEqual(dossier_view(packed), dossier)
+
+        blob, codec = encode_dossier(dossier)
+        self.assertLess(len(blob), len(json.dumps(dossier)) / 10)
+        decoded = decode_dossier(blob, codec)
+        self.assertEqual(json.loads(json.dumps(dossier_view(decoded))), json.loads(json.dumps(dossier)))
+        self.assertTrue(all("evidence" not in i for i in dossier_view(decoded, "none")["issues"]))
+        refs = dossier_view(decoded, "refs")
+        self.assertEqual(refs["issues"][0]["evidence"]["rfis"], {"$ref": refs["issues"][0]["evidence"]["rfis"]["$ref"]})
+        self.assertEqual(decode_dossier(*encode_dossier({"headline": "x"})), {"headline": "x"})
+
 
 if __name__ == "__main__":
     unittest.main()
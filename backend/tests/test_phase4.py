@@ -1,11 +1,18 @@
 from __future__ import annotations
 
-import json
 import sqlite3
+import tempfile
+from contextlib import closing
 from pathlib import Path
 import unittest
+from unittest import mock
 
-from backend.scripts.build_dossiers import build_all
+from backend.compute import run_compute_engine
+from backend.db.dossier_codec import decode_dossier
+from backend.db.history import pipeline_runs, project_trend, record_pipeline_run, record_snapshot
+from backend.routes.pipeline import _pipeline_metrics
+from backend.scripts import build_dossiers as build_module
+from backend.scripts.build_dossiers import build_all, build_dossiers
 
 DB_PATH = Path(__file__).resolve().parents[1] / "hvac.db"
 
@@ -13,18 +20,119 @@ DB_PATH = Path(__file__).resolve().parents[1] / "hvac.db"
 class TestPhase4(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        build_all()
+        build_all(history_path=None)
 
     def test_portfolio_payload(self):
         conn = sqlite3.connect(DB_PATH)
         try:
-            row = conn.execute("SELECT dossier_json FROM dossiers WHERE project_id='PORTFOLIO'").fetchone()
+            row = conn.execute("SELECT dossier, codec FROM dossiers WHERE project_id='PORTFOLIO'").fetchone()
             self.assertIsNotNone(row)
-            d = json.loads(row[0])
+            d = decode_dossier(row[0], row[1])
             self.assertEqual(d.get("project_count"), 5)
         finally:
             conn.close()
 
+    def _dossiers(self) -> dict[str, bytes]:
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            return dict(conn.execute("SELECT project_id, dossier FROM dossiers").fetchall())
+        finally:
+            conn.close()
+
+    def test_parallel_build_matches_serial(self):
+        build_dossiers(DB_PATH, workers=1)
+        serial = self._dossiers()
+        opened: list[sqlite3.Connection] = []
+
+        def open_reader(db_path, tracked=None):
+            real_open_reader(db_path, tracked)
+            opened.append(build_module._worker.conn)
+
+        real_open_reader = build_module._open_reader
+        with mock.patch.object(build_module, "_open_reader", open_reader):
+            build_dossiers(DB_PATH, workers=4)
+        self.assertEqual(self._dossiers(), serial)
+        # The thread workers' connections are closed once the pool shuts down.
+        self.assertTrue(opened)
+        for conn in opened:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+        build_dossiers(DB_PATH, workers=2, processes=True)
+        self.assertEqual(self._dossiers(), serial)
+
+    def test_snapshots_append_per_run_date(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_copy, history = Path(tmp) / "hvac.db", Path(tmp) / "history.db"
+            with closing(sqlite3.connect(DB_PATH)) as source, closing(sqlite3.connect(db_copy)) as target:
+                source.backup(target)
+            conn = sqlite3.connect(db_copy)
+            try:
+                project_id, score = conn.execute("SELECT project_id, health_score FROM computed_project_metrics LIMIT 1").fetchone()
+                record_snapshot(conn, "2025-01-01", history)
+                conn.execute("UPDATE computed_project_metrics SET health_score = health_score - 5 WHERE project_id=?", (project_id,))
+                with self.assertRaises(ValueError):
+                    record_snapshot(conn, "2025-02-01", history)
+                conn.commit()
+                record_snapshot(conn, "2025-02-01", history)
+                conn.execute("UPDATE computed_project_metrics SET health_score = health_score - 5 WHERE project_id=?", (project_id,))
+                conn.commit()
+                record_snapshot(conn, "2025-02-01", history)
+            finally:
+                conn.close()
+
+            reader = sqlite3.connect(history)
+            reader.row_factory = sqlite3.Row
+            try:
+                trend = project_trend(reader, project_id)
+                self.assertEqual([p["run_date"] for p in trend], ["2025-01-01", "2025-02-01"])
+                self.assertEqual([p["health_score"] for p in trend], [score, score - 10])
+                self.assertEqual(len(project_trend(reader, project_id, start="2025-01-15")), 1)
+                line = project_trend(reader, project_id, sov_line_id=f"{project_id}-SOV-01")
+                self.assertEqual(len(line), 2)
+                self.assertIn("overrun_pct", line[0])
+                self.assertEqual(project_trend(sqlite3.connect(":memory:"), project_id), [])
+            finally:
+                reader.close()
+
+    def test_pipeline_run_telemetry(self):
+        run = run_compute_engine(DB_PATH, history_path=None)
+        self.assertEqual(run["mode"], "full")
+        stages = {s["stage"]: s for s in run["stages"]}
+        for name in ("compute_labor", "finalize_sov_metrics", "compute_triggers", "compute_forecasts"):
+            self.assertIn(name, stages)
+        self.assertGreater(stages["compute_labor"]["rows_written"], 0)
+        self.assertGreater(stages["compute_labor"]["statements"], 0)
+        self.assertGreater(stages["compute_labor"]["vm_steps"], 0)
+        self.assertEqual(run["rows_written"], sum(s["rows_written"] for s in run["stages"]))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            history = Path(tmp) / "history.db"
+            record_pipeline_run(run, history)
+            record_pipeline_run({**run, "run_id": "older", "started_at": "2020-01-01T00:00:00+00:00"}, history)
+
+            reader = sqlite3.connect(history)
+            reader.row_factory = sqlite3.Row
+            try:
+                runs = pipeline_runs(reader)
+                self.assertEqual([r["run_id"] for r in runs], [run["run_id"], "older"])
+                self.assertEqual([s["stage"] for s in runs[0]["stages"]], [s["stage"] for s in run["stages"]])
+                self.assertEqual(runs[0]["rows_written"], run["rows_written"])
+                self.assertEqual(len(pipeline_runs(reader, limit=1)), 1)
+                self.assertEqual(pipeline_runs(reader, mode="numpy"), [])
+                self.assertEqual(pipeline_runs(sqlite3.connect(":memory:")), [])
+                metrics = list(_pipeline_metrics(runs[:1]))
+                self.assertIn("# TYPE hvac_pipeline_stage_seconds gauge", metrics)
+                self.assertTrue(any(line.startswith('hvac_pipeline_stage_rows_written{mode="full",stage="compute_labor"} ') for line in metrics))
+
+                record_pipeline_run({**run, "run_id": "newest", "started_at": "2099-01-01T00:00:00+00:00"}, history, keep=2)
+                self.assertEqual([r["run_id"] for r in pipeline_runs(reader)], ["newest", run["run_id"]])
+            finally:
+                reader.close()
+
+            # Telemetry is best-effort: an unusable history path does not fail a committed run.
+            with self.assertLogs("backend.compute", "WARNING"):
+                run_compute_engine(DB_PATH, incremental=True, history_path=Path(tmp) / "missing" / "history.db")
+
 
 if __name__ == "__main__":
     unittest.main()
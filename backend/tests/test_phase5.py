@@ -1,11 +1,30 @@
 from __future__ import annotations
 
+import asyncio
+import importlib.util
+import math
 import os
+import re
 import sqlite3
+import tempfile
+import threading
+from contextlib import closing
 from pathlib import Path
 import unittest
 
-from backend.db.connection import get_connection
+from backend.db.connection import ConnectionPool
+from backend.db.dossier_cache import DossierCache, dossier_cache
+from backend.db.dossier_codec import encode_dossier
+from backend.db.search import FTS_TABLE, fts5_available
+from backend.db.slow_queries import SlowQueryLog
+from backend.reasoning.dossier_builder import store_dossier
+from backend.scripts.ingest_delta import ingest_batch
+from backend.tools.email_outbox import EmailOutbox
+from backend.tools.co_detail import get_co_detail
+from backend.tools.field_notes import _search_like, field_notes_page, get_field_notes
+from backend.tools.labor_detail import get_labor_detail
+from backend.tools.paging import encode_cursor
+from backend.tools.rfi_detail import get_rfi_detail
 from backend.tools.send_email import LOG_FILE, send_email
 from backend.tools.what_if_margin import what_if_margin
 from backend.scripts.build_dossiers import build_all
@@ -16,7 +35,7 @@ DB_PATH = Path(__file__).resolve().parents[1] / "hvac.db"
 class TestPhase5(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
-        build_all()
+        build_all(history_path=None)
 
     def test_what_if_margin(self):
         conn = sqlite3.connect(DB_PATH)
@@ -28,6 +47,144 @@ class TestPhase5(unittest.TestCase):
         finally:
             conn.close()
 
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+    def test_what_if_batch_matches_single_scenarios(self):
+        from backend.tools.what_if_batch import what_if_batch
+
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            recoveries = [i * 10000.0 for i in range(100)]
+            grid = what_if_batch(conn, recovery_amounts=recoveries, co_approval_probs=[0, 0.5, 1], overtime_freezes=[0, 0.5])
+            self.assertEqual(len(grid["scenarios"]["recovery_amount"]), 600)
+            self.assertEqual(len(grid["margin_pct"]), 5)
+            self.assertEqual(len(grid["portfolio_margin_pct"]), 600)
+            # Recovery varies slowest, so column 6 * k is recoveries[k] with no other lever applied.
+            project_id = grid["project_ids"][2]
+            single = what_if_margin(conn, project_id, recoveries[7])
+            self.assertTrue(math.isclose(grid["margin_pct"][2][6 * 7], single["new_realized_margin_pct"]))
+            # Billing pending change orders can only help.
+            self.assertGreaterEqual(grid["margin_pct"][2][2], grid["margin_pct"][2][0])
+
+            listed = what_if_batch(conn, [project_id], scenarios=[{"recovery_amount": recoveries[7]}])
+            self.assertEqual(listed["margin_pct"], [[grid["margin_pct"][2][6 * 7]]])
+            with self.assertRaises(ValueError):
+                what_if_batch(conn, scenarios=[{"co_approval_prob": 1.5}])
+            # Rejected on size alone; building 1e9 cells would exhaust memory.
+            huge = [0.0] * 1000
+            with self.assertRaisesRegex(ValueError, "exceeds the limit"):
+                what_if_batch(conn, recovery_amounts=huge, co_approval_probs=huge, overtime_freezes=huge)
+            stored = dict(conn.execute("SELECT project_id, ot_premium FROM computed_project_metrics").fetchall())
+            scanned = conn.execute(
+                "SELECT project_id, TOTAL(hours_ot * 0.5 * hourly_rate * burden_multiplier) FROM labor_logs GROUP BY project_id"
+            ).fetchall()
+            for project, premium in scanned:
+                self.assertTrue(math.isclose(stored[project], premium, rel_tol=1e-9))
+        finally:
+            conn.close()
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy not installed")
+    def test_margin_risk_is_seeded_and_parallel_safe(self):
+        import numpy as np
+
+        from backend.tools.margin_risk import CHUNK_CELLS, chunk_samples, load_risk_inputs, simulate_margin_risk
+
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            inputs = load_risk_inputs(conn)
+        finally:
+            conn.close()
+        step = chunk_samples(inputs)
+        self.assertLessEqual(step * (len(inputs["line_etc"]) + len(inputs["co_amount"])), CHUNK_CELLS)
+        samples = step + 1000
+        serial = simulate_margin_risk(inputs, samples, seed=11, workers=1)
+        self.assertEqual(simulate_margin_risk(inputs, samples, seed=11, workers=2), serial)
+        self.assertNotEqual(simulate_margin_risk(inputs, samples, seed=12, workers=1), serial)
+        for summary in serial["projects"] + [serial["portfolio"]]:
+            self.assertLessEqual(summary["p10"], summary["p50"])
+            self.assertLessEqual(summary["p50"], summary["p90"])
+
+        # A large pending change order on the first project splits its outcomes around the approval rate.
+        amount = inputs["revenue"][0] * 0.2
+        with_co = dict(inputs, co_project=np.array([0]), co_amount=np.array([amount]), co_prob=np.array([0.5]))
+        risky = simulate_margin_risk(with_co, 5000, seed=11, workers=1)["projects"][0]
+        calm = simulate_margin_risk(inputs, 5000, seed=11, workers=1)["projects"][0]
+        self.assertGreater(risky["p90"] - risky["p10"], calm["p90"] - calm["p10"])
+        # An approved CO bills its amount on top of the cost of its work; the cost is booked either way.
+        first = np.eye(len(inputs["revenue"]))[0] * amount
+        approved = simulate_margin_risk(dict(with_co, co_prob=np.array([1.0])), 5000, seed=11, workers=1)["projects"][0]
+        booked = dict(inputs, revenue=inputs["revenue"] + first, committed_cost=inputs["committed_cost"] + first)
+        self.assertAlmostEqual(approved["p50"], simulate_margin_risk(booked, 5000, seed=11, workers=1)["projects"][0]["p50"])
+        with self.assertRaises(ValueError):
+            simulate_margin_risk(inputs, 0)
+
+    def test_chat_streams_answer_before_rows(self):
+        from fastapi.testclient import TestClient
+
+        from backend.main import app
+
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            project_id, line = conn.execute("SELECT project_id, sov_line_id FROM labor_logs LIMIT 1").fetchone()
+        finally:
+            conn.close()
+        client = TestClient(app)
+        body = {"project_id": project_id, "message": f"labor detail for {line} sov"}
+        res = client.post("/api/chat", json=body, headers={"Accept": "text/event-stream"})
+        self.assertTrue(res.headers["content-type"].startswith("text/event-stream"))
+        events = [line[len("event: "):] for line in res.text.splitlines() if line.startswith("event: ")]
+        self.assertEqual(events[:2], ["answer", "tool"])
+        self.assertEqual(events[-2:], ["data", "done"])
+        rows = client.post("/api/chat", json=body).json()["data"]["rows"]
+        self.assertEqual(events.count("row"), len(rows))
+
+    def test_dossier_evidence_views(self):
+        from fastapi.testclient import TestClient
+
+        from backend.main import app
+
+        project_id = sqlite3.connect(DB_PATH).execute("SELECT project_id FROM contracts LIMIT 1").fetchone()[0]
+        client = TestClient(app)
+        full = client.get(f"/api/dossier/{project_id}")
+        none = client.get(f"/api/dossier/{project_id}?evidence=none")
+        refs = client.get(f"/api/dossier/{project_id}?evidence=refs")
+        self.assertEqual(len({full.headers["etag"], none.headers["etag"], refs.headers["etag"]}), 3)
+        self.assertLess(len(refs.content), len(full.content))
+        self.assertLess(len(none.content), len(refs.content))
+        issues = full.json()["issues"]
+        self.assertTrue(issues and all(isinstance(i["evidence"]["field_notes"], list) for i in issues))
+        self.assertEqual([i["trigger_id"] for i in none.json()["issues"]], [i["trigger_id"] for i in issues])
+        shared = refs.json()["shared_evidence"]
+        self.assertEqual(shared[refs.json()["issues"][0]["evidence"]["rfis"]["$ref"]], issues[0]["evidence"]["rfis"])
+        again = client.get(f"/api/dossier/{project_id}?evidence=none", headers={"If-None-Match": none.headers["etag"]})
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(client.get(f"/api/dossier/{project_id}?evidence=some").status_code, 422)
+
+    def test_request_metrics_endpoint(self):
+        from fastapi.testclient import TestClient
+
+        from backend.main import app
+
+        client = TestClient(app)
+        dossier_cache.invalidate()
+        size = len(client.get("/api/portfolio").content)
+        client.post("/api/tools/what-if-batch", json={"recovery_amounts": [0, 1000]})
+        client.get("/api/nowhere")
+        res = client.get("/metrics")
+        self.assertTrue(res.headers["content-type"].startswith("text/plain; version=0.0.4"))
+        lines = res.text.splitlines()
+        self.assertIn("hvac_http_requests_in_flight 1", lines)
+        self.assertIn('hvac_http_request_duration_seconds_bucket{method="GET",route="/api/portfolio",le="+Inf"}', res.text)
+        self.assertIn('hvac_http_responses_total{method="GET",route="unmatched",status="404"}', res.text)
+        route = '{method="POST",route="/api/tools/what-if-batch"}'
+        samples = {l.split(" ")[0]: float(l.split(" ")[1]) for l in lines if not l.startswith("#")}
+        self.assertGreater(samples[f"hvac_http_request_db_seconds_sum{route}"], 0)
+        self.assertGreater(samples[f"hvac_http_request_serialize_seconds_sum{route}"], 0)
+        self.assertGreaterEqual(samples['hvac_http_response_size_bytes_sum{method="GET",route="/api/portfolio"}'], size)
+        # Encoding a cached dossier's body counts as serialization, not DB time.
+        self.assertGreater(samples['hvac_http_request_serialize_seconds_sum{method="GET",route="/api/portfolio"}'], 0)
+        self.assertIn('hvac_db_pool_checkouts_total{pool="read"}', res.text)
+        self.assertIn("hvac_sqlite_slow_queries_total", res.text)
+
     def test_email_log_fallback(self):
         if LOG_FILE.exists():
             LOG_FILE.unlink()
@@ -35,6 +192,269 @@ class TestPhase5(unittest.TestCase):
         self.assertEqual(res["delivery"], "logged")
         self.assertTrue(LOG_FILE.exists())
 
+    def test_email_outbox_sends_in_background(self):
+        async def scenario():
+            outbox = EmailOutbox(workers=1)
+            queued = outbox.submit(to="pm@example.com", subject="Queued", body="Body")
+            self.assertEqual(queued["delivery"], "queued")
+            await outbox.drain(timeout=5)
+            return outbox.status(queued["message_id"])
+
+        self.assertEqual(asyncio.run(scenario())["delivery"], "logged")
+
+
+class TestDossierCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        build_all(history_path=None)
+
+    def setUp(self):
+        self.connects = 0
+
+    def _connect(self):
+        self.connects += 1
+        return closing(sqlite3.connect(DB_PATH))
+
+    def test_fresh_entries_skip_the_database(self):
+        cache = DossierCache(revalidate_after=60)
+        first = cache.get("PORTFOLIO", self._connect)
+        self.assertIsNotNone(first)
+        self.assertIs(cache.get("PORTFOLIO", self._connect), first)
+        self.assertEqual(self.connects, 1)
+        self.assertEqual(cache.parsed(first)["project_count"], 5)
+        self.assertIsNone(cache.get("PRJ-MISSING", self._connect))
+
+    def test_reloads_when_updated_at_moves(self):
+        cache = DossierCache(revalidate_after=0)
+        project_id = sqlite3.connect(DB_PATH).execute("SELECT project_id FROM contracts LIMIT 1").fetchone()[0]
+        before = cache.get(project_id, self._connect)
+        self.assertIs(cache.get(project_id, self._connect), before)
+
+        conn = sqlite3.connect(DB_PATH)
+        try:
+            store_dossier(conn, project_id, *encode_dossier({"project_id": "changed"}))
+            conn.commit()
+        finally:
+            conn.close()
+        after = cache.get(project_id, self._connect)
+        self.assertNotEqual(after.etag, before.etag)
+        self.assertEqual(cache.parsed(after)["project_id"], "changed")
+        build_all(history_path=None)
+
+    def test_lru_respects_memory_bound(self):
+        cache = DossierCache(max_bytes=1, revalidate_after=60)
+        ids = [r[0] for r in sqlite3.connect(DB_PATH).execute("SELECT project_id FROM dossiers").fetchall()]
+        for project_id in ids:
+            cache.get(project_id, self._connect)
+        self.assertEqual(cache.stats()["entries"], 1)
+
+
+@unittest.skipUnless(fts5_available(sqlite3.connect(":memory:")), "SQLite built without FTS5")
+class TestFieldNoteSearch(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        build_all(history_path=None)
+
+    def setUp(self):
+        self.conn = sqlite3.connect(DB_PATH)
+        self.conn.row_factory = sqlite3.Row
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_phrase_and_prefix_search_with_snippets(self):
+        phrase = get_field_notes(self.conn, None, '"pressure test"', 500)
+        self.assertTrue(phrase)
+        self.assertTrue(all("[" in n["snippet"] for n in phrase))
+        like = _search_like(self.conn, None, [("pressure test", True, False)], 500)
+        self.assertLessEqual({n["note_id"] for n in like}, {n["note_id"] for n in phrase})
+
+        prefix = get_field_notes(self.conn, None, "insul*", 5)
+        self.assertTrue(prefix)
+        self.assertTrue(all("insul" in n["content"].lower() for n in prefix))
+
+        # Bare terms match substrings through the index, just like the LIKE fallback.
+        bare = get_field_notes(self.conn, None, "insul", 500)
+        self.assertTrue(any("insulation" in n["content"].lower() for n in bare))
+        like = _search_like(self.conn, None, [("insul", False, False)], 500)
+        self.assertEqual({n["note_id"] for n in bare}, {n["note_id"] for n in like})
+
+        # A prefix has to start a word, so insul* skips "reinsulate" where insul finds it.
+        project_id = self.conn.execute("SELECT project_id FROM contracts LIMIT 1").fetchone()[0]
+        note = {"project_id": project_id, "note_id": "FN-TEST-002", "date": "2025-03-02",
+                "note_type": "Daily Report", "content": "Crew will reinsulate the riser."}
+        ingest_batch("field_notes", [note], refresh=False)
+        def ids(notes):
+            return {n["note_id"] for n in notes}
+
+        try:
+            self.assertIn("FN-TEST-002", ids(get_field_notes(self.conn, None, "insul", 500)))
+            prefix = get_field_notes(self.conn, None, "insul*", 500)
+            self.assertNotIn("FN-TEST-002", ids(prefix))
+            self.assertTrue(all(re.search(r"\binsul", n["content"], re.IGNORECASE) for n in prefix))
+            like_prefix = _search_like(self.conn, None, [("insul", False, True)], 500)
+            self.assertEqual(ids(like_prefix), ids(prefix))
+            self.assertIn("FN-TEST-002", ids(_search_like(self.conn, None, [("reinsul", False, True)], 500)))
+        finally:
+            self.conn.execute("DELETE FROM field_notes WHERE note_id='FN-TEST-002'")
+            self.conn.commit()
+
+        project_id = phrase[0]["project_id"]
+        scoped = get_field_notes(self.conn, project_id, '"pressure test"', 500)
+        self.assertTrue(scoped and all(n["project_id"] == project_id for n in scoped))
+
+    def test_ingested_notes_are_indexed(self):
+        project_id = self.conn.execute("SELECT project_id FROM contracts LIMIT 1").fetchone()[0]
+        note = {"project_id": project_id, "note_id": "FN-TEST-001", "date": "2025-03-01",
+                "note_type": "Daily Report", "content": "Found a zeppelin-shaped duct blockage."}
+        ingest_batch("field_notes", [note], refresh=False)
+        hits = get_field_notes(self.conn, project_id, "zeppelin")
+        self.assertEqual([n["note_id"] for n in hits], ["FN-TEST-001"])
+
+        self.conn.execute("DELETE FROM field_notes WHERE note_id='FN-TEST-001'")
+        self.conn.commit()
+        self.assertEqual(get_field_notes(self.conn, project_id, "zeppelin"), [])
+        self.assertEqual(self.conn.execute(f"SELECT COUNT(*) FROM {FTS_TABLE}").fetchone()[0],
+                         self.conn.execute("SELECT COUNT(*) FROM field_notes").fetchone()[0])
+
+
+class TestToolPaging(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        build_all(history_path=None)
+
+    def setUp(self):
+        self.conn = sqlite3.connect(DB_PATH)
+        self.conn.row_factory = sqlite3.Row
+
+    def tearDown(self):
+        self.conn.close()
+
+    def _walk(self, fetch):
+        items, cursor = [], None
+        while True:
+            page = fetch(cursor)
+            items.extend(page["rows"] if "rows" in page else page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return items
+
+    def test_labor_pages_cover_every_row_and_totals_use_all_rows(self):
+        project_id, line, count = self.conn.execute(
+            "SELECT project_id, sov_line_id, COUNT(*) FROM labor_logs GROUP BY 1, 2 ORDER BY 3 DESC LIMIT 1"
+        ).fetchone()
+        rows = self._walk(lambda c: get_labor_detail(self.conn, project_id, line, 50, c, ["log_id", "date"]))
+        self.assertEqual(len(rows), count)
+        self.assertEqual(len({r["log_id"] for r in rows}), count)
+        self.assertEqual(set(rows[0]), {"log_id", "date"})
+        self.assertEqual([r["date"] for r in rows], sorted((r["date"] for r in rows), reverse=True))
+
+        detail = get_labor_detail(self.conn, project_id, line, limit=5)
+        manual = sum(
+            (st + 1.5 * ot) * rate * burden
+            for st, ot, rate, burden in self.conn.execute(
+                "SELECT hours_st, hours_ot, hourly_rate, burden_multiplier FROM labor_logs WHERE project_id=? AND sov_line_id=?",
+                (project_id, line),
+            )
+        )
+        self.assertEqual(detail["row_count"], count)
+        self.assertTrue(math.isclose(detail["computed_cost"], manual))
+        with self.assertRaises(ValueError):
+            get_labor_detail(self.conn, project_id, line, columns=["hourly_rate; DROP TABLE labor_logs"])
+        with self.assertRaises(ValueError):
+            get_labor_detail(self.conn, project_id, line, cursor="not-a-cursor")
+        with self.assertRaises(ValueError):
+            get_labor_detail(self.conn, project_id, line, cursor=encode_cursor([{}, 1]))
+
+    def test_field_note_pages_follow_ranking(self):
+        ranked = get_field_notes(self.conn, None, "duct", 500)
+        paged = self._walk(lambda c: field_notes_page(self.conn, None, "duct", 7, c, ["note_id"]))
+        self.assertEqual([n["note_id"] for n in paged], [n["note_id"] for n in ranked])
+        recent = self._walk(lambda c: field_notes_page(self.conn, None, "", 100, c, ["note_id"]))
+        self.assertEqual(len(recent), self.conn.execute("SELECT COUNT(*) FROM field_notes").fetchone()[0])
+
+    def test_detail_projection_is_scoped_to_project(self):
+        project_id, co_number = self.conn.execute("SELECT project_id, co_number FROM change_orders LIMIT 1").fetchone()
+        self.assertEqual(get_co_detail(self.conn, co_number, project_id, ["amount"]).keys(), {"amount"})
+        self.assertIsNone(get_co_detail(self.conn, co_number, "NOPE"))
+        project_id, rfi_number = self.conn.execute("SELECT project_id, rfi_number FROM rfis LIMIT 1").fetchone()
+        self.assertEqual(get_rfi_detail(self.conn, rfi_number, project_id)["rfi_number"], rfi_number)
+
+
+class TestConnectionPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / "pool.db"
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.commit()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_reuses_read_only_connections(self):
+        pool = ConnectionPool(self.db_path, size=2)
+        with pool.connection() as first:
+            self.assertEqual(first.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            with self.assertRaises(sqlite3.OperationalError):
+                first.execute("INSERT INTO t VALUES (1)")
+        with pool.connection() as second:
+            self.assertIs(second, first)
+        stats = pool.stats()
+        self.assertEqual((stats["created"], stats["checkouts"], stats["in_use"]), (1, 2, 0))
+        self.assertEqual(stats["checkout_seconds_buckets"]["+Inf"], 2)
+        pool.close()
+
+    def test_bounded_checkout_waits_then_times_out(self):
+        pool = ConnectionPool(self.db_path, size=1, timeout=2.0)
+        held = pool.checkout()
+        threading.Timer(0.05, pool.checkin, args=(held,)).start()
+        with pool.connection() as conn:
+            self.assertIs(conn, held)
+            pool.timeout = 0.05
+            with self.assertRaises(TimeoutError):
+                pool.checkout()
+        stats = pool.stats()
+        self.assertEqual((stats["waits"], stats["timeouts"]), (1, 1))
+        self.assertGreater(stats["wait_seconds"], 0)
+        pool.close()
+
+    def test_recycles_when_database_file_is_replaced(self):
+        pool = ConnectionPool(self.db_path, size=1)
+        with pool.connection() as old:
+            pass
+        self.db_path.unlink()
+        with closing(sqlite3.connect(self.db_path)) as conn:
+            conn.execute("CREATE TABLE t (x INTEGER)")
+            conn.execute("INSERT INTO t VALUES (42)")
+            conn.commit()
+        with pool.connection() as new:
+            self.assertIsNot(new, old)
+            self.assertEqual(new.execute("SELECT x FROM t").fetchone()[0], 42)
+        self.assertEqual(pool.stats()["recycled"], 1)
+        pool.close()
+
+    def test_slow_query_log_times_pooled_statements(self):
+        log = SlowQueryLog(threshold=0.0)
+        pool = ConnectionPool(self.db_path, size=1, slow_queries=log)
+        with pool.connection() as conn:
+            conn.execute("SELECT x FROM t").fetchall()
+            conn.execute("SELECT count(*) FROM t WHERE x > 1").fetchone()
+        stats = log.stats()
+        self.assertEqual([q["sql"] for q in stats["recent"][-2:]], ["SELECT x FROM t", "SELECT count(*) FROM t WHERE x > 1"])
+        self.assertEqual(stats["threshold_ms"], 0)
+
+        quiet = SlowQueryLog(threshold=60.0)
+        pool.slow_queries = quiet
+        pool.close()
+        with pool.connection() as conn:
+            conn.execute("SELECT x FROM t").fetchall()
+        self.assertEqual(quiet.stats()["count"], 0)
+        off = SlowQueryLog(threshold=-1)
+        self.assertIsNone(off.watch(sqlite3.connect(":memory:")))
+        self.assertIsNone(off.stats()["threshold_ms"])
+        pool.close()
+
 
 if __name__ == "__main__":
     unittest.main()
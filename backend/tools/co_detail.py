@@ -1,8 +1,34 @@
 from __future__ import annotations
 
 import sqlite3
+from typing import Sequence
 
+from .paging import project_columns
 
-def get_co_detail(conn: sqlite3.Connection, co_number: str):
-    row = conn.execute("SELECT * FROM change_orders WHERE co_number=?", (co_number,)).fetchone()
+CO_COLUMNS = (
+    "project_id",
+    "co_number",
+    "date_submitted",
+    "reason_category",
+    "description",
+    "amount",
+    "status",
+    "related_rfi",
+    "affected_sov_lines",
+    "labor_hours_impact",
+    "schedule_impact_days",
+    "submitted_by",
+    "approved_by",
+)
+
+
+def get_co_detail(
+    conn: sqlite3.Connection, co_number: str, project_id: str | None = None, columns: Sequence[str] | None = None
+):
+    cols = project_columns(columns, CO_COLUMNS, CO_COLUMNS)
+    scope = "AND project_id=?" if project_id else ""
+    row = conn.execute(
+        f"SELECT {', '.join(cols)} FROM change_orders WHERE co_number=? {scope}",
+        (co_number, *([project_id] if project_id else [])),
+    ).fetchone()
     return dict(row) if row else None
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
+
+from backend.tools.send_email import send_email
+
+
+class OutboxFull(Exception):
+    pass
+
+
+class EmailOutbox:
+    """Background queue for outgoing email so SMTP latency never holds up a request.
+
+    Messages are sent by a few worker tasks that run the blocking `send_email` on a small
+    dedicated executor. The outcome of the most recent `history` messages is kept for lookup.
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 1000, history: int = 1000):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.history = history
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="smtp")
+        self._statuses: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[tuple[str, dict[str, Any]]] | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    def _ensure_started(self) -> asyncio.Queue[tuple[str, dict[str, Any]]]:
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._tasks = [loop.create_task(self._worker(self._queue)) for _ in range(self.workers)]
+        return self._queue
+
+    def _record(self, message_id: str, **fields: Any) -> None:
+        status = self._statuses.setdefault(message_id, {"message_id": message_id})
+        status.update(fields)
+        self._statuses.move_to_end(message_id)
+        while len(self._statuses) > self.history:
+            self._statuses.popitem(last=False)
+
+    def submit(self, **message: Any) -> dict[str, Any]:
+        """Queue a message for `send_email(**message)`; must be called from the event loop."""
+        queue = self._ensure_started()
+        message_id = uuid.uuid4().hex
+        try:
+            queue.put_nowait((message_id, message))
+        except asyncio.QueueFull:
+            raise OutboxFull(f"Email outbox is full ({self.max_pending} pending)")
+        self._record(message_id, to=message.get("to"), subject=message.get("subject"), delivery="queued")
+        return dict(self._statuses[message_id])
+
+    def status(self, message_id: str) -> dict[str, Any] | None:
+        status = self._statuses.get(message_id)
+        return dict(status) if status else None
+
+    async def _worker(self, queue: asyncio.Queue[tuple[str, dict[str, Any]]]) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            message_id, message = await queue.get()
+            try:
+                self._record(message_id, delivery="sending")
+                result = await loop.run_in_executor(self._executor, partial(send_email, **message))
+                self._record(message_id, delivery=result["delivery"])
+            except Exception as exc:
+                self._record(message_id, delivery="failed", error=str(exc))
+            finally:
+                queue.task_done()
+
+    async def drain(self, timeout: float | None = None) -> None:
+        """Wait for queued messages to go out, then stop the workers."""
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._queue, self._tasks = None, []
+
+
+email_outbox = EmailOutbox()
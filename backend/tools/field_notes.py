@@ -1,14 +1,155 @@
 from __future__ import annotations
 
+import re
 import sqlite3
+from typing import Any, Sequence
 
+from backend.db.search import (
+    FTS_TABLE,
+    fts_can_match,
+    has_field_notes_index,
+    like_escape,
+    parse_terms,
+    to_fts_query,
+    word_start_filter,
+)
 
-def get_field_notes(conn: sqlite3.Connection, project_id: str, keyword: str = "", limit: int = 20):
-    keyword = f"%{keyword.lower()}%"
-    return [
-        dict(r)
-        for r in conn.execute(
-            "SELECT note_id, date, note_type, content FROM field_notes WHERE project_id=? AND LOWER(content) LIKE ? ORDER BY date DESC LIMIT ?",
-            (project_id, keyword, limit),
-        ).fetchall()
-    ]
+from .paging import decode_cursor, page_size, project_columns, split_page
+
+NOTE_FIELDS = (
+    "project_id",
+    "note_id",
+    "date",
+    "author",
+    "note_type",
+    "content",
+    "photos_attached",
+    "weather",
+    "temp_high",
+    "temp_low",
+)
+DEFAULT_NOTE_FIELDS = ("project_id", "note_id", "date", "note_type", "content")
+NOTE_COLUMNS = ", ".join(f"f.{c}" for c in DEFAULT_NOTE_FIELDS)
+SNIPPET_TOKENS = 12
+SNIPPET_CHARS = 80
+
+
+def _like_snippet(content: str, terms: list[tuple[str, bool, bool]]) -> str:
+    match = re.search("|".join(rf"\b{re.escape(t)}" if prefix else re.escape(t) for t, _, prefix in terms), content, re.IGNORECASE)
+    if not match:
+        return content[:SNIPPET_CHARS]
+    start = max(match.start() - SNIPPET_CHARS // 2, 0)
+    end = min(match.end() + SNIPPET_CHARS // 2, len(content))
+    return (
+        ("…" if start else "")
+        + content[start : match.start()]
+        + f"[{match.group(0)}]"
+        + content[match.end() : end]
+        + ("…" if end < len(content) else "")
+    )
+
+
+def _recent(conn: sqlite3.Connection, project_id: str | None, cols: str, limit: int, key: list | None, filters=(), params=()):
+    clauses, args = list(filters), list(params)
+    if project_id:
+        clauses.append("f.project_id = ?")
+        args.append(project_id)
+    if key:
+        clauses.append("(COALESCE(f.date, ''), f.rowid) < (?, ?)")
+        args.extend(key)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return conn.execute(
+        f"""
+        SELECT {cols}, COALESCE(f.date, '') AS _date, f.rowid AS _rowid FROM field_notes f {where}
+        ORDER BY _date DESC, _rowid DESC LIMIT ?
+        """,
+        (*args, limit + 1),
+    ).fetchall()
+
+
+def _term_filters(terms, prefixes_only: bool = False) -> tuple[list[str], list[str]]:
+    # Prefix terms must start a word; other terms match anywhere, which the FTS MATCH already checks.
+    filters, params = [], []
+    for text, _, prefix in terms:
+        if prefix:
+            sql, args = word_start_filter("f.content", text)
+        elif prefixes_only:
+            continue
+        else:
+            sql, args = "f.content LIKE ? ESCAPE '\\'", ["%" + like_escape(text) + "%"]
+        filters.append(sql)
+        params.extend(args)
+    return filters, params
+
+
+def _search_fts(conn: sqlite3.Connection, project_id: str | None, terms, cols: str, limit: int, key: list | None):
+    # bm25() is what ORDER BY rank sorts on; naming it lets the next page resume after (score, rowid).
+    filters, filter_params = _term_filters(terms, prefixes_only=True)
+    scope = "".join(f" AND {f}" for f in filters) + (" AND f.project_id = ?" if project_id else "")
+    after = "WHERE (_score, _rowid) > (?, ?)" if key else ""
+    params = [to_fts_query(terms), *filter_params, *([project_id] if project_id else []), *(key or []), limit + 1]
+    return conn.execute(
+        f"""
+        SELECT * FROM (
+          SELECT {cols}, snippet({FTS_TABLE}, 0, '[', ']', '…', {SNIPPET_TOKENS}) AS snippet,
+                 bm25({FTS_TABLE}) AS _score, f.rowid AS _rowid
+          FROM {FTS_TABLE} JOIN field_notes f ON f.rowid = {FTS_TABLE}.rowid
+          WHERE {FTS_TABLE} MATCH ? {scope}
+        )
+        {after}
+        ORDER BY _score, _rowid
+        LIMIT ?
+        """,
+        params,
+    ).fetchall()
+
+
+def _search_like(conn: sqlite3.Connection, project_id: str | None, terms, limit: int, cols: str = NOTE_COLUMNS, key: list | None = None):
+    # LIKE is already case-insensitive for ASCII, so there is no need to LOWER() every row.
+    filters, params = _term_filters(terms)
+    rows = _recent(conn, project_id, f"{cols}, f.content AS _content", limit, key, filters, params)
+    return [{**dict(r), "snippet": _like_snippet(r["_content"] or "", terms)} for r in rows]
+
+
+def field_notes_page(
+    conn: sqlite3.Connection,
+    project_id: str | None,
+    keyword: str = "",
+    limit: int = 20,
+    cursor: str | None = None,
+    columns: Sequence[str] | None = None,
+) -> dict[str, Any]:
+    """A page of recent notes, or of keyword matches with snippets ranked by relevance.
+
+    Keywords accept phrases ("pressure test") and prefixes (insul*). Plain terms and phrases match
+    as case-insensitive substrings, so "insul" finds "insulation" and "reinsulate"; a prefix must
+    start a word, so insul* finds only the first. project_id=None searches all projects. Falls
+    back to LIKE scans when the FTS5 index is missing or a term is shorter than a trigram. Pass
+    the returned next_cursor to continue; recent notes and LIKE matches page on (date, rowid).
+    """
+    cols = ", ".join(f"f.{c}" for c in project_columns(columns, NOTE_FIELDS, DEFAULT_NOTE_FIELDS))
+    limit = page_size(limit)
+    key = decode_cursor(cursor) if cursor else None
+    terms = parse_terms(keyword)
+    if not terms:
+        rows, key_columns = _recent(conn, project_id, cols, limit, key), ("_date", "_rowid")
+    elif fts_can_match(terms) and has_field_notes_index(conn):
+        rows, key_columns = _search_fts(conn, project_id, terms, cols, limit, key), ("_score", "_rowid")
+    else:
+        rows, key_columns = _search_like(conn, project_id, terms, limit, cols, key), ("_date", "_rowid")
+    items, next_cursor = split_page(rows, limit, key_columns)
+    for item in items:
+        item.pop("_content", None)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def get_field_notes(
+    conn: sqlite3.Connection,
+    project_id: str | None,
+    keyword: str = "",
+    limit: int = 20,
+    cursor: str | None = None,
+    columns: Sequence[str] | None = None,
+):
+    """The items of field_notes_page."""
+    return field_notes_page(conn, project_id, keyword, limit, cursor, columns)["items"]
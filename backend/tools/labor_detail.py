@@ -1,14 +1,63 @@
 from __future__ import annotations
 
 import sqlite3
+from typing import Sequence
 
+from .paging import decode_cursor, page_size, project_columns, split_page
 
-def get_labor_detail(conn: sqlite3.Connection, project_id: str, sov_line_id: str):
+LABOR_COLUMNS = (
+    "log_id",
+    "date",
+    "employee_id",
+    "role",
+    "hours_st",
+    "hours_ot",
+    "hourly_rate",
+    "burden_multiplier",
+    "work_area",
+    "cost_code",
+)
+DEFAULT_LABOR_COLUMNS = ("date", "role", "hours_st", "hours_ot", "hourly_rate", "burden_multiplier")
+LABOR_COST = "(hours_st + 1.5 * hours_ot) * hourly_rate * burden_multiplier"
+
+
+def get_labor_detail(
+    conn: sqlite3.Connection,
+    project_id: str,
+    sov_line_id: str,
+    limit: int = 200,
+    cursor: str | None = None,
+    columns: Sequence[str] | None = None,
+):
+    """One page of a line's labor logs, newest first, with totals over every log on the line.
+
+    Pages are keyed on (date, rowid); pass the returned next_cursor to continue.
+    """
+    cols = project_columns(columns, LABOR_COLUMNS, DEFAULT_LABOR_COLUMNS)
+    limit = page_size(limit)
+    after, params = "", [project_id, sov_line_id]
+    if cursor:
+        after = "AND (COALESCE(date, ''), rowid) < (?, ?)"
+        params.extend(decode_cursor(cursor))
     rows = conn.execute(
-        "SELECT date, role, hours_st, hours_ot, hourly_rate, burden_multiplier FROM labor_logs WHERE project_id=? AND sov_line_id=? ORDER BY date DESC LIMIT 200",
-        (project_id, sov_line_id),
+        f"""
+        SELECT {", ".join(cols)}, COALESCE(date, '') AS _date, rowid AS _rowid FROM labor_logs
+        WHERE project_id=? AND sov_line_id=? {after}
+        ORDER BY _date DESC, _rowid DESC
+        LIMIT ?
+        """,
+        (*params, limit + 1),
     ).fetchall()
-    total = 0.0
-    for r in rows:
-        total += (float(r[2]) + 1.5 * float(r[3])) * float(r[4]) * float(r[5])
-    return {"rows": [dict(r) for r in rows], "computed_cost": total}
+    items, next_cursor = split_page(rows, limit, ("_date", "_rowid"))
+    count, cost, hours_st, hours_ot = conn.execute(
+        f"SELECT COUNT(*), TOTAL({LABOR_COST}), TOTAL(hours_st), TOTAL(hours_ot) FROM labor_logs WHERE project_id=? AND sov_line_id=?",
+        (project_id, sov_line_id),
+    ).fetchone()
+    return {
+        "rows": items,
+        "next_cursor": next_cursor,
+        "row_count": count,
+        "computed_cost": cost,
+        "total_hours_st": hours_st,
+        "total_hours_ot": hours_ot,
+    }
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from multiprocessing import get_context
+from typing import Any
+
+import numpy as np
+
+# Draws per chunk are sized so samples x (lines + pending COs) stays near CHUNK_CELLS floats (~32 MB).
+# Each chunk draws from its own child of the seed, so results do not depend on worker count.
+CHUNK_CELLS = 4_000_000
+MAX_CHUNK_SAMPLES = 50_000
+MAX_SAMPLES = 1_000_000
+DEFAULT_WORKERS = int(os.getenv("RISK_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Pseudo-count of portfolio-wide decisions blended into each project's CO approval rate.
+APPROVAL_PRIOR_WEIGHT = 5.0
+PERCENTILES = (10, 50, 90)
+
+
+def load_risk_inputs(conn: sqlite3.Connection, project_ids: list[str] | None = None) -> dict[str, np.ndarray]:
+    """Arrays the simulator needs: committed revenue and cost per project, cost to go per line, pending COs.
+
+    Cost to go comes from computed_sov_forecasts. Each line's cost to go varies with the spread of
+    overrun_pct across its project's lines. A pending CO is approved at the project's historical
+    approval rate, shrunk toward the portfolio rate. The CO's work is booked as cost either way;
+    approval adds its amount to revenue. Lines and COs are ordered by project.
+    """
+    where = f"WHERE m.project_id IN ({','.join('?' * len(project_ids))})" if project_ids else ""
+    projects = conn.execute(
+        f"""
+        SELECT m.project_id, m.contract_value + m.approved_co_total,
+               COALESCE(SUM(f.actual_cost), 0) + COALESCE(SUM(s.rejected_co_exposure), 0)
+        FROM computed_project_metrics m
+        LEFT JOIN computed_sov_metrics s ON s.project_id = m.project_id
+        LEFT JOIN computed_sov_forecasts f ON f.project_id = s.project_id AND f.sov_line_id = s.sov_line_id
+        {where}
+        GROUP BY m.project_id
+        ORDER BY m.project_id
+        """,
+        project_ids or (),
+    ).fetchall()
+    index = {r[0]: i for i, r in enumerate(projects)}
+
+    lines = [
+        (index[p], float(etc or 0), float(overrun or 0))
+        for p, etc, overrun in conn.execute(
+            """
+            SELECT s.project_id, f.estimate_to_complete, s.overrun_pct
+            FROM computed_sov_metrics s
+            JOIN computed_sov_forecasts f ON f.project_id = s.project_id AND f.sov_line_id = s.sov_line_id
+            ORDER BY s.project_id, s.sov_line_id
+            """
+        )
+        if p in index
+    ]
+    line_project = np.array([p for p, _, _ in lines], dtype=np.int64)
+    overrun = np.array([o for _, _, o in lines])
+    counts = np.maximum(np.bincount(line_project, minlength=len(projects)), 1)
+    mean = np.bincount(line_project, overrun, len(projects)) / counts
+    variance = np.bincount(line_project, overrun * overrun, len(projects)) / counts - mean * mean
+
+    decided = dict(
+        (r[0], (float(r[1]), float(r[2])))
+        for r in conn.execute(
+            """
+            SELECT project_id, SUM(status = 'Approved'), SUM(status IN ('Approved', 'Rejected'))
+            FROM change_orders GROUP BY project_id
+            """
+        )
+    )
+    approved_all = sum(a for a, _ in decided.values())
+    decided_all = sum(n for _, n in decided.values())
+    portfolio_rate = approved_all / decided_all if decided_all else 0.5
+    rates = np.array(
+        [
+            (decided.get(p, (0.0, 0.0))[0] + APPROVAL_PRIOR_WEIGHT * portfolio_rate)
+            / (decided.get(p, (0.0, 0.0))[1] + APPROVAL_PRIOR_WEIGHT)
+            for p, *_ in projects
+        ]
+    )
+    pending = [
+        (index[p], float(amount or 0))
+        for p, amount in conn.execute("SELECT project_id, amount FROM change_orders WHERE status = 'Pending' ORDER BY project_id, co_number")
+        if p in index
+    ]
+    co_project = np.array([p for p, _ in pending], dtype=np.int64)
+
+    return {
+        "project_id": np.array([r[0] for r in projects], dtype=object),
+        "revenue": np.array([float(r[1] or 0) for r in projects]),
+        "committed_cost": np.array([float(r[2] or 0) for r in projects]),
+        "line_project": line_project,
+        "line_etc": np.array([etc for _, etc, _ in lines]),
+        "line_sigma": np.sqrt(np.maximum(variance, 0.0))[line_project],
+        "co_project": co_project,
+        "co_amount": np.array([a for _, a in pending]),
+        "co_prob": rates[co_project] if len(pending) else np.zeros(0),
+    }
+
+
+def chunk_samples(inputs: dict[str, np.ndarray]) -> int:
+    """Draws per chunk for these inputs; chunks hold one float per draw per line and per pending CO."""
+    width = len(inputs["line_etc"]) + len(inputs["co_amount"])
+    return max(1, min(MAX_CHUNK_SAMPLES, CHUNK_CELLS // max(width, 1)))
+
+
+def _sum_by_project(values: np.ndarray, groups: np.ndarray, n: int) -> np.ndarray:
+    """Sum the columns of (samples, k) `values` into (samples, n) by their sorted project index."""
+    out = np.zeros((values.shape[0], n))
+    if len(groups):
+        projects, starts = np.unique(groups, return_index=True)
+        out[:, projects] = np.add.reduceat(values, starts, axis=1)
+    return out
+
+
+def simulate_chunk(inputs: dict[str, np.ndarray], samples: int, seed: np.random.SeedSequence) -> np.ndarray:
+    """Final margins for `samples` draws: one row per project, then a portfolio row."""
+    rng = np.random.default_rng(seed)
+    n = len(inputs["revenue"])
+    line_cost = rng.standard_normal((samples, len(inputs["line_etc"])))
+    line_cost *= inputs["line_sigma"]
+    np.maximum(line_cost, -1.0, out=line_cost)
+    line_cost += 1.0
+    line_cost *= inputs["line_etc"]
+    co_cost = np.bincount(inputs["co_project"], np.maximum(inputs["co_amount"], 0.0), n)
+    cost = inputs["committed_cost"] + co_cost + _sum_by_project(line_cost, inputs["line_project"], n)
+    del line_cost
+
+    approved = rng.random((samples, len(inputs["co_amount"]))) < inputs["co_prob"]
+    revenue = inputs["revenue"] + _sum_by_project(approved * inputs["co_amount"], inputs["co_project"], n)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margins = np.where(revenue != 0, (revenue - cost) / revenue, 0.0)
+        total_revenue = revenue.sum(axis=1)
+        portfolio = np.where(total_revenue != 0, (total_revenue - cost.sum(axis=1)) / total_revenue, 0.0)
+    return np.vstack([margins.T, portfolio])
+
+
+def _summary(draws: np.ndarray) -> dict[str, float]:
+    p10, p50, p90 = np.percentile(draws, PERCENTILES)
+    return {
+        "p10": float(p10),
+        "p50": float(p50),
+        "p90": float(p90),
+        "mean": float(draws.mean()),
+        "prob_loss": float((draws < 0).mean()),
+    }
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _process_pool(workers: int) -> ProcessPoolExecutor:
+    """One pool for the process, started on first use and sized by that caller (RISK_WORKERS for the API).
+
+    Spawned rather than forked: requests reach it from server threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def simulate_margin_risk(
+    inputs: dict[str, np.ndarray], samples: int = 10_000, seed: int = 0, workers: int = DEFAULT_WORKERS
+) -> dict[str, Any]:
+    """P10/P50/P90 of final margin per project and for the portfolio.
+
+    Draws run in chunk_samples(inputs) chunks seeded from `seed`; with more than one chunk and
+    workers > 1 the chunks run in the shared process pool. The same seed gives the same answer
+    either way.
+    """
+    if not 1 <= samples <= MAX_SAMPLES:
+        raise ValueError(f"samples must be between 1 and {MAX_SAMPLES}")
+    step = chunk_samples(inputs)
+    sizes = [min(step, samples - start) for start in range(0, samples, step)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if workers > 1 and len(sizes) > 1:
+        chunks = list(_process_pool(workers).map(simulate_chunk, repeat(inputs), sizes, seeds))
+    else:
+        chunks = [simulate_chunk(inputs, size, s) for size, s in zip(sizes, seeds)]
+    draws = np.concatenate(chunks, axis=1)
+    return {
+        "samples": samples,
+        "seed": seed,
+        "projects": [
+            {"project_id": project_id, **_summary(draws[i])} for i, project_id in enumerate(inputs["project_id"].tolist())
+        ],
+        "portfolio": _summary(draws[-1]),
+    }
+
+
+def margin_risk(
+    conn: sqlite3.Connection, project_ids: list[str] | None = None, samples: int = 10_000, seed: int = 0, workers: int = DEFAULT_WORKERS
+) -> dict[str, Any]:
+    return simulate_margin_risk(load_risk_inputs(conn, project_ids), samples, seed, workers)
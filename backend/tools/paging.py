@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import base64
+import json
+from typing import Any, Sequence
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    """Opaque token for the sort key of the last row on a page."""
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int = 2) -> list[Any]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as exc:
+        raise ValueError("Malformed cursor") from exc
+    # Only scalars SQLite can bind; anything else would fail at query time instead of here.
+    if not isinstance(key, list) or len(key) != size or not all(isinstance(k, (str, int, float)) for k in key):
+        raise ValueError("Malformed cursor")
+    return key
+
+
+def project_columns(requested: Sequence[str] | None, allowed: Sequence[str], default: Sequence[str]) -> list[str]:
+    """Validate a requested column list against the columns a tool exposes."""
+    if not requested:
+        return list(default)
+    unknown = [c for c in requested if c not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown column(s): {', '.join(unknown)}")
+    return list(dict.fromkeys(requested))
+
+
+def page_size(limit: int) -> int:
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit
+
+
+def split_page(rows: list[Any], limit: int, key_columns: Sequence[str]) -> tuple[list[dict[str, Any]], str | None]:
+    """Trim a limit + 1 fetch to one page; the extra row only signals that another page exists.
+
+    The key columns are selected as extra columns and are stripped from the returned items.
+    """
+    items = [dict(r) for r in rows[:limit]]
+    next_cursor = encode_cursor([items[-1][k] for k in key_columns]) if len(rows) > limit else None
+    for item in items:
+        for k in key_columns:
+            item.pop(k, None)
+    return items, next_cursor
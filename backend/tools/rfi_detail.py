@@ -1,8 +1,34 @@
 from __future__ import annotations
 
 import sqlite3
+from typing import Sequence
 
+from .paging import project_columns
 
-def get_rfi_detail(conn: sqlite3.Connection, rfi_number: str):
-    row = conn.execute("SELECT * FROM rfis WHERE rfi_number=?", (rfi_number,)).fetchone()
+RFI_COLUMNS = (
+    "project_id",
+    "rfi_number",
+    "date_submitted",
+    "subject",
+    "submitted_by",
+    "assigned_to",
+    "priority",
+    "status",
+    "date_required",
+    "date_responded",
+    "response_summary",
+    "cost_impact",
+    "schedule_impact",
+)
+
+
+def get_rfi_detail(
+    conn: sqlite3.Connection, rfi_number: str, project_id: str | None = None, columns: Sequence[str] | None = None
+):
+    cols = project_columns(columns, RFI_COLUMNS, RFI_COLUMNS)
+    scope = "AND project_id=?" if project_id else ""
+    row = conn.execute(
+        f"SELECT {', '.join(cols)} FROM rfis WHERE rfi_number=? {scope}",
+        (rfi_number, *([project_id] if project_id else [])),
+    ).fetchone()
     return dict(row) if row else None
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import itertools
+import math
+import sqlite3
+from typing import Any, Iterable
+
+import numpy as np
+
+# Upper bound on projects x scenarios per request; 10k cells evaluate in a few milliseconds.
+MAX_CELLS = 250_000
+
+SCENARIO_FIELDS = ("recovery_amount", "co_approval_prob", "overtime_freeze")
+
+
+def load_project_arrays(conn: sqlite3.Connection, project_ids: list[str] | None = None) -> dict[str, np.ndarray]:
+    """Per-project inputs as aligned arrays: contract, actual cost, pending COs and overtime premium paid.
+
+    One pass over computed_project_metrics; the compute engine stores the overtime premium there.
+    """
+    where = f"WHERE project_id IN ({','.join('?' * len(project_ids))})" if project_ids else ""
+    rows = conn.execute(
+        f"""
+        SELECT project_id, contract_value, total_actual_cost, pending_co_exposure, ot_premium
+        FROM computed_project_metrics
+        {where}
+        ORDER BY project_id
+        """,
+        project_ids or (),
+    ).fetchall()
+    ids = np.array([r[0] for r in rows], dtype=object)
+    values = np.array([r[1:] for r in rows], dtype=float).reshape(len(rows), 4)
+    contract, actual, pending, premium = np.nan_to_num(values).T
+    return {"project_id": ids, "contract": contract, "actual": actual, "pending": pending, "ot_premium": premium}
+
+
+def scenario_grid(
+    recovery_amounts: Iterable[float] = (0.0,),
+    co_approval_probs: Iterable[float] = (0.0,),
+    overtime_freezes: Iterable[float] = (0.0,),
+) -> np.ndarray:
+    """Cartesian product of the lever values as an (m, 3) array, recovery varying slowest."""
+    cells = list(itertools.product(recovery_amounts, co_approval_probs, overtime_freezes))
+    return np.array(cells, dtype=float).reshape(len(cells), 3)
+
+
+def evaluate_scenarios(projects: dict[str, np.ndarray], scenarios: np.ndarray) -> dict[str, np.ndarray]:
+    """Margins for every (project, scenario) pair in one broadcast.
+
+    Each scenario takes `recovery_amount` off the project's cost, bills `co_approval_prob` of its
+    pending change orders, and avoids `overtime_freeze` of the overtime premium it has paid. A
+    portfolio row sums revenue and cost across the projects for each scenario.
+    """
+    recovery, prob, freeze = (scenarios[:, i][None, :] for i in range(3))
+    revenue = projects["contract"][:, None] + prob * projects["pending"][:, None]
+    cost = np.maximum(projects["actual"][:, None] - recovery - freeze * projects["ot_premium"][:, None], 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        margin = np.where(revenue != 0, (revenue - cost) / revenue, 0.0)
+        total_revenue, total_cost = revenue.sum(axis=0), cost.sum(axis=0)
+        portfolio = np.where(total_revenue != 0, (total_revenue - total_cost) / total_revenue, 0.0)
+        contract = projects["contract"]
+        current = np.where(contract != 0, (contract - projects["actual"]) / contract, 0.0)
+    return {"margin": margin, "portfolio": portfolio, "current": current}
+
+
+def what_if_batch(
+    conn: sqlite3.Connection,
+    project_ids: list[str] | None = None,
+    recovery_amounts: Iterable[float] = (0.0,),
+    co_approval_probs: Iterable[float] = (0.0,),
+    overtime_freezes: Iterable[float] = (0.0,),
+    scenarios: list[dict[str, float]] | None = None,
+) -> dict[str, Any]:
+    """Evaluate a scenario grid (or an explicit scenario list) across projects (default: all).
+
+    Returns a compact matrix: margin_pct[i][j] is project i under scenario j, with the scenario
+    columns listed once in `scenarios`.
+    """
+    levers = [list(recovery_amounts), list(co_approval_probs), list(overtime_freezes)]
+    # Size the request before building the grid or touching project rows.
+    n_scenarios = len(scenarios) if scenarios is not None else math.prod(len(v) for v in levers)
+    if project_ids:
+        n_projects = len(set(project_ids))
+    else:
+        n_projects = conn.execute("SELECT COUNT(*) FROM computed_project_metrics").fetchone()[0]
+    cells = n_projects * n_scenarios
+    if cells > MAX_CELLS:
+        raise ValueError(f"{cells} scenario cells exceeds the limit of {MAX_CELLS}")
+    if scenarios is not None:
+        grid = np.array([[float(s.get(f, 0.0)) for f in SCENARIO_FIELDS] for s in scenarios], dtype=float).reshape(-1, 3)
+    else:
+        grid = scenario_grid(*levers)
+    if ((grid[:, 1:] < 0) | (grid[:, 1:] > 1)).any():
+        raise ValueError("co_approval_prob and overtime_freeze must be between 0 and 1")
+    projects = load_project_arrays(conn, project_ids)
+    result = evaluate_scenarios(projects, grid)
+    return {
+        "project_ids": projects["project_id"].tolist(),
+        "scenarios": {f: grid[:, i].tolist() for i, f in enumerate(SCENARIO_FIELDS)},
+        "current_margin_pct": result["current"].tolist(),
+        "margin_pct": result["margin"].tolist(),
+        "portfolio_margin_pct": result["portfolio"].tolist(),
+    }
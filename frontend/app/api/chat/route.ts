@@ -1,10 +1,14 @@
 import { backendBase } from "@/lib/api";
 
+// Never cache or pre-render this route; event streams must reach the client as they are produced.
+export const dynamic = "force-dynamic";
+
 export async function POST(req: Request) {
   const body = await req.json();
   const projectId = body.projectId;
   const messages = body.messages ?? [];
   const last = messages[messages.length - 1]?.content ?? "";
+  const accept = req.headers.get("accept") ?? "application/json";
 
   if (!projectId) {
     return new Response(JSON.stringify({ error: "projectId is required" }), {
@@ -15,10 +19,23 @@ export async function POST(req: Request) {
 
   const res = await fetch(`${backendBase}/api/chat`, {
     method: "POST",
-    headers: { "content-type": "application/json" },
-    body: JSON.stringify({ project_id: projectId, message: last })
+    headers: { "content-type": "application/json", accept },
+    body: JSON.stringify({ project_id: projectId, message: last }),
+    cache: "no-store"
   });
 
+  if (res.headers.get("content-type")?.includes("text/event-stream") && res.body) {
+    // Hand the upstream body over as-is so each event is flushed without buffering.
+    return new Response(res.body, {
+      status: res.status,
+      headers: {
+        "content-type": "text/event-stream",
+        "cache-control": "no-cache, no-transform",
+        "x-accel-buffering": "no"
+      }
+    });
+  }
+
   const json = await res.json();
   return new Response(JSON.stringify(json), {
     status: res.status,
@@ -1,26 +1,35 @@
 "use client";
 
 import { useState } from "react";
-import { backendBase } from "@/lib/api";
+import { backendBase, streamEvents } from "@/lib/api";
 import { granolaInstruction } from "@/lib/granola";
 
 export function ChatPanel({ projectId }: { projectId: string }) {
   const [q, setQ] = useState("");
   const [answer, setAnswer] = useState("");
+  const [tools, setTools] = useState<string[]>([]);
+  const [rows, setRows] = useState(0);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState("");
 
   async function ask() {
     setLoading(true);
     setError("");
+    setAnswer("");
+    setTools([]);
+    setRows(0);
     try {
-      const res = await fetch(`${backendBase}/api/chat`, {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ project_id: projectId, message: `[${granolaInstruction.name}] ${q}` })
-      });
-      const data = await res.json();
-      setAnswer(data.answer ?? "No response");
+      // The answer arrives as the first event; tool rows follow as the backend produces them.
+      await streamEvents(
+        `${backendBase}/api/chat`,
+        { project_id: projectId, message: `[${granolaInstruction.name}] ${q}` },
+        ({ event, data }) => {
+          if (event === "answer") setAnswer(data.text ?? "No response");
+          else if (event === "tool") setTools((t) => [...t, data.name]);
+          else if (event === "row") setRows((n) => n + 1);
+          else if (event === "error") setError(data.detail ?? "Tool failed");
+        }
+      );
     } catch (e: unknown) {
       setError(e instanceof Error ? e.message : "Unknown chat error");
     } finally {
@@ -48,6 +57,11 @@ export function ChatPanel({ projectId }: { projectId: string }) {
 
       {error ? <p className="bad" style={{ marginBottom: 0 }}>Chat error: {error}</p> : null}
       {answer ? <p style={{ marginBottom: 0 }}>{answer}</p> : null}
+      {tools.length ? (
+        <div style={{ fontSize: 12, opacity: 0.7, marginTop: 4 }}>
+          {tools.join(", ")} · {rows} row(s)
+        </div>
+      ) : null}
     </div>
   );
 }
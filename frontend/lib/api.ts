@@ -3,14 +3,63 @@ export const backendBase =
   process.env.NEXT_PUBLIC_BACKEND_URL ??
   "http://localhost:8000";
 
-export async function getPortfolio() {
-  const r = await fetch(`${backendBase}/api/portfolio`, { cache: "no-store" });
+function asOfQuery(asOf?: string) {
+  return asOf ? `?as_of=${encodeURIComponent(asOf)}` : "";
+}
+
+export async function getPortfolio(asOf?: string) {
+  const r = await fetch(`${backendBase}/api/portfolio${asOfQuery(asOf)}`, { cache: "no-cache" });
   if (!r.ok) throw new Error("Failed portfolio fetch");
   return r.json();
 }
 
-export async function getDossier(projectId: string) {
-  const r = await fetch(`${backendBase}/api/dossier/${projectId}`, { cache: "no-store" });
+export async function getDossier(projectId: string, asOf?: string) {
+  const r = await fetch(`${backendBase}/api/dossier/${projectId}${asOfQuery(asOf)}`, { cache: "no-cache" });
   if (!r.ok) throw new Error(`Failed dossier fetch ${projectId}`);
   return r.json();
 }
+
+export async function getProjectTrend(
+  projectId: string,
+  opts: { start?: string; end?: string; sovLineId?: string } = {}
+) {
+  const params = new URLSearchParams();
+  if (opts.start) params.set("start", opts.start);
+  if (opts.end) params.set("end", opts.end);
+  if (opts.sovLineId) params.set("sov_line_id", opts.sovLineId);
+  const qs = params.toString();
+  const r = await fetch(`${backendBase}/api/trend/${projectId}${qs ? `?${qs}` : ""}`, { cache: "no-cache" });
+  if (!r.ok) throw new Error(`Failed trend fetch ${projectId}`);
+  return r.json();
+}
+
+export type StreamEvent = { event: string; data: any };
+
+/** POST to a backend route asking for Server-Sent Events and call onEvent as each one arrives. */
+export async function streamEvents(url: string, body: unknown, onEvent: (e: StreamEvent) => void) {
+  const r = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json", Accept: "text/event-stream" },
+    body: JSON.stringify(body)
+  });
+  if (!r.ok || !r.body) throw new Error(`Stream request failed (${r.status})`);
+  const reader = r.body.pipeThrough(new TextDecoderStream()).getReader();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += value;
+    let end: number;
+    while ((end = buffer.indexOf("\n\n")) >= 0) {
+      const chunk = buffer.slice(0, end);
+      buffer = buffer.slice(end + 2);
+      let event = "message";
+      const data: string[] = [];
+      for (const line of chunk.split("\n")) {
+        if (line.startsWith("event: ")) event = line.slice(7);
+        else if (line.startsWith("data: ")) data.push(line.slice(6));
+      }
+      if (data.length) onEvent({ event, data: JSON.parse(data.join("\n")) });
+    }
+  }
+}